@@ -0,0 +1,179 @@
+import random
+import unittest
+import indicators
+import numpy as np
+
+from datetime import datetime, timedelta, timezone
+from backtester import Backtester, PeriodWindow
+from indicatorbank import IndicatorBank
+from indicatorcache import IndicatorCache
+from option import Option
+from enums import CUSTOM_LOSS, STOP_LOSS, TRAILING_LOSS
+
+
+def get_rows(count: int) -> list:
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for index in range(count):
+        price = 100 + 10 * ((index // 10) % 2) + index % 10  # Saw tooth prices, so averages cross.
+        rows.append({'date_utc': start + timedelta(hours=index), 'open': price, 'high': price + 1,
+                     'low': price - 1, 'close': price + 0.5})
+    return rows
+
+
+def get_random_rows(count: int) -> list:
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    generator = random.Random(2)
+    rows = []
+    price = 100
+    for index in range(count):
+        close = price * (1 + generator.uniform(-0.03, 0.03))
+        rows.append({'date_utc': start + timedelta(hours=index), 'open': price, 'close': close,
+                     'high': max(price, close) * (1 + generator.random() / 100),
+                     'low': min(price, close) * (1 - generator.random() / 100)})
+        price = close
+    return rows
+
+
+def get_trades(backtester: Backtester) -> list:
+    return [(trade['date'], trade['action'], trade['net']) for trade in backtester.trades]
+
+
+class MyTestCase(unittest.TestCase):
+    def test_period_window(self):
+        window = PeriodWindow([{'close': 0}, {'close': 1}])
+        window.append({'close': 2})
+        self.assertEqual(len(window), 3)
+        self.assertEqual(window[0]['close'], 2)
+        self.assertEqual(window[-1]['close'], 0)
+        self.assertEqual([period['close'] for period in window[0:2]], [2, 1])
+        self.assertEqual([period['close'] for period in window[1:]], [1, 0])
+        self.assertEqual([period['close'] for period in window], [2, 1, 0])
+        self.assertEqual(window[3:], [])
+        self.assertRaises(IndexError, window.__getitem__, 3)
+
+    def test_window_matches_inserted_list(self):
+        periods = [{'close': index} for index in range(30)]
+        window = PeriodWindow()
+        seenData = []
+        for period in periods:
+            window.append(period)
+            seenData.insert(0, period)
+            self.assertEqual(window[0:5], seenData[0:5])
+            self.assertEqual(window[-1], seenData[-1])
+            self.assertEqual(Backtester.get_wma(window, 1, 'close'), Backtester.get_wma(seenData, 1, 'close'))
+
+    def test_moving_average_test(self):
+        backtester = Backtester(startingBalance=1000, data=get_rows(200), lossStrategy=STOP_LOSS, lossPercentage=5,
+                                options=[Option('sma', 'close', 3, 7)], symbol='TEST')
+        backtester.moving_average_test()
+        self.assertGreater(len(backtester.trades), 0)
+        self.assertFalse(backtester.inLongPosition or backtester.inShortPosition)
+
+    def test_precomputed_signals_match_seen_data(self):
+        rows = get_random_rows(600)
+        configurations = [
+            dict(lossStrategy=STOP_LOSS, lossPercentage=5, options=[Option('sma', 'close', 5, 20)]),
+            dict(lossStrategy=TRAILING_LOSS, lossPercentage=3, marginEnabled=False,
+                 options=[Option('wma', 'high/low', 8, 21), Option('ema', 'open', 5, 13)]),
+            dict(lossStrategy=TRAILING_LOSS, lossPercentage=2, options=[Option('ema', 'close', 2, 3)]),
+            dict(lossStrategy=STOP_LOSS, lossPercentage=4, options=[Option('EMA', 'open/close', 9, 30)],
+                 stoicOptions=[10, 15, 5], startDate=datetime(2020, 1, 5)),
+            dict(lossStrategy=TRAILING_LOSS, lossPercentage=1, options=[Option('sma', 'low', 3, 9)],
+                 stoicOptions=[6, 6, 3]),
+        ]
+
+        for configuration in configurations:
+            results = []
+            for precompute, vectorize in ((False, False), (True, False), (True, True)):
+                backtester = Backtester(startingBalance=1000, data=rows, symbol='TEST', **configuration)
+                backtester.moving_average_test(precompute=precompute, vectorize=vectorize)
+                backtester.reset_everything()  # Second run reuses cached indicators and previous trend.
+                backtester.moving_average_test(precompute=precompute, vectorize=vectorize)
+                results.append((get_trades(backtester), backtester.equityCurve.tolist(), backtester.trend,
+                                backtester.stoicTrend, backtester.previousPosition))
+            self.assertGreater(len(results[0][0]), 0)
+            self.assertEqual(results[0], results[1], configuration)
+            self.assertEqual(results[0], results[2], configuration)
+
+    def test_indicator_bank_matches_calculated_series(self):
+        rows = get_random_rows(400)
+        bank = IndicatorBank()
+        configurations = [
+            dict(options=[Option('sma', 'close', 5, 20)]),
+            dict(options=[Option('sma', 'close', 5, 12)]),  # Reuses SMA 5 of a different minimum period.
+            dict(options=[Option('wma', 'high/low', 8, 21), Option('ema', 'open', 5, 13)]),
+            dict(options=[Option('wma', 'high/low', 8, 21)]),  # Reuses both WMAs.
+            dict(options=[Option('ema', 'open', 5, 30)]),
+            dict(options=[Option('ema', 'open', 5, 13)], startDate=datetime(2020, 1, 5)),
+        ]
+        for configuration in configurations:
+            results = []
+            for indicatorBank in (None, bank):
+                backtester = Backtester(startingBalance=1000, data=rows, lossStrategy=TRAILING_LOSS, lossPercentage=3,
+                                        symbol='TEST', **configuration)
+                backtester.indicatorBank = indicatorBank
+                backtester.moving_average_test()
+                results.append((get_trades(backtester), backtester.equityCurve.tolist()))
+            self.assertEqual(results[0], results[1], configuration)
+        self.assertEqual(bank.hits, 3)
+
+    def test_indicators_do_not_depend_on_cache(self):
+        rows = get_random_rows(300)
+        configuration = dict(lossStrategy=TRAILING_LOSS, lossPercentage=2, options=[Option('ema', 'close', 5, 13)],
+                             stoicOptions=[6, 9, 3], startDate=datetime(2020, 1, 3))
+        sharedCache = IndicatorCache()
+        results = []
+        for indicatorCache in (sharedCache, IndicatorCache(maxSize=1), sharedCache):
+            backtester = Backtester(startingBalance=1000, data=rows, symbol='TEST', **configuration)
+            backtester.indicatorCache = indicatorCache
+            backtester.moving_average_test(precompute=False)
+            results.append(get_trades(backtester))
+        self.assertGreater(len(results[0]), 0)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+        self.assertGreater(sharedCache.get_hit_ratio(), 0.5)  # Second backtest of the same data reused the first's.
+
+        otherRows = get_random_rows(300)
+        otherRows[-1]['close'] += 1
+        other = Backtester(startingBalance=1000, data=otherRows, symbol='TEST', **configuration)
+        self.assertNotEqual(other.get_cache_symbol(), backtester.get_cache_symbol())
+
+    def test_vectorized_helpers(self):
+        mask = np.array([False, True, False, False, True, False])
+        self.assertEqual(Backtester.get_next_indexes(mask).tolist(), [1, 1, 4, 4, 4, 6])
+
+        prices = np.arange(1000, dtype=float)
+        self.assertEqual(Backtester.find_stop_index(prices, 10, 999, 700.5, long=False), 701)
+        self.assertEqual(Backtester.find_stop_index(prices, 10, 500, 700.5, long=False), 1000)
+        self.assertEqual(Backtester.find_stop_index(prices[::-1], 0, 999, 0.5, long=True), 999)
+
+        values = np.array([0.125, 2.675, 1.005, -0.125, 3.14159, np.nan])
+        self.assertTrue(np.array_equal(Backtester.round_series(values), [round(value, 2) for value in values.tolist()],
+                                       equal_nan=True))
+
+    def test_vectorized_fallback(self):
+        backtester = Backtester(startingBalance=1000, data=get_rows(200), lossStrategy=CUSTOM_LOSS, lossPercentage=5,
+                                options=[Option('sma', 'close', 3, 7)], symbol='TEST')
+        self.assertFalse(backtester.is_vectorizable())
+        backtester.lossStrategy = TRAILING_LOSS
+        self.assertTrue(backtester.is_vectorizable())
+
+    def test_ema_series(self):
+        backtester = Backtester(startingBalance=1000, data=get_rows(60), lossStrategy=STOP_LOSS, lossPercentage=5,
+                                options=[Option('ema', 'close', 4, 10)], symbol='TEST')
+        periods = list(backtester.data[:backtester.minPeriod])
+        seenData = PeriodWindow(periods)
+        values = backtester.data['close'].tolist()
+        emas = Backtester.get_ema_series(values, 10, backtester.minPeriod)
+        for index, period in enumerate(backtester.data[backtester.minPeriod:]):
+            seenData.append(period)
+            self.assertEqual(backtester.get_ema(seenData, 10, 'close', round_value=False), emas[index])
+
+        # Same EMAs as Data's, which are seeded with the SMA and stepped with the price of every period.
+        self.assertTrue(np.allclose(emas, indicators.ema(values, 10)[backtester.minPeriod:]))
+        self.assertTrue(np.allclose(Backtester.get_ema_series(values, 2, 2), indicators.ema(values, 2, 2)[2:]))
+
+
+if __name__ == '__main__':
+    unittest.main()
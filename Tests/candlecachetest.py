@@ -0,0 +1,98 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import database
+import numpy as np
+
+from contextlib import closing
+from candles import CandleStore
+from candlecache import CandleCache, HEADER_SIZE
+from candlestest import get_klines
+
+
+def is_mapped(array: np.ndarray) -> bool:
+    while isinstance(array, np.ndarray):
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.databaseFile = os.path.join(self.directory.name, 'TEST.db')
+        self.candles = CandleStore.from_klines(get_klines(100))
+        with closing(sqlite3.connect(self.databaseFile)) as connection:
+            database.create_candle_table(connection, 'data_1h')
+        database.bulk_insert(self.databaseFile, 'data_1h', database.get_candle_rows(self.candles[:80]))
+        self.cache = CandleCache(os.path.join(self.directory.name, 'TEST_data_1h.candles'))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def rebuild(self):
+        with closing(sqlite3.connect(self.databaseFile)) as connection:
+            self.cache.rebuild(connection, 'data_1h', chunkSize=30)
+            return self.cache.is_synced(connection, 'data_1h')
+
+    def test_rebuild(self):
+        self.assertFalse(self.cache.is_valid())
+        self.assertTrue(self.rebuild())
+        self.assertTrue(self.cache.is_valid())
+
+        cached = self.cache.get_candles()
+        self.assertEqual(cached.timestamps.tolist(), self.candles[:80].timestamps.tolist())
+        self.assertEqual(cached['close'].tolist(), self.candles[:80]['close'].tolist())
+        self.assertEqual(self.cache.get_latest_timestamp(), self.candles.get_timestamp(79))
+
+    def test_append(self):
+        self.rebuild()
+        self.assertFalse(self.cache.append(self.candles[70:90]))  # Overlapping candles cannot be appended.
+        self.assertTrue(self.cache.append(self.candles[80:]))
+        self.assertTrue(self.cache.is_valid())
+        self.assertEqual(self.cache.get_candles()['open'].tolist(), self.candles['open'].tolist())
+
+        with closing(sqlite3.connect(self.databaseFile)) as connection:
+            self.assertFalse(self.cache.is_synced(connection, 'data_1h'))
+
+    def test_corruption_is_detected(self):
+        self.rebuild()
+        self.assertTrue(self.cache.verify())
+        with open(self.cache.filePath, 'r+b') as f:
+            f.seek(HEADER_SIZE + 100)
+            f.write(b'\xff')
+        self.assertTrue(self.cache.is_valid())  # Loads only check the header and newest record.
+        self.assertFalse(self.cache.verify())
+
+        self.rebuild()
+        with open(self.cache.filePath, 'ab') as f:  # Interrupted append.
+            f.write(b'\0' * 10)
+        self.assertFalse(self.cache.is_valid())
+
+    def test_older_candles_are_detected(self):
+        self.rebuild()
+        with closing(sqlite3.connect(self.databaseFile)) as connection:
+            database.create_candle_table(connection, 'data_1h')
+        olderCandles = CandleStore.from_klines(get_klines(5, start=self.candles.get_timestamp(0) - 5 * 3600000))
+        database.bulk_insert(self.databaseFile, 'data_1h', database.get_candle_rows(olderCandles))
+        with closing(sqlite3.connect(self.databaseFile)) as connection:
+            self.assertFalse(self.cache.is_synced(connection, 'data_1h'))
+        self.assertTrue(self.rebuild())
+
+    def test_views_are_released_before_rewrite(self):
+        self.rebuild()
+        candles = self.cache.get_candles()[10:]
+        self.assertTrue(is_mapped(candles.columns['close']))
+        candles.reserve(len(candles))  # Like Data.release_cache_views.
+        self.assertFalse(is_mapped(candles.timestamps))
+        self.assertFalse(any(is_mapped(column) for column in candles.columns.values()))
+
+        self.assertTrue(self.cache.append(self.candles[80:]))
+        self.assertTrue(self.rebuild())
+        self.assertEqual(candles['close'].tolist(), self.candles[10:80]['close'].tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+from datetime import datetime, timezone
+from candles import CandleStore, get_kline_row, get_parameter_column
+from helpers import get_data_from_parameter
+
+
+def get_klines(count: int, start: int = 1577836800000, interval: int = 3600000) -> list:
+    return [[start + index * interval, str(index), str(index + 2), str(index - 1), str(index + 1), '10',
+             start + (index + 1) * interval - 1, '20', '30', '40', '50', '0'] for index in range(count)]
+
+
+class MyTestCase(unittest.TestCase):
+    store = CandleStore.from_klines(get_klines(48))
+
+    def test_from_klines(self):
+        self.assertEqual(len(self.store), 48)
+        self.assertEqual(self.store['close'][-1], 48)
+        self.assertEqual(self.store[0]['date_utc'], datetime(2020, 1, 1, tzinfo=timezone.utc))
+
+    def test_kline_fields(self):
+        kline = [1499040000000, '0.01634790', '0.80000000', '0.01575800', '0.01577100', '148976.11427815',
+                 1499644799999, '2434.19055334', 308, '1756.87402397', '28.46694368', '17928899.62484339']
+        store = CandleStore.from_klines([kline])
+        expected = {'open': 0.0163479, 'high': 0.8, 'low': 0.015758, 'close': 0.015771, 'volume': 148976.11427815,
+                    'quote_asset_volume': 2434.19055334, 'number_of_trades': 308,
+                    'taker_buy_base_asset': 1756.87402397, 'taker_buy_quote_asset': 28.46694368}
+        for field, value in expected.items():
+            self.assertEqual(store[field][0], value, field)
+            self.assertEqual(get_kline_row(kline)[field], value, field)
+
+        hourly = CandleStore.from_klines(get_klines(48, interval=60000)).resample(3600000)
+        self.assertEqual(hourly['quote_asset_volume'].tolist(), [20 * 48])
+        self.assertEqual(hourly['number_of_trades'].tolist(), [30 * 48])
+
+    def test_derived_parameters(self):
+        self.assertEqual(self.store['high/low'][3], (5 + 2) / 2)
+        self.assertEqual(self.store['open/close'][3], (3 + 4) / 2)
+        self.assertEqual(self.store['hlc3'][3], (5 + 2 + 4) / 3)
+        self.assertEqual(self.store['ohlc4'][3], (3 + 5 + 2 + 4) / 4)
+        self.assertEqual(get_parameter_column('high/low'), 'hl2')
+        self.assertEqual(get_parameter_column('close'), 'close')
+
+    def test_derived_columns_are_stored(self):
+        self.assertIs(self.store['high/low'], self.store['high/low'])  # Read, not averaged again.
+        self.assertEqual(self.store[3]['hl2'], 3.5)
+        self.assertEqual(self.store.resample(86400000)['oc2'][0], (0 + 24) / 2)
+
+        store = self.store[:10]
+        store.append(self.store[10])
+        self.assertEqual(store['hl2'].tolist(), self.store['hl2'][:11].tolist())
+
+    def test_data_from_parameter(self):
+        row = self.store[3]
+        self.assertEqual(get_data_from_parameter(row, 'high/low'), 3.5)
+        del row['oc2']
+        self.assertEqual(get_data_from_parameter(row, 'open/close'), 3.5)
+        self.assertRaises(KeyError, get_data_from_parameter, row, 'median')
+
+    def test_slices_are_views(self):
+        window = self.store[10:20]
+        self.assertEqual(len(window), 10)
+        self.assertTrue(window.timestamps.base is not None)
+        self.assertRaises(ValueError, self.store.__getitem__, slice(None, None, -1))
+
+    def test_between(self):
+        window = self.store.between(datetime(2020, 1, 1, 5, tzinfo=timezone.utc), datetime(2020, 1, 1, 9))
+        self.assertEqual(len(window), 5)
+        self.assertEqual(window[0]['open'], 5)
+
+    def test_from_rows_sorts(self):
+        rows = list(reversed(self.store))
+        rows[0]['date_utc'] = rows[0]['date_utc'].strftime('%m/%d/%Y %H:%M')
+        store = CandleStore.from_rows(rows)
+        self.assertTrue(store.is_ascending())
+        self.assertEqual(store.timestamps.tolist(), self.store.timestamps.tolist())
+
+    def test_append_and_find(self):
+        row = self.store[-1]
+        row['date_utc'] = datetime(2020, 1, 3, tzinfo=timezone.utc)
+        store = self.store.append_row(row)
+        self.assertEqual(len(store), 49)
+        self.assertEqual(store.find_index(store.get_timestamp(-1)), 48)
+        self.assertEqual(store.find_index(1), -1)
+
+    def test_gaps(self):
+        store = self.store[:10].concatenate(self.store[13:30]).concatenate(self.store[31:])
+        self.assertEqual(store.get_timeframe(), 3600000)
+        self.assertEqual(store.get_gaps(), [(store.get_timestamp(9) + 3600000, store.get_timestamp(10) - 3600000),
+                                            (self.store.get_timestamp(30), self.store.get_timestamp(30))])
+        self.assertEqual(self.store.get_gaps(), [])
+
+    def test_resample(self):
+        resampled = self.store.resample(4 * 3600000)
+        self.assertEqual(len(resampled), 12)
+        self.assertEqual(resampled.timestamps.tolist(), self.store.timestamps[::4].tolist())
+        self.assertEqual(resampled[1]['open'], 4)
+        self.assertEqual(resampled[1]['high'], 7 + 2)
+        self.assertEqual(resampled[1]['low'], 4 - 1)
+        self.assertEqual(resampled[1]['close'], 7 + 1)
+        self.assertEqual(resampled[1]['volume'], 40)
+        self.assertEqual(resampled[1]['taker_buy_quote_asset'], 200)
+
+        partial = self.store[:10].concatenate(self.store[11:]).resample(86400000)
+        self.assertEqual(partial['number_of_trades'].tolist(), [23 * 30, 24 * 30])
+
+    def test_append_and_pop_in_place(self):
+        store = self.store[:10]
+        view = self.store[:11]
+        row = self.store[10]
+        store.append(row)
+        self.assertEqual(len(store), 11)
+        self.assertEqual(store[-1], row)
+        self.assertEqual(store.pop(), row)
+        self.assertEqual(len(store), 10)
+
+        capacity = len(store.timestampBuffer)
+        store.extend(self.store[10:12])
+        self.assertEqual(len(store.timestampBuffer), capacity)  # Spare room is used instead of copying again.
+        store.timestamps[-1] = 0
+        self.assertEqual(view.get_timestamp(-1), self.store.get_timestamp(10))  # Parent is never overwritten.
+        self.assertEqual(self.store.get_timestamp(11), 1577836800000 + 11 * 3600000)
+
+    def test_newest_first(self):
+        self.assertEqual(self.store.get_newest_first('close')[0], 48)
+        self.assertEqual(self.store.get_newest_first('close')[47], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Benchmarks how many candles per second can be written to a candle table. Run it directly, optionally passing the
+amount of candles to benchmark with, e.g. python databasebenchmark.py 100000 1000000 5000000
+"""
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import numpy as np
+
+from contextlib import closing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'algobot'))
+
+import database  # noqa: E402
+from candles import CandleStore, CANDLE_FIELDS  # noqa: E402
+
+TABLE = 'data_1m'
+LEGACY_LIMIT = 1000000  # Row by row inserts take too long to benchmark beyond this.
+
+
+def get_candles(count: int) -> CandleStore:
+    """
+    Returns a candle store with count random 1 minute candles.
+    """
+    generator = np.random.default_rng(0)
+    timestamps = 1500000000000 + np.arange(count, dtype=np.int64) * 60000
+    return CandleStore(timestamps, {field: generator.random(count) * 10000 for field in CANDLE_FIELDS})
+
+
+def legacy_insert(databaseFile: str, candles: CandleStore):
+    """
+    Inserts candles one by one and catches duplicates one at a time like Data.dump_to_table used to.
+    """
+    query = f'INSERT INTO {TABLE} ({", ".join(database.DATABASE_FIELDS)}) VALUES ({", ".join("?" * 10)});'
+    with closing(sqlite3.connect(databaseFile)) as connection:
+        with closing(connection.cursor()) as cursor:
+            for row in database.get_candle_rows(candles):
+                try:
+                    cursor.execute(query, row)
+                except sqlite3.IntegrityError:
+                    pass
+        connection.commit()
+
+
+def bulk_insert(databaseFile: str, candles: CandleStore):
+    """
+    Inserts candles with the bulk ingestion path Data.dump_to_table uses.
+    """
+    database.bulk_insert(databaseFile, TABLE, database.get_candle_rows(candles))
+
+
+def time_insert(function, candles: CandleStore, duplicates: bool) -> float:
+    """
+    Returns seconds it took function to insert candles into a fresh database. If duplicates is true, the candles are
+    inserted into the database twice and only the second insert is timed.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        databaseFile = os.path.join(directory, 'benchmark.db')
+        with closing(sqlite3.connect(databaseFile)) as connection:
+            database.create_candle_table(connection, TABLE)
+
+        if duplicates:
+            bulk_insert(databaseFile, candles)
+
+        startTime = time.time()
+        function(databaseFile, candles)
+        return time.time() - startTime
+
+
+def main(counts: list):
+    print(f'{"Candles":>10} {"Method":>8} {"Insert":>8} {"Seconds":>9} {"Rows/s":>12}')
+    for count in counts:
+        candles = get_candles(count)
+        methods = [('bulk', bulk_insert)]
+        if count <= LEGACY_LIMIT:
+            methods.append(('legacy', legacy_insert))
+
+        for name, function in methods:
+            for duplicates in (False, True):
+                seconds = time_insert(function, candles, duplicates)
+                print(f'{count:>10} {name:>8} {"repeat" if duplicates else "new":>8} {seconds:>9.2f} '
+                      f'{count / seconds:>12,.0f}')
+
+
+if __name__ == '__main__':
+    main([int(count) for count in sys.argv[1:]] or [100000, 1000000, 5000000])
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+import database
+
+from contextlib import closing
+from databasepool import get_database_pool, close_database_pools
+
+HOUR = 3600000
+START = 1577836800000
+
+
+def get_rows(start: int, count: int) -> list:
+    """
+    Returns count candle rows an hour apart starting from index provided.
+    """
+    return [(START + HOUR * index, 1, 2, 0.5, 1.5, 1, 1, 1, 1, 1) for index in range(start, start + count)]
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'TEST.db')
+        self.pool = get_database_pool(self.path)
+        database.create_candle_table(self.pool.get_connection(), 'data_1h')
+
+    def tearDown(self):
+        close_database_pools()
+        self.directory.cleanup()
+
+    def test_shared_pool(self):
+        self.assertIs(get_database_pool(os.path.join(self.directory.name, '.', 'TEST.db')), self.pool)
+
+    def test_thread_affine_connections(self):
+        connection = self.pool.get_connection()
+        self.assertIs(self.pool.get_connection(), connection)
+
+        connections = []
+        thread = threading.Thread(target=lambda: connections.append(self.pool.get_connection()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(connections[0], connection)
+
+        thread = threading.Thread(target=self.pool.get_connection)  # Connection of finished thread is closed here.
+        thread.start()
+        thread.join()
+        self.assertEqual(len(self.pool.connections), 2)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            connections[0].execute('SELECT 1')
+
+    def test_latest_timestamp_cache(self):
+        self.assertIsNone(self.pool.get_latest_timestamp('data_1h'))
+        self.assertEqual(self.pool.insert_rows('data_1h', get_rows(0, 10)), 10)
+        self.assertEqual(self.pool.get_latest_timestamp('data_1h'), START + HOUR * 9)
+        self.assertIn('data_1h', self.pool.latestTimestamps)
+
+        thread = threading.Thread(target=lambda: self.pool.insert_rows('data_1h', get_rows(10, 5)))
+        thread.start()
+        thread.join()
+        self.assertEqual(self.pool.get_latest_timestamp('data_1h'), START + HOUR * 14)
+
+        with closing(sqlite3.connect(self.path)) as connection:  # Writes outside the pool are detected as well.
+            database.insert_rows(connection, 'data_1h', get_rows(15, 1))
+        self.assertEqual(self.pool.get_latest_timestamp('data_1h'), START + HOUR * 15)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import database
+
+from contextlib import closing
+from datetime import datetime, timedelta
+from unittest import mock
+
+LEGACY_TABLE_QUERY = '''CREATE TABLE {}(
+                        date_utc TEXT PRIMARY KEY, open_price TEXT NOT NULL, high_price TEXT NOT NULL,
+                        low_price TEXT NOT NULL, close_price TEXT NOT NULL, volume TEXT NOT NULL,
+                        quote_asset_volume TEXT NOT NULL, number_of_trades TEXT NOT NULL,
+                        taker_buy_base_asset TEXT NOT NULL, taker_buy_quote_asset TEXT NOT NULL);'''
+
+
+def create_legacy_database(path: str, table: str = 'data_1h', count: int = 250) -> list:
+    """
+    Creates a database with the legacy text schema and returns the rows inserted.
+    """
+    start = datetime(2020, 1, 1)
+    rows = [((start + timedelta(hours=index)).strftime('%Y-%m-%d %H:%M:%S'), str(index + 0.5), str(index + 1),
+             str(index), str(index + 0.25), '1.5', '2.5', str(index * 3), '3.5', '4.5') for index in range(count)]
+    with closing(sqlite3.connect(path)) as connection:
+        connection.execute(LEGACY_TABLE_QUERY.format(table))
+        connection.executemany(f'INSERT INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        connection.commit()
+    return rows
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'TEST.db')
+        self.rows = create_legacy_database(self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assert_migrated(self, connection):
+        self.assertEqual(database.get_schema_version(connection), database.SCHEMA_VERSION)
+        self.assertEqual(database.get_candle_tables(connection), ['data_1h'])
+        self.assertFalse(database.is_legacy_table(connection, 'data_1h'))
+
+        migrated = connection.execute('SELECT * FROM data_1h ORDER BY timestamp_utc').fetchall()
+        self.assertEqual(len(migrated), len(self.rows))
+        self.assertEqual(migrated[0], (1577836800000, 0.5, 1.0, 0.0, 0.25, 1.5, 2.5, 0, 3.5, 4.5))
+        self.assertEqual(migrated[-1][0] - migrated[-2][0], 3600000)
+        self.assertEqual(migrated[-1][7], 249 * 3)
+
+    def test_migration(self):
+        with closing(sqlite3.connect(self.path)) as connection:
+            self.assertEqual(database.get_schema_version(connection), 0)
+            self.assertEqual(database.migrate_database(connection, chunkSize=40), ['data_1h'])
+            self.assert_migrated(connection)
+            self.assertEqual(database.migrate_database(connection), [])
+
+    def test_resumes_interrupted_copy(self):
+        with closing(sqlite3.connect(self.path)) as connection:
+            with mock.patch('database.finish_migration'):  # Stop right before the legacy table is replaced.
+                database.migrate_legacy_table(connection, 'data_1h', chunkSize=100)
+            connection.execute('DELETE FROM data_1h_migration WHERE timestamp_utc > 1578000000000')
+            connection.commit()
+
+            self.assertEqual(database.migrate_database(connection, chunkSize=30), ['data_1h'])
+            self.assert_migrated(connection)
+
+    def test_resumes_unfinished_rename(self):
+        with closing(sqlite3.connect(self.path)) as connection:
+            database.create_candle_table(connection, 'data_1h_migration')
+            connection.execute('''INSERT INTO data_1h_migration SELECT CAST(strftime('%s', date_utc) AS INTEGER) * 1000,
+                                  open_price, high_price, low_price, close_price, volume, quote_asset_volume,
+                                  number_of_trades, taker_buy_base_asset, taker_buy_quote_asset FROM data_1h''')
+            connection.execute('DROP TABLE data_1h')
+            connection.commit()
+
+            self.assertEqual(database.migrate_database(connection), ['data_1h'])
+            self.assert_migrated(connection)
+
+    def test_candle_rows_between(self):
+        with closing(sqlite3.connect(self.path)) as connection:
+            database.migrate_database(connection)
+            table = 'data_1h'
+            start = 1577836800000
+
+            rows = database.get_candle_rows_between(connection, table)
+            self.assertEqual(len(rows), len(self.rows))
+
+            rows = database.get_candle_rows_between(connection, table, start + 3600000 * 10, start + 3600000 * 19)
+            self.assertEqual([row[0] for row in rows], [start + 3600000 * index for index in range(10, 20)])
+
+            rows = database.get_candle_rows_between(connection, table, limit=5)
+            self.assertEqual([row[0] for row in rows], [start + 3600000 * index for index in range(245, 250)])
+
+            rows = database.get_candle_rows_between(connection, table, endTimestamp=start + 3600000 * 2, limit=5)
+            self.assertEqual([row[0] for row in rows], [start, start + 3600000, start + 3600000 * 2])
+
+    def test_gap_map(self):
+        hour = 3600000
+        start = 1577836800000
+        with closing(sqlite3.connect(self.path)) as connection:
+            database.migrate_database(connection)
+            connection.execute('DELETE FROM data_1h WHERE timestamp_utc BETWEEN ? AND ?', (start + hour * 5,
+                                                                                      start + hour * 7))
+            connection.commit()
+            self.assertEqual(database.scan_gaps(connection, 'data_1h', hour, chunkSize=4), 1)
+            self.assertEqual(database.scan_gaps(connection, 'data_1h', hour), 0)  # Nothing new to scan.
+
+            connection.execute('INSERT INTO data_1h VALUES (?, 1, 1, 1, 1, 1, 1, 1, 1, 1)', (start + hour * 252,))
+            connection.commit()
+            self.assertEqual(database.scan_gaps(connection, 'data_1h', hour), 1)
+            self.assertEqual(database.get_gaps(connection, 'data_1h'), [
+                (start + hour * 5, start + hour * 7, database.GAP_MISSING),
+                (start + hour * 250, start + hour * 251, database.GAP_MISSING),
+            ])
+
+            connection.execute('INSERT INTO data_1h VALUES (?, 1, 1, 1, 1, 1, 1, 1, 1, 1)', (start + hour * 5,))
+            connection.commit()
+            remaining = database.update_gap(connection, 'data_1h', hour, start + hour * 5, start + hour * 7,
+                                            database.GAP_UNAVAILABLE)
+            self.assertEqual(remaining, [(start + hour * 6, start + hour * 7)])
+            self.assertEqual(database.get_gaps(connection, 'data_1h', status=database.GAP_UNAVAILABLE),
+                             [(start + hour * 6, start + hour * 7, database.GAP_UNAVAILABLE)])
+
+    def test_resample_table(self):
+        hour = 3600000
+        with closing(sqlite3.connect(self.path)) as connection:
+            database.migrate_database(connection)
+            database.create_candle_table(connection, 'data_1d')
+            connection.execute('DELETE FROM data_1h WHERE timestamp_utc >= ?', (1577836800000 + hour * 100,))
+            connection.commit()
+            self.assertEqual(database.resample_table(connection, 'data_1h', hour, 'data_1d', hour * 24, chunkSize=2), 4)
+
+            database.bulk_insert(self.path, 'data_1h', [(1577836800000 + hour * index, index, index + 1, index, index,
+                                                         1, 1, 1, 1, 1) for index in range(100, 250)])
+            self.assertEqual(database.resample_table(connection, 'data_1h', hour, 'data_1d', hour * 24), 6)
+            self.assertEqual(database.resample_table(connection, 'data_1h', hour, 'data_1d', hour * 24), 0)
+
+            days = connection.execute('SELECT * FROM data_1d ORDER BY timestamp_utc').fetchall()
+            self.assertEqual([day[0] for day in days], [1577836800000 + hour * 24 * index for index in range(10)])
+            self.assertEqual(days[4][1:5], (96.5, 120.0, 96.0, 119.0))
+            self.assertEqual(days[4][7], 96 * 3 + 97 * 3 + 98 * 3 + 99 * 3 + 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
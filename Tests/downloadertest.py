@@ -0,0 +1,192 @@
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+import unittest
+import database
+import downloader
+
+from data import Data
+from unittest import mock
+from contextlib import closing
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from binance.client import Client
+
+TIMEFRAME = 60000
+COUNT = 12345  # Candles the stand-in exchange has. The newest one closed right before the tests started.
+START = int(time.time() * 1000) // TIMEFRAME * TIMEFRAME - COUNT * TIMEFRAME
+OUTAGE = range(6000, 6010)  # Candles the stand-in exchange does not have, like during an exchange outage.
+TIMESTAMPS = [START + index * TIMEFRAME for index in range(COUNT) if index not in OUTAGE]
+
+
+class KlineHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for the Binance endpoints used by Data, serving COUNT one minute candles of BTCUSDT.
+    """
+    requests = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.endswith('/ping'):
+            body = {}
+        elif url.path.endswith('/ticker/allPrices'):
+            body = [{'symbol': 'BTCUSDT', 'price': '1'}]
+        elif url.path.endswith('/klines'):
+            query = parse_qs(url.query)
+            limit = int(query['limit'][0])
+            start = max(int(query['startTime'][0]), START)
+            end = int(query['endTime'][0]) if 'endTime' in query else START + COUNT * TIMEFRAME
+            first = -(-(start - START) // TIMEFRAME)
+            last = min((end - START) // TIMEFRAME, COUNT - 1)
+            body = [[START + index * TIMEFRAME, str(index), '0', '0', '0', '0', START + (index + 1) * TIMEFRAME - 1,
+                     '0', 0, '0', '0', '0'] for index in range(first, min(last + 1, first + limit))
+                    if index not in OUTAGE]
+            KlineHandler.requests.append(threading.get_ident())
+            time.sleep(0.01)
+        else:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class KlineServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MyTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = KlineServer(('127.0.0.1', 0), KlineHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+        class LocalClient(Client):
+            API_URL = f'http://127.0.0.1:{cls.server.server_address[1]}/api'
+
+        cls.LocalClient = LocalClient
+        cls.client = LocalClient()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def download(self, **kwargs) -> list:
+        klines = []
+        for chunk in downloader.stream_klines(self.client.get_klines, 'BTCUSDT', '1m', START,
+                                              START + (COUNT + 10) * TIMEFRAME, TIMEFRAME, limit=1000,
+                                              budget=downloader.RequestBudget(), **kwargs):
+            klines += chunk
+        return klines
+
+    def test_chunks(self):
+        chunks = downloader.get_chunks(0, 2500, 1, 1000)
+        self.assertEqual(chunks, [(0, 999), (1000, 1999), (2000, 2500)])
+
+    def test_download_is_complete_and_ordered(self):
+        klines = self.download(workers=4)
+        self.assertEqual([kline[0] for kline in klines], TIMESTAMPS)
+
+    def test_cancellation(self):
+        KlineHandler.requests = []
+        cancelled = []
+        klines = []
+        for chunk in downloader.stream_klines(self.client.get_klines, 'BTCUSDT', '1m', START,
+                                              START + COUNT * TIMEFRAME, TIMEFRAME, limit=1000, workers=2,
+                                              budget=downloader.RequestBudget(), cancelled=lambda: bool(cancelled)):
+            klines += chunk
+            cancelled.append(True)
+        self.assertEqual(len(klines), 1000)
+        self.assertLess(len(KlineHandler.requests), 13)
+
+    def test_resumes_canceled_download(self):
+        class Progress:
+            def __init__(self, data, cancelAfter=None):
+                self.data = data
+                self.cancelAfter = cancelAfter
+                self.messages = []
+
+            def emit(self, progress, message, caller):
+                self.messages.append(message)
+                if len(self.messages) == self.cancelAfter:
+                    self.data.downloadLoop = False  # Cancel like DownloadThread.stop does.
+
+        with tempfile.TemporaryDirectory() as directory, mock.patch('data.ROOT_DIR', directory), \
+                mock.patch('data.Client', self.LocalClient):
+            data = Data(interval='1m', loadData=False)
+            progress = Progress(data, cancelAfter=3)
+            self.assertEqual(data.custom_get_new_data(progress_callback=progress, workers=2), [])
+            self.assertEqual(progress.messages[-1], 'Download canceled. Downloaded data was saved.')
+
+            with closing(sqlite3.connect(data.databaseFile)) as connection:
+                saved = connection.execute('SELECT COUNT(*), MAX(timestamp_utc) FROM data_1m').fetchone()
+            self.assertEqual(saved, (3000, START + 2999 * TIMEFRAME))
+
+            KlineHandler.requests = []
+            data = Data(interval='1m', updateData=False)
+            self.assertEqual(len(data.data), 3000)
+            data.custom_get_new_data(progress_callback=Progress(data), removeFirst=True)
+            self.assertEqual(data.data.timestamps.tolist(), TIMESTAMPS)
+            self.assertLessEqual(len(KlineHandler.requests), 10)  # Only the rest of the range is requested again.
+
+    def test_backfills_gaps(self):
+        with tempfile.TemporaryDirectory() as directory, mock.patch('data.ROOT_DIR', directory), \
+                mock.patch('data.Client', self.LocalClient):
+            data = Data(interval='1m', loadData=False)
+            data.custom_get_new_data(progress_callback=mock.Mock(), removeFirst=True)
+            with closing(sqlite3.connect(data.databaseFile)) as connection:
+                connection.execute('DELETE FROM data_1m WHERE timestamp_utc BETWEEN ? AND ?',
+                                   (START + 100 * TIMEFRAME, START + 199 * TIMEFRAME))
+                connection.execute('DELETE FROM data_1m WHERE timestamp_utc = ?', (START + 2000 * TIMEFRAME,))
+                connection.commit()
+
+            data.get_data_from_database()
+            self.assertFalse(data.verify_integrity())
+            self.assertEqual(data.backfill_gaps(), 101)
+            data.get_data_from_database()
+            self.assertEqual(data.data.timestamps.tolist(), TIMESTAMPS)
+            self.assertTrue(data.verify_integrity())  # Outage is known to be unavailable, so it is not missing data.
+
+            outage = (START + OUTAGE[0] * TIMEFRAME, START + OUTAGE[-1] * TIMEFRAME)
+            self.assertEqual(data.get_gap_map(), [outage + (database.GAP_UNAVAILABLE,)])
+
+            KlineHandler.requests = []
+            self.assertEqual(data.backfill_gaps(), 0)
+            self.assertEqual(KlineHandler.requests, [])  # Unavailable ranges are never downloaded again.
+
+    def test_serves_coarser_interval_from_local_data(self):
+        with tempfile.TemporaryDirectory() as directory, mock.patch('data.ROOT_DIR', directory), \
+                mock.patch('data.Client', self.LocalClient):
+            Data(interval='1m', loadData=False).custom_get_new_data(progress_callback=mock.Mock(), removeFirst=True)
+
+            KlineHandler.requests = []
+            data = Data(interval='1h', updateData=False)
+            self.assertEqual(KlineHandler.requests, [])
+            hours = list(range(-(-START // 3600000) * 3600000, (TIMESTAMPS[-1] + TIMEFRAME) // 3600000 * 3600000,
+                               3600000))  # Hours that closed and are not partially before the first minute.
+            self.assertEqual(data.data.timestamps.tolist(), hours)
+            self.assertEqual(data.data['open'][0], (data.data.get_timestamp(0) - START) // TIMEFRAME)
+
+    def test_request_budget(self):
+        budget = downloader.RequestBudget(weight=10, period=0.2)
+        startTime = time.monotonic()
+        for _ in range(4):
+            self.assertTrue(budget.acquire(5))
+        self.assertGreaterEqual(time.monotonic() - startTime, 0.2)
+
+        exhausted = downloader.RequestBudget(weight=5, period=60)
+        exhausted.acquire(5)
+        self.assertFalse(exhausted.acquire(5, cancelled=lambda: True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from indicatorbank import CENTS_SENTINEL, IndicatorBank, decode_series, encode_series
+
+
+class MyTestCase(unittest.TestCase):
+    def test_encode_cents(self):
+        values = np.array([np.nan, np.nan, 101.25, 99.99, -0.07, 0])
+        encoded = encode_series(values)
+        self.assertEqual(encoded.dtype, np.int32)
+        self.assertEqual(encoded[0], CENTS_SENTINEL)
+        self.assertTrue(np.array_equal(decode_series(encoded), values, equal_nan=True))
+
+    def test_encode_other_values(self):
+        for values in (np.array([1.005, 2.5]), np.array([1.5, np.inf]), np.array([3e7, 1.0])):
+            encoded = encode_series(values)
+            self.assertEqual(encoded.dtype, np.float64)
+            self.assertTrue(np.array_equal(decode_series(encoded), values))
+
+    def test_get_series(self):
+        bank = IndicatorBank()
+        calls = []
+        calculate = lambda: calls.append(1) or np.array([1.25, 2.5])  # noqa: E731
+        self.assertEqual(bank.get_series(('sma', 5), calculate).tolist(), [1.25, 2.5])
+        self.assertEqual(bank.get_series(('sma', 5), calculate).tolist(), [1.25, 2.5])
+        self.assertEqual((len(calls), bank.hits, bank.misses), (1, 1, 1))
+
+    def test_spill(self):
+        directory = tempfile.mkdtemp()
+        try:
+            bank = IndicatorBank(maxMemory=100 * 4, spillDirectory=directory)
+            series = [np.arange(100) + index for index in range(3)]
+            for index, values in enumerate(series):
+                bank.set(index, values)
+            self.assertEqual(list(bank.entries), [2])
+            self.assertEqual(sorted(bank.spilled), [0, 1])
+            for index, values in enumerate(series):
+                self.assertTrue(np.array_equal(bank.get(index), values))
+
+            bank.clear()
+            self.assertEqual(os.listdir(directory), [])
+            self.assertIsNone(bank.get(0))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_drop_without_spill_directory(self):
+        bank = IndicatorBank(maxMemory=100 * 4)
+        bank.set('old', np.arange(100))
+        bank.set('new', np.arange(100))
+        self.assertIsNone(bank.get('old'))
+        self.assertEqual(bank.get('new').tolist(), list(range(100)))
+        self.assertEqual(bank.memory, 100 * 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+from indicatorcache import IndicatorCache, get_indicator_cache
+
+
+def get_key(timestamp: int, symbol: str = 'BTCUSDT', interval: str = '1h') -> tuple:
+    return symbol, interval, 'ema', 10, 'close', timestamp
+
+
+class MyTestCase(unittest.TestCase):
+    def test_least_recently_used_eviction(self):
+        cache = IndicatorCache(maxSize=3)
+        for timestamp in range(3):
+            cache.set(get_key(timestamp), timestamp * 10)
+
+        self.assertEqual(cache.get(get_key(0)), 0)  # Oldest value becomes the most recently used one.
+        cache.set(get_key(3), 30)
+        self.assertIsNone(cache.get(get_key(1)))
+        self.assertEqual(cache.get(get_key(2)), 20)
+        self.assertEqual(cache.get(get_key(0)), 0)
+        self.assertEqual((cache.hits, cache.misses, cache.evictions), (3, 1, 1))
+        self.assertEqual(cache.get_hit_ratio(), 0.75)
+
+    def test_invalidate(self):
+        cache = IndicatorCache()
+        for timestamp in range(5):
+            cache.set(get_key(timestamp), timestamp)
+            cache.set(get_key(timestamp, interval='1m'), timestamp)
+
+        cache.invalidate('BTCUSDT', '1h', 3)
+        self.assertEqual([cache.get(get_key(timestamp)) for timestamp in range(5)], [0, 1, 2, None, None])
+        self.assertEqual(cache.get(get_key(4, interval='1m')), 4)
+
+        cache.set(get_key(3), 3)  # Values of appended periods are cached again.
+        self.assertEqual(cache.get(get_key(3)), 3)
+        cache.invalidate('BTCUSDT', '1h')
+        self.assertEqual(len(cache.entries), 5)
+
+    def test_shared_cache(self):
+        self.assertIs(get_indicator_cache(), get_indicator_cache())
+
+    def test_forgotten_series(self):
+        cache = IndicatorCache(maxSize=2)
+        cache.set(get_key(0, symbol='ETHUSDT'), 0)
+        for timestamp in range(3):
+            cache.set(get_key(timestamp), timestamp)
+        self.assertEqual(list(cache.latestTimestamps), [('BTCUSDT', '1h')])  # Evicted series are forgotten.
+        self.assertEqual(cache.seriesSizes, {('BTCUSDT', '1h'): 2})
+
+        cache.invalidate('BTCUSDT', '1h', 1)
+        self.assertEqual((cache.latestTimestamps, cache.seriesSizes), ({}, {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
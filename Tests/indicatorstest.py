@@ -0,0 +1,156 @@
+import random
+import unittest
+import indicators
+import numpy as np
+
+from data import Data
+from enums import BEARISH, BULLISH
+from unittest import mock
+from candles import CandleStore
+from indicators import RollingExtrema, RunningSMA, RunningWMA, RunningRSI, StoicIndicator
+
+
+def get_sma(values: list, prices: int) -> float:
+    return float(np.sum(values[-prices:])) / prices
+
+
+def get_wma(values: list, prices: int) -> float:
+    window = values[-prices:]
+    weights = np.arange(prices - len(window) + 1, prices + 1)
+    return float(np.dot(window, weights)) / (prices * (prices + 1) / 2)
+
+
+def get_stoic_trend(stoicDictionary: dict, valuesOne: list, valuesTwo: list, input3: int) -> int or None:
+    for key, value in (('seneca', max(valuesOne) - min(valuesOne)), ('zeno', valuesOne[0] - min(valuesOne)),
+                       ('gaius', valuesTwo[0] - min(valuesTwo)), ('philo', max(valuesTwo) - min(valuesTwo))):
+        stoicDictionary.setdefault(key, []).insert(0, value)
+    if len(stoicDictionary['gaius']) < 3:
+        return None
+
+    hadot = sum(stoicDictionary['gaius'][:3]) / sum(stoicDictionary['philo'][:3]) * 100
+    stoicDictionary.setdefault('hadot', []).insert(0, hadot)
+    if len(stoicDictionary['hadot']) < 3:
+        return None
+
+    stoic = sum(stoicDictionary['zeno'][:3]) / sum(stoicDictionary['seneca'][:3]) * 100
+    marcus = sum(stoicDictionary['hadot'][:input3]) / input3
+    return BEARISH if marcus > stoic else BULLISH if marcus < stoic else None
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self):
+        random.seed(14)
+        self.values = [100 + random.uniform(-5, 5) for _ in range(300)]
+
+    def assert_matches(self, runningClass, function, prices: int):
+        runningAverage = runningClass(prices)
+        runningAverage.reset(self.values[:3])  # Starts with fewer values than the window holds.
+        closedValues = self.values[:3]
+        for value in self.values[3:]:
+            current = value + 0.5
+            self.assertAlmostEqual(runningAverage.get_closed(), function(closedValues, prices), places=9)
+            self.assertAlmostEqual(runningAverage.get_provisional(current),
+                                   function(closedValues[-(prices - 1):] + [current] if prices > 1 else [current],
+                                            prices), places=9)
+            runningAverage.push(value)
+            closedValues.append(value)
+
+    def test_running_sma(self):
+        for prices in (1, 2, 10, 50):
+            self.assert_matches(RunningSMA, get_sma, prices)
+
+    def test_running_wma(self):
+        for prices in (1, 2, 10, 50):
+            self.assert_matches(RunningWMA, get_wma, prices)
+
+    def test_resync(self):
+        with mock.patch.object(indicators, 'RESYNC_PERIODS', 7):
+            self.assert_matches(RunningWMA, get_wma, 5)
+
+    def test_running_rsi(self):
+        for prices in (2, 14):
+            indexes = indicators.rsi(np.array(self.values), prices)
+            runningRsi = RunningRSI(prices, historySize=20)
+            runningRsi.reset(self.values[:50])
+            for index in range(50, len(self.values)):
+                for shift in range(20):
+                    self.assertAlmostEqual(runningRsi.get_closed(shift), indexes[index - 1 - shift], places=9)
+                self.assertAlmostEqual(runningRsi.get_provisional(self.values[index]), indexes[index], places=9)
+                runningRsi.push(self.values[index])
+            self.assertEqual(len(runningRsi.history), 20)
+
+    def test_rolling_extrema(self):
+        for size in (1, 3, 20):
+            extrema = RollingExtrema(size)
+            for index, value in enumerate(self.values):
+                window = self.values[max(index - size + 1, 0):index + 1]
+                extrema.push(value)
+                self.assertEqual(extrema.get_max(0), max(window + [0]))
+                self.assertEqual(extrema.get_min(200), min(window + [200]))
+
+    def test_stoic_indicator(self):
+        rsiValues = [50 + value - 100 for value in self.values[:200]] + [70 + index for index in range(30)]
+        for input1, input2, input3 in ((10, 15, 5), (20, 7, 1), (4, 5, 9)):
+            stoicIndicator = StoicIndicator(input1, input2, input3)
+            stoicDictionary = {}
+            trends = []
+            for index in range(max(input1, input2), len(rsiValues)):
+                if index == max(input1, input2):
+                    for value in rsiValues[:index]:
+                        stoicIndicator.push_closed(value, value)
+                expected = get_stoic_trend(stoicDictionary, rsiValues[index - input1 + 1:index + 1][::-1],
+                                           rsiValues[index - input2 + 1:index + 1][::-1], input3)
+                trends.append(stoicIndicator.update(rsiValues[index], rsiValues[index]))
+                self.assertEqual(trends[-1], expected)
+                stoicIndicator.push_closed(rsiValues[index], rsiValues[index])
+            self.assertIsNone(trends[-1])  # Steady rise ties stoic and marcus exactly.
+            self.assertEqual(len(stoicIndicator.hadot.window), input3)
+
+    def test_average_series(self):
+        for prices in (1, 2, 10, 50):
+            for function, series in ((get_sma, indicators.sma), (get_wma, indicators.wma)):
+                averages = series(np.array(self.values), prices)
+                self.assertTrue(np.isnan(averages[:prices - 1]).all())
+                for index in range(prices - 1, len(self.values)):
+                    self.assertAlmostEqual(averages[index], function(self.values[:index + 1], prices), places=9)
+
+    def test_ema_series(self):
+        for prices, smaPrices in ((1, 5), (10, 5), (50, 3)):
+            averages = indicators.ema(np.array(self.values), prices, smaPrices)
+            self.assertTrue(np.isnan(averages[:smaPrices - 1]).all())
+            expected = sum(self.values[:smaPrices]) / smaPrices
+            self.assertAlmostEqual(averages[smaPrices - 1], expected, places=9)
+            for index in range(smaPrices, len(self.values)):
+                expected = self.values[index] * 2 / (prices + 1) + expected * (1 - 2 / (prices + 1))
+                self.assertAlmostEqual(averages[index], expected, places=9)
+
+    def test_rsi_series(self):
+        for prices in (2, 14, 100):
+            indexes = indicators.rsi(np.array(self.values), prices)
+            self.assertTrue(np.isnan(indexes[0]))
+            for index in range(1, len(self.values)):
+                differences = np.diff(self.values[:index + 1])
+                ups = [0] + np.where(differences > 0, differences, 0).tolist()
+                downs = [0] + np.where(differences > 0, 0, -differences).tolist()
+                averageUp, averageDown = Data.helper_get_ema(ups, downs, prices)
+                if averageDown == 0:  # Only rising values so far.
+                    self.assertEqual(indexes[index], 100)
+                    continue
+                self.assertAlmostEqual(indexes[index], 100 - 100 / (1 + averageUp / averageDown), places=9)
+
+    def test_derived_parameter_series(self):
+        klines = [[index * 60000, str(value), str(value + 2), str(value - 1), str(value + 1), '1',
+                   index * 60000 + 59999, '1', 1, '1', '1', '0'] for index, value in enumerate(self.values)]
+        candles = CandleStore.from_klines(klines)
+        for parameter in ('high/low', 'open/close'):
+            column = candles.get_column(parameter)
+            for average in ('SMA', 'WMA', 'EMA'):
+                series = indicators.get_moving_average_series(candles, average, 10, parameter)
+                expected = getattr(indicators, average.lower())(column, 10)
+                self.assertTrue(np.array_equal(series, expected, equal_nan=True))
+        with self.assertRaises(ValueError):
+            indicators.get_moving_average_series(candles, 'HMA', 10, 'close')
+
+
+if __name__ == '__main__':
+    unittest.main()
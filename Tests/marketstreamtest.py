@@ -0,0 +1,165 @@
+import json
+import time
+import tempfile
+import unittest
+
+from data import Data
+from unittest import mock
+from candles import CandleStore
+from autobahn.twisted.websocket import WebSocketServerFactory, WebSocketServerProtocol
+from binance.websockets import BinanceSocketManager
+from twisted.internet import reactor, threads
+
+TIMEFRAME = 60000
+COUNT = 30  # Recorded candles. The newest one is the period in progress when the tests run.
+START = int(time.time() * 1000) // TIMEFRAME * TIMEFRAME - (COUNT - 1) * TIMEFRAME
+RECORDED = [[START + index * TIMEFRAME, str(index), str(index + 2), str(index - 1), str(index + 1), '10',
+             START + (index + 1) * TIMEFRAME - 1, '20', 30, '40', '50', '0'] for index in range(COUNT)]
+REPLAYS = (range(18, 23), range(26, 30))  # Candles replayed per connection. The stand-in drops the first connection.
+PRICE = 123.45
+
+
+def get_kline_message(kline: list, closed: bool) -> dict:
+    """
+    Returns combined stream kline message of recorded kline provided.
+    """
+    fields = ('t', 'o', 'h', 'l', 'c', 'v', 'T', 'q', 'n', 'V', 'Q', 'B')
+    data = dict(zip(fields, kline))
+    data.update({'s': 'BTCUSDT', 'i': '1m', 'x': closed})
+    return {'stream': 'btcusdt@kline_1m', 'data': {'e': 'kline', 'E': kline[0], 's': 'BTCUSDT', 'k': data}}
+
+
+class ReplayProtocol(WebSocketServerProtocol):
+    """
+    Stand-in for Binance's combined stream endpoint, replaying recorded candles as kline and ticker messages.
+    """
+    connections = []
+
+    def onOpen(self):
+        ReplayProtocol.connections.append(self.http_request_path)
+        replay = REPLAYS[min(len(ReplayProtocol.connections), len(REPLAYS)) - 1]
+        for index in replay:
+            self.send(get_kline_message(RECORDED[index], closed=False))
+            if index < COUNT - 1:
+                self.send(get_kline_message(RECORDED[index], closed=True))
+        self.send_ticker()
+
+        if len(ReplayProtocol.connections) == 1:
+            self.transport.loseConnection()  # Sends replayed messages, then drops the connection.
+
+    def send_ticker(self):
+        """
+        Sends ticker message and schedules the next one, like Binance pushing ticker updates every second.
+        """
+        self.send({'stream': 'btcusdt@ticker', 'data': {'e': '24hrTicker', 's': 'BTCUSDT', 'c': str(PRICE)}})
+        self.keepAlive = reactor.callLater(0.2, self.send_ticker)
+
+    def onClose(self, wasClean, code, reason):
+        keepAlive = getattr(self, 'keepAlive', None)
+        if keepAlive is not None and keepAlive.active():
+            keepAlive.cancel()
+
+    def send(self, message: dict):
+        self.sendMessage(json.dumps(message).encode())
+
+
+class RecordedClient:
+    """
+    Stand-in for the REST client, serving recorded candles and failing on per-tick requests.
+    """
+    def __init__(self, *args, **kwargs):
+        self.requests = []
+
+    @staticmethod
+    def get_all_tickers():
+        return [{'symbol': 'BTCUSDT', 'price': str(PRICE)}]
+
+    def get_klines(self, symbol, interval, startTime, endTime, limit=500):
+        self.requests.append((startTime, endTime))
+        return [kline for kline in RECORDED if startTime <= kline[0] <= endTime][:limit]
+
+    def get_symbol_ticker(self, symbol):
+        raise AssertionError("Price should be read from the market stream.")
+
+
+class MyTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.socketManager = BinanceSocketManager(None)
+        cls.socketManager.daemon = True
+        cls.socketManager.start()
+
+        factory = WebSocketServerFactory()
+        factory.protocol = ReplayProtocol
+        cls.port = threads.blockingCallFromThread(reactor, reactor.listenTCP, 0, factory, interface='127.0.0.1')
+        cls.socketManager.STREAM_URL = f'ws://127.0.0.1:{cls.port.getHost().port}/'
+
+    @classmethod
+    def tearDownClass(cls):
+        threads.blockingCallFromThread(reactor, cls.port.stopListening)
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def wait_for_stream(self, data: Data):
+        for _ in range(100):
+            if data.marketStream.get_current_kline(RECORDED[-1][0]) is not None:
+                return
+            time.sleep(0.05)
+        self.fail("Stream did not replay recorded candles.")
+
+    def test_reads_current_data_from_stream(self):
+        with mock.patch('data.Client', RecordedClient), mock.patch('data.ROOT_DIR', self.directory.name):
+            data = Data(interval='1m', loadData=False)
+            data.data = CandleStore.from_klines(RECORDED[:20])
+            data.start_stream(self.socketManager)
+            self.wait_for_stream(data)
+
+            self.assertEqual(ReplayProtocol.connections, ['/stream', '/stream'])  # Reconnected after the drop.
+            self.assertEqual(data.get_current_price(), PRICE)
+            currentData = data.get_current_data()
+            self.assertEqual(currentData['close'], COUNT)
+            self.assertEqual(data.data.timestamps.tolist(), [kline[0] for kline in RECORDED[:-1]])
+            self.assertEqual(data.data['close'].tolist(), list(range(1, COUNT)))
+
+            # Only the candles the stream missed while reconnecting were requested.
+            self.assertEqual(data.binanceClient.requests, [(RECORDED[23][0], RECORDED[25][0])])
+            self.assertEqual(data.get_current_data(), currentData)
+            self.assertEqual(len(data.binanceClient.requests), 1)
+
+            data.stop_stream()
+            self.assertIsNone(data.marketStream)
+
+    def test_snapshot_shared_within_tick(self):
+        with mock.patch('data.Client', RecordedClient), mock.patch('data.ROOT_DIR', self.directory.name):
+            data = Data(interval='1m', loadData=False, snapshotTTL=0)
+            data.data = CandleStore.from_klines(RECORDED[:-1])
+            client = data.binanceClient
+
+            with data.tick():
+                data.get_sma(5, 'close')
+                data.get_wma(5, 'close')
+                data.get_ema(5, 'close')
+                data.get_summation(5, 'close')
+                self.assertEqual(data.get_highest_high_value(5), COUNT + 1)
+                self.assertEqual(len(client.requests), 1)
+
+            with data.tick():  # Every tick starts with a fresh snapshot.
+                data.get_sma(5, 'close')
+            self.assertEqual(len(client.requests), 2)
+
+            data.get_sma(5, 'close')
+            data.get_sma(5, 'close')
+            self.assertEqual(len(client.requests), 4)  # Snapshots expire right away outside of ticks with no TTL.
+
+            data.currentSnapshot.ttl = 60  # Latest snapshot is reused until it is older than the TTL.
+            data.get_sma(5, 'close')
+            data.get_wma(5, 'close')
+            self.assertEqual(len(client.requests), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+from option import Option, get_option_plan
+from enums import BEARISH, BULLISH
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.options = [Option('SMA', 'close', 5, 20), Option('SMA', 'close', 20, 50), Option('EMA', 'close', 5, 20),
+                        Option('sma', 'close', 5, 50)]
+
+    def test_shared_nodes(self):
+        plan = get_option_plan(self.options)
+        self.assertEqual(plan.nodes, [('SMA', 'close', 5), ('SMA', 'close', 20), ('SMA', 'close', 50),
+                                      ('EMA', 'close', 5), ('EMA', 'close', 20)])
+        self.assertEqual(plan.comparisons, [(0, 1), (1, 2), (3, 4), (0, 2)])
+
+        calls = []
+        values = plan.evaluate(lambda average, parameter, prices: calls.append(prices) or prices)
+        self.assertEqual(calls, [5, 20, 50, 5, 20])
+        self.assertEqual(plan.get_averages(values), [(5, 20), (20, 50), (5, 20), (5, 50)])
+
+    def test_trend(self):
+        plan = get_option_plan(self.options)
+        self.assertEqual(plan.get_trend([3, 2, 1, 3, 2]), BULLISH)
+        self.assertEqual(plan.get_trend([1, 2, 3, 1, 2]), BEARISH)
+        self.assertIsNone(plan.get_trend([3, 2, 1, 1, 2]))
+        self.assertIsNone(plan.get_trend([2, 2, 1, 3, 2]))
+
+    def test_trends(self):
+        plan = get_option_plan(self.options)
+        values = [[3, 1, 3, 2], [2, 2, 2, 2], [1, 3, 1, 2], [3, 1, 1, 2], [2, 2, 2, 2]]
+        self.assertEqual(plan.get_trends(values, 4), [BULLISH, BEARISH, None, None])
+        self.assertEqual(plan.get_trends(values, 4)[0], plan.get_trend([value[0] for value in values]))
+
+    def test_plan_reused(self):
+        plan = get_option_plan(self.options)
+        self.assertIs(get_option_plan([Option(option.movingAverage, option.parameter, option.initialBound,
+                                              option.finalBound) for option in self.options]), plan)
+        self.options[0].set_moving_average('WMA')
+        self.assertIsNot(get_option_plan(self.options), plan)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import tempfile
+import unittest
+import multiprocessing
+import numpy as np
+import sweep
+
+from datetime import datetime
+from backtester import Backtester
+from candles import CandleStore
+from option import Option
+from sweep import find_optimal_moving_average, get_sweep_configurations, rank_results, run_configuration, stream_sweep
+from enums import STOP_LOSS, TRAILING_LOSS
+
+
+def get_candles(count: int) -> CandleStore:
+    generator = np.random.default_rng(1)
+    close = 100 * np.exp(np.cumsum(generator.normal(0, 0.005, count)))
+    openPrices = np.concatenate(([100], close[:-1]))
+    return CandleStore(1577836800000 + 3600000 * np.arange(count), {
+        'open': openPrices, 'close': close, 'high': np.maximum(openPrices, close) * 1.001,
+        'low': np.minimum(openPrices, close) * 0.999
+    })
+
+
+class MyTestCase(unittest.TestCase):
+    candles = get_candles(500)
+    configurations = get_sweep_configurations(movingAverages=('sma', 'ema'), parameters=('close', 'high/low'),
+                                              initialBounds=range(3, 6), lossStrategies=(STOP_LOSS, TRAILING_LOSS),
+                                              stoicOptions=(None, (5, 6, 3)))
+    settings = {'startingBalance': 1000, 'startDate': None, 'endDate': None, 'symbol': 'TEST'}
+
+    def test_configurations(self):
+        self.assertEqual(len(self.configurations), 2 * 2 * 3 * 3 * 2 * 2)
+        self.assertEqual(self.configurations[0], {'options': [('sma', 'close', 3, 3)], 'lossStrategy': STOP_LOSS,
+                                                  'lossPercentage': 5, 'marginEnabled': True, 'stoicOptions': None})
+
+    def test_sweep_matches_serial_backtests(self):
+        progress = []
+        results = list(stream_sweep(self.candles, self.configurations, workers=2,
+                                    progress=lambda done, total: progress.append((done, total))))
+        self.assertEqual(sorted(result['index'] for result in results), list(range(len(self.configurations))))
+        self.assertEqual(progress[-1], (len(self.configurations), len(self.configurations)))
+
+        for result in results[::10]:
+            expected = run_configuration(self.candles, self.configurations[result['index']], self.settings)
+            self.assertIsNone(result['error'])
+            self.assertEqual((result['profit'], result['trades']), (expected['profit'], expected['trades']))
+
+        ranked = rank_results(results, count=5)
+        self.assertEqual(len(ranked), 5)
+        self.assertEqual(ranked[0]['profit'], max(result['profit'] for result in results))
+        ranked = rank_results(results, metric='maxDrawdown', ascending=True)
+        self.assertEqual(ranked[0]['maxDrawdown'], min(result['maxDrawdown'] for result in results))
+        self.assertRaises(ValueError, rank_results, results, 'luck')
+
+    def test_cancel(self):
+        progress = []
+        results = list(stream_sweep(self.candles, self.configurations, workers=2, chunkSize=1,
+                                    cancelled=lambda: len(progress) >= 3,
+                                    progress=lambda done, total: progress.append(done)))
+        self.assertEqual(len(results), 3)
+
+    def test_cancel_within_chunk(self):
+        cancelled = multiprocessing.Event()
+        settings = dict(self.settings, bankMemory=sweep.INDICATOR_BANK_MEMORY, spillDirectory=tempfile.gettempdir())
+        sweep.initialize_worker((None, self.candles), settings, cancelled)
+        self.addCleanup(setattr, sweep, 'WORKER_CANCELLED', None)
+        chunk = list(enumerate(self.configurations[:3]))
+        self.assertEqual(len(sweep.run_configurations(chunk)), 3)
+        cancelled.set()
+        self.assertEqual(sweep.run_configurations(chunk), [])  # Workers stop between configurations of a chunk.
+
+        results = list(stream_sweep(self.candles, self.configurations, workers=1, chunkSize=len(self.configurations),
+                                    cancelled=lambda: True))
+        self.assertEqual(results, [])
+
+    def test_find_optimal_moving_average_window(self):
+        startDate, endDate = datetime(2020, 1, 5), datetime(2020, 1, 15)
+        backtester = Backtester(startingBalance=1000, data=self.candles, lossStrategy=STOP_LOSS, lossPercentage=5,
+                                options=[Option('sma', 'close', 3, 4)], startDate=startDate, endDate=endDate,
+                                symbol='TEST')
+        results = find_optimal_moving_average(backtester, 3, 4, workers=1)
+        self.assertEqual(len(results), 3 * 4 * 2 * 2)
+
+        settings = dict(self.settings, startDate=startDate, endDate=endDate)
+        for result in results[:5]:
+            expected = run_configuration(self.candles, result['configuration'], settings)
+            self.assertEqual(result['profit'], expected['profit'])
+        self.assertNotEqual([result['profit'] for result in results[:5]],
+                            [run_configuration(self.candles, result['configuration'], self.settings)['profit']
+                             for result in results[:5]])
+
+    def test_without_shared_memory(self):
+        sharedMemory = sweep.shared_memory
+        sweep.shared_memory = None  # Like Python versions before 3.8.
+        try:
+            results = list(stream_sweep(self.candles, self.configurations[:8], workers=2))
+        finally:
+            sweep.shared_memory = sharedMemory
+        expected = [run_configuration(self.candles, configuration, self.settings)['profit']
+                    for configuration in self.configurations[:8]]
+        self.assertEqual([result['profit'] for result in sorted(results, key=lambda result: result['index'])],
+                         expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
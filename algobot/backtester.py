@@ -1,16 +1,69 @@
 import os
 import sys
 import time
+import zlib
+import indicators
+import numpy as np
 
-from dateutil import parser
 from datetime import datetime
-from helpers import load_from_csv, get_ups_and_downs, get_data_from_parameter
-from option import Option
+from helpers import load_from_csv
+from candles import CANDLE_FIELDS, CandleStore, datetime_to_timestamp, get_parameter_column
+from candlecache import CandleCache
+from option import Option, get_option_plan
+from indicators import StoicIndicator
+from indicatorcache import get_indicator_cache
 from enums import BEARISH, BULLISH, LONG, SHORT, TRAILING_LOSS, STOP_LOSS
 
+INDICATOR_CACHED_PERIODS = 1000  # Newest values cached after calculating an indicator from the oldest period again.
+
+
+class PeriodWindow:
+    """
+    Newest first view of periods seen so far in a backtest. Periods are appended at the end of a chronological list
+    and indexes are counted back from a cursor at its end, so index 0 is the newest period and -1 the oldest one, just
+    like a list that had every period inserted at its front, without shifting the whole list for every period.
+    """
+    def __init__(self, periods: list = None):
+        """
+        :param periods: Periods already seen in chronological order.
+        """
+        self.periods = [] if periods is None else periods
+
+    def append(self, period: dict):
+        """
+        Adds period provided as the newest period.
+        """
+        self.periods.append(period)
+
+    def __len__(self) -> int:
+        return len(self.periods)
+
+    def __getitem__(self, key):
+        """
+        Returns period at index provided counted from the newest period, or a newest first list of periods if key is a
+        slice. Slices only copy the periods in them.
+        """
+        length = len(self.periods)
+        if type(key) == slice:
+            start, stop, step = key.indices(length)
+            if step != 1:
+                raise ValueError('Period windows can only be sliced from newest to oldest period.')
+            if stop <= start:
+                return []
+            return self.periods[length - stop:length - start][::-1]
+
+        if key < 0:
+            key += length
+        if not 0 <= key < length:
+            raise IndexError('Period window index out of range.')
+        return self.periods[length - 1 - key]
+
+    def __iter__(self):
+        return reversed(self.periods)
+
 
 class Backtester:
-    def __init__(self, startingBalance: float, data: list, lossStrategy: int, lossPercentage: float, options: list,
+    def __init__(self, startingBalance: float, data, lossStrategy: int, lossPercentage: float, options: list,
                  marginEnabled: bool = True, startDate: datetime = None, endDate: datetime = None, symbol: str = None,
                  stoicOptions=None):
         self.startingBalance = startingBalance
@@ -28,6 +81,7 @@ class Backtester:
         self.data = data
         self.check_data()
         self.interval = self.get_interval()
+        self.gaps = self.data.get_gaps()  # Ranges of periods missing from data.
         self.lossStrategy = lossStrategy
         self.lossPercentageDecimal = lossPercentage / 100
         self.tradingOptions = options
@@ -36,8 +90,13 @@ class Backtester:
         self.minPeriod = self.get_min_option_period()
         self.trend = None
 
-        self.rsi_dictionary = {}
-        self.stoicDictionary = {}
+        # EMAs and RSIs are calculated from the oldest period of data, so they are shared by every backtest of the
+        # same symbol, interval, and data, e.g. every run of a sweep.
+        self.indicatorCache = get_indicator_cache()
+        self.cacheSymbol = None
+        self.lastPeriodIndex = (None, None)  # Period get_period_index looked up last and its index, as it is reused.
+        self.indicatorBank = None  # Bank of moving average series shared by backtests of the same data, e.g. a sweep.
+        self.stoicIndicator = None
         self.stoicTrend = None
         if stoicOptions is None:
             self.stoicOptions = [None, None, None]
@@ -45,10 +104,11 @@ class Backtester:
         else:
             self.stoicOptions = stoicOptions
             self.stoicEnabled = True
-        self.ema_values = {}
 
         self.movingAverageTestStartTime = None
         self.movingAverageTestEndTime = None
+        self.startDate = startDate  # Dates backtest is limited to, e.g. for sweeps of the same periods.
+        self.endDate = endDate
         self.startDateIndex = self.get_start_date_index(startDate)
         self.endDateIndex = self.get_end_date_index(endDate)
 
@@ -62,6 +122,7 @@ class Backtester:
         self.sellShortPrice = None
         self.shortTrailingPrice = None
         self.currentPeriod = None
+        self.equityCurve = None  # Net balance after trading in every period of the last test.
 
     def reset_everything(self):
         """
@@ -83,27 +144,20 @@ class Backtester:
         self.sellShortPrice = None
         self.shortTrailingPrice = None
         self.currentPeriod = None
-
-    def convert_all_date_to_datetime(self):
-        """
-        Converts all available dates to datetime objects.
-        """
-        for data in self.data:
-            data['date_utc'] = parser.parse(data['date_utc'])
+        self.equityCurve = None
 
     def check_data(self):
         """
-        Checks data sorting. If descending, it reverses data, so we can mimic backtest as if we are starting from the
-        beginning.
+        Converts data to a candle store if a list of dictionaries was provided and checks data sorting. If descending,
+        it sorts data, so we can mimic backtest as if we are starting from the beginning. Binary candle caches are
+        memory-mapped instead of being copied.
         """
-        if type(self.data[0]['date_utc']) == str:
-            self.convert_all_date_to_datetime()
+        if isinstance(self.data, CandleCache):
+            self.data = self.data.get_candles()
+        elif not isinstance(self.data, CandleStore):
+            self.data = CandleStore.from_rows(self.data)
 
-        firstDate = self.data[0]['date_utc']
-        lastDate = self.data[-1]['date_utc']
-
-        if firstDate > lastDate:
-            self.data = self.data[::-1]
+        self.data = self.data.sorted()
 
     def validate_options(self):
         """
@@ -188,21 +242,197 @@ class Backtester:
         respectively.
         :param seenData: Data to use to check for trend.
         """
-        trends = []  # trends seen so far; can be either BULLISH or BEARISH; they all have to be the same for a trend
-        for option in self.tradingOptions:
-            avg1 = self.get_moving_average(seenData, option.movingAverage, option.initialBound, option.parameter)
-            avg2 = self.get_moving_average(seenData, option.movingAverage, option.finalBound, option.parameter)
-            if avg1 > avg2:
-                trends.append(BULLISH)
-            elif avg1 < avg2:
-                trends.append(BEARISH)
-            else:  # this assumes they're equal
-                trends.append(None)
-
-        if all(trend == BULLISH for trend in trends):
-            self.trend = BULLISH
-        elif all(trend == BEARISH for trend in trends):
-            self.trend = BEARISH
+        plan = get_option_plan(self.tradingOptions)  # Moving averages shared by options are only calculated once.
+        values = plan.evaluate(lambda average, parameter, prices: self.get_moving_average(seenData, average, prices,
+                                                                                          parameter))
+        trend = plan.get_trend(values)
+        if trend is not None:
+            self.trend = trend
+
+    @staticmethod
+    def get_ema_series(values: list, prices: int, start: int, sma_prices: int = 5) -> list:
+        """
+        Returns EMA of every period from start onwards the way get_ema calculates them period by period. Like Data's
+        EMAs, the first EMA is the SMA of the oldest sma_prices values, and every EMA after it is stepped from the one
+        before it with the price of its own period.
+        :param values: Values in chronological order.
+        :param prices: Days to iterate EMA over (or the period).
+        :param start: Index of the first period to get EMA of.
+        :param sma_prices: SMA prices to get first EMA over. EMAs of fewer prices are seeded from as many values as
+                           their period, so they are known from their period onwards.
+        :return: List of EMAs of periods from start onwards.
+        """
+        if sma_prices <= 0:
+            raise ValueError("Initial amount of SMA values for initial EMA must be greater than 0.")
+        sma_prices = min(sma_prices, prices, start + 1)
+
+        multiplier = 2 / (prices + 1)
+        ema = sum(values[:sma_prices]) / sma_prices
+        emas = [ema] if start == sma_prices - 1 else []
+        for index in range(sma_prices, len(values)):
+            ema = values[index] * multiplier + ema * (1 - multiplier)
+            if index >= start:
+                emas.append(ema)
+        return emas
+
+    def get_moving_average_series(self, candles: CandleStore, average: str, prices: int,
+                                  parameter: str) -> np.ndarray:
+        """
+        Returns rounded moving average of every period of candles from the minimum period onwards, identical to the
+        moving averages get_moving_average returns for every period of a backtest. If the backtester has an indicator
+        bank, series are read from it and only calculated if no backtest of the same data calculated them before.
+        :param candles: Candles seen by the end of the backtest.
+        :param average: Type of average to retrieve, i.e. -> SMA, WMA, EMA
+        :param prices: Amount of prices to get moving averages of.
+        :param parameter: Parameter to use to get moving average, i.e. - HIGH, LOW, CLOSE, OPEN
+        :return: Array of moving averages.
+        """
+        average = average.lower()
+        if self.startDateIndex == self.minPeriod:  # Seen candles are every candle before the end, whatever the minimum.
+            seenPeriods = (None, self.endDateIndex)
+        else:
+            seenPeriods = (self.minPeriod, self.startDateIndex, self.endDateIndex)
+
+        if average == 'ema':  # EMAs are calculated from the oldest period of data, whichever periods are seen.
+            end = self.startDateIndex + len(candles) - self.minPeriod
+            key = (average, prices, parameter, self.startDateIndex, end)
+            return self.get_banked_series(key, lambda: self.round_series(np.array(self.get_ema_series(
+                self.data.get_column(parameter)[:end].tolist(), prices, self.startDateIndex))))
+
+        key = (average, prices, parameter, seenPeriods)
+        averages = self.get_banked_series(key, lambda: self.round_series(indicators.get_moving_average_series(
+            candles, average, prices, parameter)))
+        return averages[self.minPeriod:]
+
+    def get_banked_series(self, key: tuple, calculate) -> np.ndarray:
+        """
+        Returns series of key provided from the indicator bank, or calculates it if there is no bank.
+        :param key: Key of series in the indicator bank.
+        :param calculate: Function that returns series.
+        :return: Array of series values.
+        """
+        if self.indicatorBank is None:
+            return calculate()
+        return self.indicatorBank.get_series(key, calculate)
+
+    @staticmethod
+    def round_series(values: np.ndarray, digits: int = 2) -> np.ndarray:
+        """
+        Returns values rounded exactly like round() rounds every value. NumPy can only round scaled values the wrong
+        way if they are right about halfway between two digits, so only those values are rounded one by one.
+        :param values: Array of values to round.
+        :param digits: Amount of digits to round to.
+        :return: Array of rounded values.
+        """
+        scale = 10 ** digits
+        scaled = values * scale
+        rounded = np.round(values, digits)
+        halfway = np.abs(scaled - np.floor(scaled) - 0.5) <= np.abs(scaled) * 1e-12
+        for index in np.flatnonzero(halfway).tolist():
+            rounded[index] = round(float(values[index]), digits)
+        return rounded
+
+    def get_signals(self) -> tuple:
+        """
+        Precomputes trend and stoic trend after every period of a backtest, so the backtest only has to run trades.
+        Moving averages of every period are calculated as whole series from the candles seen by the end of the
+        backtest. The stoic strategy has to be stepped period by period, so it is run over the periods beforehand.
+        :return: Tuple of lists of trends and stoic trends (if stoicism is enabled) after every period.
+        """
+        periods = self.data[self.startDateIndex:self.endDateIndex]
+        candles = self.data[:self.minPeriod].concatenate(periods)
+        plan = get_option_plan(self.tradingOptions)
+        values = plan.evaluate(lambda average, parameter, prices: self.get_moving_average_series(candles, average,
+                                                                                                 prices, parameter))
+        trends = plan.get_trends(values, len(periods))
+
+        stoicTrends = None
+        if self.stoicEnabled:
+            s1, s2, s3 = self.stoicOptions
+            initialStoicTrend = self.stoicTrend
+            seenData = PeriodWindow(list(self.data[:self.minPeriod]))
+            stoicTrends = []
+            for period in periods:
+                seenData.append(period)
+                if len(seenData) > max((s1, s2, s3)):
+                    self.stoic_strategy(seenData, s1, s2, s3)
+                stoicTrends.append(self.stoicTrend)
+            self.stoicTrend = initialStoicTrend
+
+        return trends, stoicTrends
+
+    def apply_signals(self, signals: tuple, index: int):
+        """
+        Sets trend and stoic trend to precomputed signals of period at index provided, like check_trend and
+        stoic_strategy would after the period.
+        :param signals: Tuple of trends and stoic trends returned by get_signals.
+        :param index: Index of period in the backtest.
+        """
+        trends, stoicTrends = signals
+        if trends[index] is not None:
+            self.trend = trends[index]
+        if stoicTrends is not None:
+            self.stoicTrend = stoicTrends[index]
+
+    def get_signal_states(self, signals: tuple) -> tuple:
+        """
+        Returns trend and stoic trend main_logic sees in every period of a backtest, i.e. the ones set after the period
+        before it. Trends that are none leave the trend as it was, so trends are forward filled with a cumulative max
+        of indexes of periods with a trend.
+        :param signals: Tuple of trends and stoic trends returned by get_signals.
+        :return: Tuple of arrays of trends and stoic trends, with 0 for none.
+        """
+        trends, stoicTrends = signals
+        initialTrend = 0 if self.trend is None else self.trend
+        trends = np.array([0 if trend is None else trend for trend in trends], dtype=np.int64)
+        indexes = np.maximum.accumulate(np.where(trends != 0, np.arange(len(trends)), -1))
+        trends = np.where(indexes >= 0, trends[np.maximum(indexes, 0)], initialTrend)
+        trendStates = np.concatenate(([initialTrend], trends[:-1]))
+
+        if stoicTrends is None:
+            return trendStates, None
+        stoicTrends = [self.stoicTrend] + stoicTrends[:-1]
+        return trendStates, np.array([0 if trend is None else trend for trend in stoicTrends], dtype=np.int64)
+
+    @staticmethod
+    def get_next_indexes(mask: np.ndarray) -> np.ndarray:
+        """
+        Returns index of the first true value at or after every index of mask provided with a reversed cumulative min.
+        :param mask: Boolean array.
+        :return: Array of indexes. Indexes without a true value after them are the length of mask.
+        """
+        indexes = np.where(mask, np.arange(len(mask)), len(mask))
+        return np.minimum.accumulate(indexes[::-1])[::-1]
+
+    @staticmethod
+    def find_stop_index(prices: np.ndarray, start: int, end: int, stopLoss: float, long: bool) -> int:
+        """
+        Returns index of the first price from start up to end (both inclusive) past stop loss provided. Prices are
+        searched in chunks that double in size, so finding a stop costs time proportional to how far away it is.
+        :param prices: Array of prices.
+        :param start: Index of first price to check.
+        :param end: Index of last price to check.
+        :param stopLoss: Stop loss to check prices against.
+        :param long: True if stop loss is of a long position (prices below it), false if of a short one (above it).
+        :return: Index of stop or length of prices if no price is past stop loss.
+        """
+        end = min(end + 1, len(prices))
+        size = 64
+        while start < end:
+            window = prices[start:min(start + size, end)]
+            crossed = window < stopLoss if long else window > stopLoss
+            if crossed.any():
+                return start + int(np.argmax(crossed))
+            start += len(window)
+            size *= 2
+        return len(prices)
+
+    def is_vectorizable(self) -> bool:
+        """
+        Returns whether the backtest configuration is supported by the vectorized test. Stop losses are only known for
+        stop and trailing losses.
+        """
+        return self.lossStrategy in (STOP_LOSS, TRAILING_LOSS)
 
     def find_date_index(self, datetimeObject):
         """
@@ -210,9 +440,10 @@ class Backtester:
         :param datetimeObject: Object to compare date-time with.
         :return: Index from self.data if found, else -1.
         """
-        for data in self.data:
-            if data['date_utc'].date() == datetimeObject:
-                return self.data.index(data)
+        dayTimestamp = datetime_to_timestamp(datetime.combine(datetimeObject, datetime.min.time()))
+        index, _ = self.data.get_index_range(startTimestamp=dayTimestamp)
+        if index < len(self.data) and self.data.get_datetime(index).date() == datetimeObject:
+            return index
         return -1
 
     def go_long(self, msg):
@@ -341,16 +572,7 @@ class Backtester:
         Attempts to parse interval from loaded data.
         :return: Interval in str format.
         """
-        period1 = self.data[0]['date_utc']
-        period2 = self.data[1]['date_utc']
-
-        if type(period1) == str:
-            period1 = parser.parse(period1)
-        if type(period2) == str:
-            period2 = parser.parse(period2)
-
-        difference = period2 - period1
-        seconds = difference.total_seconds()
+        seconds = self.data.get_timeframe() / 1000
         if seconds < 3600:  # this is 60 minutes
             minutes = seconds / 60
             return f'{int(minutes)} Minute'
@@ -361,79 +583,82 @@ class Backtester:
             days = seconds / 86400
             return f'{int(days)} Day'
 
-    def reset_stoic_dictionary(self):
-        self.stoicDictionary = {}
+    def reset_stoic_indicator(self):
+        self.stoicIndicator = None
 
-    # noinspection DuplicatedCode
-    def stoic_strategy(self, data, input1: int, input2: int, input3: int, s: int = 0) -> None or int:
+    def stoic_strategy(self, data, input1: int, input2: int, input3: int) -> None or int:
         """
-        Custom strategy.
+        Custom strategy. It has to be called once for every period from the first one it is called for.
         :param data: Data list.
         :param input1: Custom input 1 for the stoic strategy.
         :param input2: Custom input 2 for the stoic strategy.
         :param input3: Custom input 3 for the stoic strategy.
-        :param s: Shift data to get previous values.
         :return: Bullish, bearish, or none values.
         """
-        rsi_values_one = [self.get_rsi(data, input1, shift=shift) for shift in range(s, input1 + s)]
-        rsi_values_two = [self.get_rsi(data, input2, shift=shift) for shift in range(s, input2 + s)]
-
-        seneca = max(rsi_values_one) - min(rsi_values_one)
-        if 'seneca' in self.stoicDictionary:
-            self.stoicDictionary['seneca'].insert(0, seneca)
-        else:
-            self.stoicDictionary['seneca'] = [seneca]
-
-        zeno = rsi_values_one[0] - min(rsi_values_one)
-        if 'zeno' in self.stoicDictionary:
-            self.stoicDictionary['zeno'].insert(0, zeno)
-        else:
-            self.stoicDictionary['zeno'] = [zeno]
-
-        gaius = rsi_values_two[0] - min(rsi_values_two)
-        if 'gaius' in self.stoicDictionary:
-            self.stoicDictionary['gaius'].insert(0, gaius)
-        else:
-            self.stoicDictionary['gaius'] = [gaius]
-
-        philo = max(rsi_values_two) - min(rsi_values_two)
-        if 'philo' in self.stoicDictionary:
-            self.stoicDictionary['philo'].insert(0, philo)
-        else:
-            self.stoicDictionary['philo'] = [philo]
-
-        if len(self.stoicDictionary['gaius']) < 3:
-            return None
-
-        hadot = sum(self.stoicDictionary['gaius'][:3]) / sum(self.stoicDictionary['philo'][:3]) * 100
-        if 'hadot' in self.stoicDictionary:
-            self.stoicDictionary['hadot'].insert(0, hadot)
-        else:
-            self.stoicDictionary['hadot'] = [hadot]
-
-        if len(self.stoicDictionary['hadot']) < 3:
-            return None
+        newIndicator = self.stoicIndicator is None or self.stoicIndicator.inputs != (input1, input2, input3)
+        if newIndicator:
+            self.stoicIndicator = StoicIndicator(input1, input2, input3)
+
+        # Shifts from 1 onwards are read from the RSI dictionary, where shift 1 is the RSI of this period just stored.
+        # Only shift 1 is new after the first call; it becomes a previous period's RSI for the next call.
+        rsiOne = self.get_rsi(data, input1)
+        for shift in range(input1 - 1 if newIndicator else 1, 0, -1):
+            self.stoicIndicator.windowOne.push(self.get_rsi(data, input1, shift=shift))
+        rsiTwo = self.get_rsi(data, input2)
+        for shift in range(input2 - 1 if newIndicator else 1, 0, -1):
+            self.stoicIndicator.windowTwo.push(self.get_rsi(data, input2, shift=shift))
+
+        self.stoicTrend = self.stoicIndicator.update(rsiOne, rsiTwo)
+        return self.stoicTrend
+
+    def get_cache_key(self, indicator: str, prices: int, parameter: str, index: int) -> tuple:
+        """
+        Returns key of indicator value of period at index of data provided in the indicator cache.
+        :param indicator: Indicator, e.g. rsi or ema.
+        :param prices: Amount of prices of indicator.
+        :param parameter: Parameter indicator is of.
+        :param index: Index of period in data.
+        :return: Key tuple.
+        """
+        return self.get_cache_symbol(), self.interval, indicator, prices, parameter, self.data.get_timestamp(index)
 
-        stoic = sum(self.stoicDictionary['zeno'][:3]) / sum(self.stoicDictionary['seneca'][:3]) * 100
-        marcus = sum(self.stoicDictionary['hadot'][:input3]) / input3
+    def get_cache_symbol(self) -> tuple:
+        """
+        Returns symbol indicator values are cached under: the backtest's symbol and a checksum of its data, as data of
+        the same symbol, e.g. imported from different files, might still differ.
+        :return: Tuple of symbol and checksum.
+        """
+        if self.cacheSymbol is None:
+            checksum = zlib.crc32(np.ascontiguousarray(self.data.timestamps))
+            for field in CANDLE_FIELDS:
+                checksum = zlib.crc32(np.ascontiguousarray(self.data.columns[field]), checksum)
+            self.cacheSymbol = ('backtest', self.symbol, checksum)
+        return self.cacheSymbol
+
+    def get_period_index(self, period: dict) -> int:
+        """
+        Returns index of period provided in data.
+        :param period: Dictionary row of period.
+        :return: Index of period.
+        """
+        lastPeriod, lastIndex = self.lastPeriodIndex
+        if period is lastPeriod:
+            return lastIndex
 
-        if marcus > stoic:
-            self.stoicTrend = BEARISH
-            return BEARISH
-        elif marcus < stoic:
-            self.stoicTrend = BULLISH
-            return BULLISH
-        else:
-            self.stoicTrend = None
-            return None
+        index = self.data.find_index(datetime_to_timestamp(period['date_utc']))
+        if index == -1:
+            raise ValueError(f"Period {period['date_utc']} is not in backtest data.")
+        self.lastPeriodIndex = (period, index)
+        return index
 
-    def helper_get_ema(self, up_data: list, down_data: list, periods: int) -> float:
+    @staticmethod
+    def helper_get_ema(up_data: list, down_data: list, periods: int) -> list:
         """
-        Helper function to get the EMA for relative strength index and return the RSI.
+        Helper function to get the EMA for relative strength index and return the RSI values.
         :param down_data: Other data to get EMA of.
         :param up_data: Data to get EMA of.
         :param periods: Number of periods to iterate through.
-        :return: RSI
+        :return: List of tuples of RSI, average up, and average down of every period after the first.
         """
         emaUp = up_data[0]
         emaDown = down_data[0]
@@ -446,58 +671,75 @@ class Backtester:
             rsi = 100 if emaDown == 0 else 100 - 100 / (1 + emaUp / emaDown)
             rsi_values.append((rsi, emaUp, emaDown))
 
-        if periods in self.rsi_dictionary:
-            rsi_values = self.rsi_dictionary[periods]['close'] + rsi_values
+        return rsi_values
 
-        self.rsi_dictionary[periods] = {'close': rsi_values}
-
-        return rsi_values[-1][0]
-
-    # noinspection DuplicatedCode
     def get_rsi(self, data: list, prices: int = 14, parameter: str = 'close',
                 shift: int = 0, round_value: bool = True) -> float:
         """
-        Returns relative strength index.
+        Returns relative strength index. RSIs are averaged with Wilder's smoothing from the oldest period of data and
+        cached, so once the RSI of a period is known, the RSI of the period after it is calculated in one step. Either
+        way, the RSI of a period is the same.
         :param data: Data values.
         :param prices: Amount of prices to iterate through.
         :param parameter: Parameter to use for iterations. By default, it's close.
-        :param shift: Amount of prices to shift prices by.
+        :param shift: Amount of prices to shift prices by, i.e. RSI of the period shift periods before the newest one.
         :param round_value: Boolean that determines whether final value is rounded or not.
         :return: Final relative strength index.
         """
-        if shift > 0 and prices in self.rsi_dictionary:
-            return self.rsi_dictionary[prices]['close'][-shift][0]
-        elif prices in self.rsi_dictionary:
+        index = self.get_period_index(data[0]) - shift
+        if index < 0:
+            raise IndexError(f'There are not {shift} periods before {data[0]["date_utc"]} in backtest data.')
+
+        rsi = self.get_rsi_values(prices, parameter, index)[0]
+        if round_value:
+            return round(rsi, 2)
+        return rsi
+
+    def get_rsi_values(self, prices: int, parameter: str, index: int) -> tuple:
+        """
+        Returns RSI, average up, and average down of period at index of data provided.
+        :param prices: Amount of prices to iterate through.
+        :param parameter: Parameter to use for iterations.
+        :param index: Index of period in data.
+        :return: Tuple of RSI, average up, and average down.
+        """
+        values = self.indicatorCache.get(self.get_cache_key('rsi', prices, parameter, index))
+        if values is not None:
+            return values
+
+        column = self.data.get_column(parameter)
+        previous = None if index == 0 else self.indicatorCache.get(self.get_cache_key('rsi', prices, parameter,
+                                                                                      index - 1))
+        if previous is not None:
             alpha = 1 / prices
-            difference = data[0][parameter] - data[1][parameter]
+            difference = float(column[index]) - float(column[index - 1])
             if difference > 0:
-                up = difference * alpha + self.rsi_dictionary[prices]['close'][-1][1] * (1 - alpha)
-                down = self.rsi_dictionary[prices]['close'][-1][2] * (1 - alpha)
+                up = difference * alpha + previous[1] * (1 - alpha)
+                down = previous[2] * (1 - alpha)
             else:
-                up = self.rsi_dictionary[prices]['close'][-1][1] * (1 - alpha)
-                down = -difference * alpha + self.rsi_dictionary[prices]['close'][-1][2] * (1 - alpha)
-
-            rsi = 100 if down == 0 else 100 - 100 / (1 + up / down)
-            self.rsi_dictionary[prices]['close'].append((round(rsi, 2), up, down))
-            return rsi
+                up = previous[1] * (1 - alpha)
+                down = -difference * alpha + previous[2] * (1 - alpha)
 
-        data = data
-        start = 500 + prices + shift if len(data) > 500 + prices + shift else len(data)
-        data = data[shift:start]
-        data = data[:]
-        data.reverse()
+            values = (100 if down == 0 else 100 - 100 / (1 + up / down), up, down)
+            self.indicatorCache.set(self.get_cache_key('rsi', prices, parameter, index), values)
+            return values
 
-        ups, downs = get_ups_and_downs(data=data, parameter=parameter)
-        rsi = self.helper_get_ema(ups, downs, prices)
+        periodValues = column[:index + 1].tolist()
+        ups, downs = [0], [0]
+        for previousValue, value in zip(periodValues, periodValues[1:]):
+            difference = value - previousValue
+            ups.append(difference if difference > 0 else 0)
+            downs.append(0 if difference > 0 else -difference)
 
-        if round_value:
-            return round(rsi, 2)
-        return rsi
+        rsiValues = [(100, 0, 0)] + self.helper_get_ema(ups, downs, prices)  # The oldest period has no ups or downs.
+        for periodIndex in range(max(index + 1 - INDICATOR_CACHED_PERIODS, 0), index + 1):
+            self.indicatorCache.set(self.get_cache_key('rsi', prices, parameter, periodIndex), rsiValues[periodIndex])
+        return rsiValues[index]
 
     @staticmethod
     def get_sma(data: list, prices: int, parameter: str, round_value=True) -> float:
-        data = data[0: prices]
-        sma = sum([get_data_from_parameter(data=period, parameter=parameter) for period in data]) / prices
+        column = get_parameter_column(parameter)
+        sma = sum([period[column] for period in data[0: prices]]) / prices
 
         if round_value:
             return round(sma, 2)
@@ -505,12 +747,13 @@ class Backtester:
 
     @staticmethod
     def get_wma(data: list, prices: int, parameter: str, round_value=True) -> float:
-        total = get_data_from_parameter(data=data[0], parameter=parameter) * prices
+        column = get_parameter_column(parameter)
+        total = data[0][column] * prices
         data = data[1: prices]  # Data now does not include the first shift period.
 
         index = 0
         for x in range(prices - 1, 0, -1):
-            total += x * get_data_from_parameter(data=data[index], parameter=parameter)
+            total += x * data[index][column]
             index += 1
 
         divisor = prices * (prices + 1) / 2
@@ -520,25 +763,43 @@ class Backtester:
         return wma
 
     def get_ema(self, data: list, prices: int, parameter: str, sma_prices: int = 5, round_value=True) -> float:
+        """
+        Returns exponential moving average of the newest period of data provided. EMAs are calculated from the oldest
+        period of data like get_ema_series does and cached, so once the EMA of a period is known, the EMA of the period
+        after it is stepped from it with the newest price. Either way, the EMA of a period is the same.
+        :param data: Data values in newest-first order.
+        :param prices: Days to iterate EMA over (or the period).
+        :param parameter: Parameter to get the average of (e.g. open, close, high, or low values).
+        :param sma_prices: SMA prices to get first EMA over.
+        :param round_value: Boolean that determines whether final value is rounded or not.
+        :return: Exponential moving average.
+        """
         if sma_prices <= 0:
             raise ValueError("Initial amount of SMA values for initial EMA must be greater than 0.")
-        elif sma_prices > len(data):
-            sma_prices = len(data) - 1
 
-        multiplier = 2 / (prices + 1)
-
-        if prices in self.ema_values:
-            price = get_data_from_parameter(data=data[-1], parameter=parameter)
-            ema = price * multiplier + self.ema_values[prices] * (1 - multiplier)
-            self.ema_values[prices] = ema
-        else:
-            ema = self.get_sma(data, sma_prices, parameter, round_value=False)
-            for day in range(len(data) - sma_prices):
-                current_index = len(data) - sma_prices - day - 1
-                current_price = get_data_from_parameter(data=data[current_index], parameter=parameter)
-                ema = current_price * multiplier + ema * (1 - multiplier)
-
-            self.ema_values[prices] = ema
+        index = self.get_period_index(data[0])
+        firstIndex = min(sma_prices, prices) - 1  # Index of the first period with an EMA.
+        if index < firstIndex:
+            raise IndexError(f'There are not enough periods before {data[0]["date_utc"]} for EMA({prices}).')
+
+        key = (prices, sma_prices)
+        ema = self.indicatorCache.get(self.get_cache_key('ema', key, parameter, index))
+        if ema is None:
+            column = self.data.get_column(parameter)
+            previousEma = None
+            if index > firstIndex:
+                previousEma = self.indicatorCache.get(self.get_cache_key('ema', key, parameter, index - 1))
+
+            if previousEma is not None:
+                multiplier = 2 / (prices + 1)
+                ema = float(column[index]) * multiplier + previousEma * (1 - multiplier)
+                self.indicatorCache.set(self.get_cache_key('ema', key, parameter, index), ema)
+            else:
+                start = max(index + 1 - INDICATOR_CACHED_PERIODS, firstIndex)
+                emas = self.get_ema_series(column[:index + 1].tolist(), prices, start, sma_prices)
+                for periodIndex, periodEma in enumerate(emas, start=start):
+                    self.indicatorCache.set(self.get_cache_key('ema', key, parameter, periodIndex), periodEma)
+                ema = emas[-1]
 
         if round_value:
             return round(ema, 2)
@@ -595,67 +856,127 @@ class Backtester:
             elif self.trend == BEARISH:
                 self.previousPosition = None
 
-    def moving_average_test(self):
+    def moving_average_test(self, precompute: bool = True, vectorize: bool = True):
         """
         Performs a moving average test with given configurations.
+        :param precompute: If true, signals of every period are precomputed before the test, otherwise they are
+                           calculated from seen data period by period. Both produce the same trades.
+        :param vectorize: If true, precomputed signals are traded with array operations instead of a loop over every
+                          period, unless the configuration is not supported by the vectorized test. Both produce the
+                          same trades.
         """
         self.movingAverageTestStartTime = time.time()
-        seenData = self.data[:self.minPeriod][::-1]  # Start from minimum previous period data.
-        s1, s2, s3 = self.stoicOptions
-        for period in self.data[self.startDateIndex:self.endDateIndex]:
-            seenData.insert(0, period)
-            self.currentPeriod = period
-            self.currentPrice = period['open']
-            self.main_logic()
-            self.check_trend(seenData)
-            if self.stoicEnabled and len(seenData) > max((s1, s2, s3)):
-                self.stoic_strategy(seenData, s1, s2, s3)
+        if not precompute:
+            self.seen_data_test()
+        elif vectorize and self.is_vectorizable():
+            self.vectorized_test(self.get_signals())
+        else:
+            self.signal_test(self.get_signals())
 
         if self.inShortPosition:
             self.exit_short('Exited short because of end of backtest.')
         elif self.inLongPosition:
             self.exit_long('Exiting long because of end of backtest.')
 
+        self.profit = self.get_net() - self.startingBalance
         self.movingAverageTestEndTime = time.time()
         # self.print_stats()
         # self.print_trades()
 
-        # for period in self.data[5:]:
-        #     seenData.append(period)
-        #     avg1 = self.get_sma(seenData, 2, 'close')
-        #     avg2 = self.get_wma(seenData, 5, 'open')
-        #     print(avg1)
-
-    def find_optimal_moving_average(self, averageStart: int, averageLimit: int):
+    def seen_data_test(self):
         """
-        Runs extensive moving average tests and returns the one with best return percentages.
-        :return: A dictionary of values for the test.
+        Runs periods of a moving average test calculating moving averages and stoicism from seen data period by period.
         """
-        self.balance = 0
-        results = []
-        movingAverages = ('wma', 'sma', 'ema')
-        params = ('high', 'low', 'open', 'close')
-        total = (averageLimit - averageStart + 1) ** 2 * 4 * 3
-        done = 0
+        seenData = PeriodWindow(list(self.data[:self.minPeriod]))  # Start from minimum previous period data.
+        s1, s2, s3 = self.stoicOptions
+        equity = []
+        for period in self.data[self.startDateIndex:self.endDateIndex]:
+            seenData.append(period)
+            self.currentPeriod = period
+            self.currentPrice = period['open']
+            self.main_logic()
+            equity.append(self.get_net())
+            self.check_trend(seenData)
+            if self.stoicEnabled and len(seenData) > max((s1, s2, s3)):
+                self.stoic_strategy(seenData, s1, s2, s3)
+        self.equityCurve = np.array(equity)
 
-        t1 = time.time()
+    def signal_test(self, signals: tuple):
+        """
+        Runs periods of a moving average test one by one with precomputed signals.
+        :param signals: Tuple of trends and stoic trends returned by get_signals.
+        """
+        equity = []
+        for index, period in enumerate(self.data[self.startDateIndex:self.endDateIndex]):
+            self.currentPeriod = period
+            self.currentPrice = period['open']
+            self.main_logic()
+            equity.append(self.get_net())
+            self.apply_signals(signals, index)
+        self.equityCurve = np.array(equity)
 
-        for limit1 in range(averageStart, averageLimit + 1):
-            for limit2 in range(averageStart, averageLimit + 1):
-                for movingAverage in movingAverages:
-                    for param in params:
-                        options = [Option(movingAverage, param, limit1, limit2)]
-                        self.reset_everything()
-                        self.tradingOptions = options
-                        self.moving_average_test()
-                        results.append((self.profit, options))
-                        done += 1
-                print(f'Done {round(done / total * 100,2)}%')
+    def vectorized_test(self, signals: tuple):
+        """
+        Runs periods of a moving average test with precomputed signals without looping over every period. Masks of
+        periods in which main_logic can act are built from the signals, and the test jumps from one such period to the
+        next; stop losses are found with find_stop_index. Only those periods run main_logic, so trades, fees, and
+        messages are the same as in a loop over every period. Net balance only changes with trades and prices, so the
+        equity curve is calculated from holdings after every trade.
+        :param signals: Tuple of trends and stoic trends returned by get_signals.
+        """
+        candles = self.data[self.startDateIndex:self.endDateIndex]
+        prices = candles['open']
+        count = len(prices)
+        trendStates, stoicStates = self.get_signal_states(signals)
+        bullishSignals = trendStates == BULLISH
+        bearishSignals = trendStates == BEARISH
+        if stoicStates is not None:
+            bullishSignals = bullishSignals & (stoicStates == BULLISH)
+            bearishSignals = bearishSignals & (stoicStates == BEARISH)
+
+        nextBullish = self.get_next_indexes(bullishSignals)  # Periods that go long or exit shorts with a cross.
+        nextBearish = self.get_next_indexes(bearishSignals)  # Periods that go short or exit longs with a cross.
+        nextBearishTrend = self.get_next_indexes(trendStates == BEARISH)  # Periods that forget previous positions.
+
+        holdings = [(0, self.coin, self.coinOwed, self.balance)]  # Index of period and holdings from it onwards.
+        index = 0
+        while index < count:
+            if self.inLongPosition:  # Stop losses are checked before crosses, so they win ties.
+                crossIndex = nextBearish[index]
+                stopIndex = self.find_stop_index(prices, index, crossIndex, self.get_stop_loss(), long=True)
+                eventIndex = min(crossIndex, stopIndex)
+            elif self.inShortPosition:
+                crossIndex = nextBullish[index]
+                stopIndex = self.find_stop_index(prices, index, crossIndex, self.get_stop_loss(), long=False)
+                eventIndex = min(crossIndex, stopIndex)
+            elif self.previousPosition == LONG:
+                eventIndex = nextBearish[index] if self.marginEnabled else nextBearishTrend[index]
+            elif self.previousPosition == SHORT:
+                eventIndex = min(nextBullish[index], nextBearishTrend[index])
+            else:
+                eventIndex = min(nextBullish[index], nextBearish[index] if self.marginEnabled else count)
+
+            if eventIndex >= count:
+                break
+            self.currentPeriod = candles.get_row(eventIndex)
+            self.currentPrice = self.currentPeriod['open']
+            self.trend = None if trendStates[eventIndex] == 0 else int(trendStates[eventIndex])
+            if stoicStates is not None:
+                self.stoicTrend = None if stoicStates[eventIndex] == 0 else int(stoicStates[eventIndex])
+            self.main_logic()
+            holdings.append((eventIndex, self.coin, self.coinOwed, self.balance))
+            index = eventIndex + 1
 
-        print(time.time() - t1)
+        if count > 0:  # Leave the test as a loop over every period would after the last period.
+            self.currentPeriod = candles.get_row(-1)
+            self.currentPrice = self.currentPeriod['open']
+            self.trend = None if trendStates[-1] == 0 else int(trendStates[-1])
+            self.apply_signals(signals, count - 1)
 
-        results.sort(key=lambda x: x[0], reverse=True)
-        print(results[:20])
+        starts, coin, coinOwed, balance = (np.array(values) for values in zip(*holdings))
+        lengths = np.diff(np.append(starts, count))
+        coin, coinOwed, balance = (np.repeat(values, lengths) for values in (coin, coinOwed, balance))
+        self.equityCurve = coin * prices - coinOwed * prices + balance
 
     def print_options(self):
         """
@@ -703,6 +1024,9 @@ class Backtester:
         print(f'\tStoicism options: {self.stoicOptions}')
         print(f'\tStart Period: {self.data[self.startDateIndex]["date_utc"]}')
         print(f"\tEnd Period: {self.currentPeriod['date_utc']}")
+        if self.gaps:
+            missing = sum((end - start) // self.data.get_timeframe() + 1 for start, end in self.gaps)
+            print(f'\tMissing periods: {missing} in {len(self.gaps)} gaps (backtest skips over them)')
         print(f'\tStarting balance: ${round(self.startingBalance, 2)}')
         print(f'\tNet: ${round(self.get_net(), 2)}')
         print(f'\tCommissions paid: ${round(self.commissionsPaid, 2)}')
@@ -788,7 +1112,6 @@ if __name__ == '__main__':
     opt = [Option('sma', 'high', 18, 24), Option('wma', 'low', 19, 23)]
     a = Backtester(data=testData, startingBalance=1000, lossStrategy=STOP_LOSS, lossPercentage=99, options=opt,
                    marginEnabled=True, startDate=datetime(2018, 1, 1), symbol="BTCUSDT")
-    # a.find_optimal_moving_average(15, 20)
     a.moving_average_test()
     a.print_trades()
     # # a.print_stats()
@@ -0,0 +1,201 @@
+import os
+import zlib
+import struct
+import sqlite3
+import numpy as np
+
+from candles import CandleStore, CANDLE_FIELDS
+from database import CHUNK_SIZE, DATABASE_FIELDS
+
+CACHE_VERSION = 1  # Bump whenever the record or header layout changes, so older caches are rebuilt.
+CACHE_MAGIC = b'ALGOCNDL'
+HEADER_FORMAT = '<8sIIqqI'  # Magic, version, record size, record count, newest timestamp, and CRC32 of records.
+HEADER_SIZE = 64  # Header is padded, so records start at an aligned offset.
+RECORD_DTYPE = np.dtype([('timestamp', '<i8')] + [(field, '<f8') for field in CANDLE_FIELDS])
+
+
+def get_cache_file(databaseFile: str, table: str) -> str:
+    """
+    Returns path to binary candle cache of table provided. Caches are kept next to the database they mirror.
+    :param databaseFile: Path to database file.
+    :param table: Candle table the cache mirrors.
+    :return: Path to cache file.
+    """
+    return f'{os.path.splitext(databaseFile)[0]}_{table}.candles'
+
+
+class CandleCache:
+    """
+    Binary cache of a candle table. Candles are stored as fixed-width little-endian records after a small header
+    holding the cache version, amount of records, newest timestamp, and a checksum of every record. The records are
+    memory-mapped when read, so a candle store of the whole history is available without copying anything.
+
+    The cache only ever mirrors the database: it is appended to after newer candles are committed and rebuilt from the
+    database whenever its header does not match the table anymore. Checks on load only read the header and the oldest
+    and newest records, so loading takes the same time for any size of history; verify() checks every record.
+
+    Memory-mapped views of the cache have to be released before it is appended to or rebuilt, since the file is
+    truncated or replaced, which fails on Windows while the file is mapped.
+    """
+    def __init__(self, filePath: str):
+        self.filePath = filePath
+
+    def read_header(self) -> tuple or None:
+        """
+        Returns version, record count, newest timestamp, and checksum from cache header.
+        :return: Tuple of header values or None if cache does not exist or is not a candle cache.
+        """
+        if not os.path.exists(self.filePath):
+            return None
+
+        with open(self.filePath, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE:
+            return None
+
+        magic, version, recordSize, count, latestTimestamp, checksum = struct.unpack_from(HEADER_FORMAT, header)
+        if magic != CACHE_MAGIC or recordSize != RECORD_DTYPE.itemsize:
+            return None
+        return version, count, latestTimestamp, checksum
+
+    def read_timestamp(self, index: int) -> int:
+        """
+        Returns timestamp of cached record at index provided without mapping the cache.
+        :param index: Index of record from the oldest one.
+        :return: Timestamp in milliseconds.
+        """
+        with open(self.filePath, 'rb') as f:
+            f.seek(HEADER_SIZE + index * RECORD_DTYPE.itemsize)
+            return struct.unpack('<q', f.read(8))[0]
+
+    def get_latest_timestamp(self) -> int or None:
+        """
+        Returns timestamp of newest cached candle or None if there are no cached candles.
+        """
+        header = self.read_header()
+        if header is None or header[1] == 0:
+            return None
+        return header[2]
+
+    @staticmethod
+    def write_header(f, count: int, latestTimestamp: int, checksum: int):
+        """
+        Writes cache header to the beginning of open file provided.
+        """
+        header = struct.pack(HEADER_FORMAT, CACHE_MAGIC, CACHE_VERSION, RECORD_DTYPE.itemsize, count, latestTimestamp,
+                             checksum)
+        f.seek(0)
+        f.write(header.ljust(HEADER_SIZE, b'\0'))
+
+    def get_records(self) -> np.ndarray:
+        """
+        Returns records in cache as a read-only memory-mapped structured array.
+        """
+        header = self.read_header()
+        if header is None or header[1] == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(self.filePath, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(header[1],))
+
+    def get_candles(self) -> CandleStore:
+        """
+        Returns a candle store viewing every cached candle. Columns are views of the memory-mapped records.
+        """
+        records = self.get_records()
+        return CandleStore(records['timestamp'], {field: records[field] for field in CANDLE_FIELDS})
+
+    def is_valid(self) -> bool:
+        """
+        Returns whether cache exists, has the current version, and is complete, i.e. the file holds as many records as
+        its header says and the newest record is the newest candle in the header.
+        """
+        header = self.read_header()
+        if header is None:
+            return False
+
+        version, count, latestTimestamp, checksum = header
+        if version != CACHE_VERSION or os.path.getsize(self.filePath) != HEADER_SIZE + count * RECORD_DTYPE.itemsize:
+            return False
+        return count == 0 or self.read_timestamp(count - 1) == latestTimestamp
+
+    def verify(self) -> bool:
+        """
+        Returns whether cache is valid and every record matches the checksum in its header. Every record is read, so
+        this is meant for repairs and tests, not for every load.
+        """
+        if not self.is_valid():
+            return False
+        return zlib.crc32(self.get_records()) == self.read_header()[3]
+
+    def is_synced(self, connection: sqlite3.Connection, table: str) -> bool:
+        """
+        Returns whether cache holds the same oldest and newest candle as the table provided. Timestamps are the table's
+        rowid, so both are B-tree seeks. Candles inserted between them are not detected; Data rebuilds the cache
+        whenever it inserts any.
+        """
+        header = self.read_header()
+        if header is None:
+            return False
+
+        oldestTimestamp, latestTimestamp = connection.execute(f'SELECT (SELECT MIN(rowid) FROM {table}), '
+                                                              f'(SELECT MAX(rowid) FROM {table})').fetchone()
+        if header[1] == 0:
+            return latestTimestamp is None
+        return header[2] == latestTimestamp and self.read_timestamp(0) == oldestTimestamp
+
+    def rebuild(self, connection: sqlite3.Connection, table: str, chunkSize: int = CHUNK_SIZE):
+        """
+        Rebuilds cache from every candle in table provided. The cache is written to a temporary file first and then
+        swapped in, so readers never see a half-written cache.
+        :param connection: Connection to database.
+        :param table: Table to rebuild cache from.
+        :param chunkSize: Amount of rows read from the database at a time.
+        """
+        temporaryFile = f'{self.filePath}.tmp'
+        count, latestTimestamp, checksum = 0, 0, 0
+
+        cursor = connection.execute(f'SELECT {", ".join(DATABASE_FIELDS)} FROM {table} ORDER BY timestamp_utc')
+        with open(temporaryFile, 'wb') as f:
+            self.write_header(f, count, latestTimestamp, checksum)
+            while True:
+                rows = cursor.fetchmany(chunkSize)
+                if not rows:
+                    break
+
+                records = np.array([tuple(row) for row in rows], dtype=RECORD_DTYPE)
+                f.write(records.tobytes())
+                checksum = zlib.crc32(records, checksum)
+                count += len(records)
+                latestTimestamp = int(records['timestamp'][-1])
+
+            self.write_header(f, count, latestTimestamp, checksum)
+
+        os.replace(temporaryFile, self.filePath)
+
+    def append(self, candles: CandleStore) -> bool:
+        """
+        Appends candles to the end of cache. Candles can only be appended if all of them are newer than the newest
+        cached candle.
+        :param candles: Chronological candle store to append.
+        :return: A boolean whether candles were appended or not. If not, the cache has to be rebuilt.
+        """
+        header = self.read_header()
+        if header is None or header[0] != CACHE_VERSION:
+            return False
+        if len(candles) == 0:
+            return True
+
+        version, count, latestTimestamp, checksum = header
+        if count > 0 and candles.get_timestamp(0) <= latestTimestamp:
+            return False
+
+        records = np.empty(len(candles), dtype=RECORD_DTYPE)
+        records['timestamp'] = candles.timestamps
+        for field in CANDLE_FIELDS:
+            records[field] = candles.columns[field]
+
+        with open(self.filePath, 'r+b') as f:
+            f.seek(HEADER_SIZE + count * RECORD_DTYPE.itemsize)
+            f.write(records.tobytes())
+            f.truncate()
+            self.write_header(f, count + len(records), candles.get_timestamp(-1), zlib.crc32(records, checksum))
+        return True
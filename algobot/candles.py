@@ -0,0 +1,433 @@
+import numpy as np
+
+from datetime import datetime, timezone
+from dateutil import parser
+
+CANDLE_FIELDS = ('open', 'high', 'low', 'close', 'volume', 'quote_asset_volume', 'number_of_trades',
+                 'taker_buy_base_asset', 'taker_buy_quote_asset')
+DERIVED_FIELDS = {  # Columns averaged from candle fields when candles are stored, so they are never averaged again.
+    'hl2': ('high', 'low'),
+    'oc2': ('open', 'close'),
+    'hlc3': ('high', 'low', 'close'),
+    'ohlc4': ('open', 'high', 'low', 'close'),
+}
+KLINE_INDEXES = {  # Positions of candle fields in Binance klines. Close time at position 6 is not stored.
+    'open': 1,
+    'high': 2,
+    'low': 3,
+    'close': 4,
+    'volume': 5,
+    'quote_asset_volume': 7,
+    'number_of_trades': 8,
+    'taker_buy_base_asset': 9,
+    'taker_buy_quote_asset': 10,
+}
+PARAMETER_COLUMNS = {'high/low': 'hl2', 'open/close': 'oc2'}  # Trading parameters that are read from derived columns.
+
+
+def datetime_to_timestamp(date) -> int:
+    """
+    Converts a datetime object (or date string) to an epoch timestamp in milliseconds. Naive dates are assumed to be
+    in UTC.
+    :param date: Datetime object or string to convert.
+    :return: Epoch timestamp in milliseconds.
+    """
+    if type(date) == str:
+        date = parser.parse(date)
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return int(round(date.timestamp() * 1000))
+
+
+def timestamp_to_datetime(timestamp) -> datetime:
+    """
+    Converts an epoch timestamp in milliseconds to a timezone aware UTC datetime object.
+    :param timestamp: Epoch timestamp in milliseconds.
+    :return: Datetime object in UTC.
+    """
+    return datetime.fromtimestamp(int(timestamp) / 1000, tz=timezone.utc)
+
+
+def get_parameter_column(parameter: str) -> str:
+    """
+    Resolves trading parameter provided to the name of the column it is read from, so loops can resolve parameters
+    once and then read columns and dictionary rows directly.
+    :param parameter: Trading parameter such as close or high/low.
+    :return: Name of column with values of parameter.
+    """
+    return PARAMETER_COLUMNS.get(parameter, parameter)
+
+
+def get_derived_column(columns: dict, field: str) -> np.ndarray:
+    """
+    Returns derived column of field provided averaged from candle field columns provided.
+    :param columns: Dictionary of candle field columns.
+    :param field: Derived field to average.
+    :return: Array of averaged values.
+    """
+    sources = DERIVED_FIELDS[field]
+    total = columns[sources[0]]
+    for source in sources[1:]:
+        total = total + columns[source]
+    return total / len(sources)
+
+
+def get_kline_row(kline: list) -> dict:
+    """
+    Returns dictionary row with candle fields of Binance kline provided.
+    :param kline: Kline list returned from the Binance API.
+    :return: Dictionary row with float values of candle fields.
+    """
+    return {field: float(kline[KLINE_INDEXES[field]]) for field in CANDLE_FIELDS}
+
+
+def add_derived_fields(row: dict) -> dict:
+    """
+    Adds derived fields to dictionary row provided in place, e.g. to rows of periods in progress that are not stored.
+    :param row: Dictionary row with candle fields.
+    :return: Same dictionary row with derived fields added.
+    """
+    for field, sources in DERIVED_FIELDS.items():
+        row[field] = sum(row[source] for source in sources) / len(sources)
+    return row
+
+
+def find_gaps(timestamps: np.ndarray, timeframe: int) -> list:
+    """
+    Finds ranges of candles missing from chronological open times provided.
+    :param timestamps: Array of open times in milliseconds in chronological order.
+    :param timeframe: Interval of candles in milliseconds.
+    :return: List of tuples with open times of the first and last missing candle of every gap.
+    """
+    indices = np.flatnonzero(np.diff(timestamps) > timeframe)
+    return [(int(timestamps[index]) + timeframe, int(timestamps[index + 1]) - timeframe) for index in indices.tolist()]
+
+
+class CandleStore:
+    """
+    Columnar storage for candle data. Every field is kept in its own contiguous float64 array and open times are kept
+    in an int64 array of epoch milliseconds. Candles are always stored in chronological order, so index 0 is the oldest
+    candle and index -1 is the newest one.
+
+    Slicing a store returns another store backed by views of the same arrays, so windows are cheap to create. Integer
+    indexing and iteration return dictionary rows in the same format the rest of the program has always used.
+
+    Derived columns in DERIVED_FIELDS, e.g. the high/low average hl2, are calculated once when candles are stored and
+    kept alongside the candle fields, so parameters such as high/low are plain column reads.
+
+    Candles can be appended and popped in place in amortized constant time. The first append copies candles to buffers
+    with spare room at the end, and timestamps and columns are views of the filled part of those buffers. Stores
+    created from slices never share spare room with their parent, so appending to them never overwrites the parent's
+    candles. Note that a view taken before pop() sees whatever is appended in place of the popped candle.
+    """
+    def __init__(self, timestamps=None, columns: dict = None):
+        if timestamps is None:
+            timestamps = np.empty(0, dtype=np.int64)
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.columns = {}
+
+        for field in CANDLE_FIELDS:
+            column = None if columns is None else columns.get(field)
+            if column is None:  # Imported data might not have every field, so fill it in with NaNs.
+                column = np.full(len(self.timestamps), np.nan)
+            self.columns[field] = np.asarray(column, dtype=np.float64)
+            if len(self.columns[field]) != len(self.timestamps):
+                raise ValueError(f'Column {field} does not have the same length as timestamps.')
+
+        for field in DERIVED_FIELDS:  # Slices and sorted stores pass derived columns along instead of averaging again.
+            column = None if columns is None else columns.get(field)
+            if column is None or len(column) != len(self.timestamps):
+                column = get_derived_column(self.columns, field)
+            self.columns[field] = np.asarray(column, dtype=np.float64)
+
+        self.timestampBuffer = self.timestamps  # Buffers can hold more candles than timestamps and columns view.
+        self.columnBuffers = dict(self.columns)
+
+    @classmethod
+    def from_klines(cls, klines: list):
+        """
+        Creates a candle store from Binance kline lists.
+        :param klines: List of klines returned from the Binance API.
+        :return: Candle store with klines provided.
+        """
+        if len(klines) == 0:
+            return cls()
+
+        transposed = list(zip(*klines))
+        columns = {field: np.array(transposed[KLINE_INDEXES[field]], dtype=np.float64) for field in CANDLE_FIELDS}
+        return cls(np.array(transposed[0], dtype=np.int64), columns)
+
+    @classmethod
+    def from_database_rows(cls, rows: list):
+        """
+        Creates a candle store from database rows. Rows are expected to be in chronological order with the timestamp in
+        milliseconds first and then all the fields in the same order as CANDLE_FIELDS.
+        :param rows: Rows retrieved from the database.
+        :return: Candle store with rows provided.
+        """
+        if len(rows) == 0:
+            return cls()
+
+        table = np.array(rows, dtype=np.float64).T.copy()  # Transposed copy, so every column is contiguous.
+        columns = {field: table[index + 1] for index, field in enumerate(CANDLE_FIELDS)}
+        return cls(table[0].astype(np.int64), columns)
+
+    @classmethod
+    def from_rows(cls, rows: list):
+        """
+        Creates a candle store from a list of dictionary rows. Rows can be in any order; they will be sorted in
+        chronological order. Dates can either be datetime objects or strings.
+        :param rows: List of dictionaries with a date_utc key and candle fields.
+        :return: Candle store with rows provided.
+        """
+        if len(rows) == 0:
+            return cls()
+
+        timestamps = np.array([datetime_to_timestamp(row['date_utc']) for row in rows], dtype=np.int64)
+        columns = {field: np.array([row.get(field, np.nan) for row in rows], dtype=np.float64)
+                   for field in CANDLE_FIELDS}
+        return cls(timestamps, columns).sorted()
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __getitem__(self, key):
+        """
+        Returns a column if key is a string, a dictionary row if key is an integer, or a new store viewing the same
+        arrays if key is a slice.
+        """
+        if type(key) == str:
+            return self.get_column(key)
+        elif type(key) == slice:
+            if key.step not in (None, 1):
+                raise ValueError('Candle stores can only be sliced in chronological order.')
+            return CandleStore(self.timestamps[key], {field: column[key] for field, column in self.columns.items()})
+        else:
+            return self.get_row(key)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.get_row(index)
+
+    def __reversed__(self):
+        for index in range(len(self) - 1, -1, -1):
+            yield self.get_row(index)
+
+    def __repr__(self):
+        return f'CandleStore({len(self)} candles)'
+
+    def get_column(self, parameter: str) -> np.ndarray:
+        """
+        Returns column of parameter provided. Parameters such as high/low and open/close return their derived column.
+        :param parameter: Parameter to retrieve.
+        :return: Array of values for parameter provided.
+        """
+        if parameter == 'date_utc':
+            raise KeyError('Use timestamps or get_datetime() to retrieve candle dates.')
+        return self.columns[get_parameter_column(parameter)]
+
+    def get_row(self, index: int) -> dict:
+        """
+        Returns candle at index provided as a dictionary. This is mainly for compatibility with code that expects
+        dictionary rows.
+        :param index: Index of candle to retrieve.
+        :return: Dictionary with date_utc, every candle field, and every derived field.
+        """
+        row = {'date_utc': self.get_datetime(index)}
+        for field, column in self.columns.items():
+            row[field] = float(column[index])
+        return row
+
+    def get_timestamp(self, index: int) -> int:
+        """
+        Returns open time of candle at index provided in milliseconds.
+        """
+        return int(self.timestamps[index])
+
+    def get_datetime(self, index: int) -> datetime:
+        """
+        Returns open time of candle at index provided as a UTC datetime object.
+        """
+        return timestamp_to_datetime(self.timestamps[index])
+
+    def find_index(self, timestamp: int) -> int:
+        """
+        Returns index of candle with the exact timestamp provided.
+        :param timestamp: Timestamp in milliseconds to search for.
+        :return: Index of candle if found, else -1.
+        """
+        index = int(np.searchsorted(self.timestamps, timestamp, side='left'))
+        if index < len(self) and self.timestamps[index] == timestamp:
+            return index
+        return -1
+
+    def get_index_range(self, startTimestamp: int = None, endTimestamp: int = None) -> tuple:
+        """
+        Returns index range of candles that opened between start and end timestamps (both inclusive).
+        :param startTimestamp: Starting timestamp in milliseconds. If none, starts from the oldest candle.
+        :param endTimestamp: Ending timestamp in milliseconds. If none, ends at the newest candle.
+        :return: Tuple of start and end indices that can be used for slicing.
+        """
+        start = 0 if startTimestamp is None else int(np.searchsorted(self.timestamps, startTimestamp, side='left'))
+        end = len(self) if endTimestamp is None else int(np.searchsorted(self.timestamps, endTimestamp, side='right'))
+        return start, max(start, end)
+
+    def between(self, startDate=None, endDate=None):
+        """
+        Returns a view of candles that opened between start and end dates (both inclusive).
+        :param startDate: Starting datetime or timestamp in milliseconds.
+        :param endDate: Ending datetime or timestamp in milliseconds.
+        :return: Candle store viewing candles in range.
+        """
+        if startDate is not None and not isinstance(startDate, (int, np.integer)):
+            startDate = datetime_to_timestamp(startDate)
+        if endDate is not None and not isinstance(endDate, (int, np.integer)):
+            endDate = datetime_to_timestamp(endDate)
+
+        start, end = self.get_index_range(startDate, endDate)
+        return self[start:end]
+
+    def get_timeframe(self) -> int:
+        """
+        Returns the most common difference between open times of consecutive candles, i.e. the interval of candles, in
+        milliseconds. If there are less than two candles, 0 is returned.
+        """
+        if len(self) < 2:
+            return 0
+        differences, counts = np.unique(np.diff(self.timestamps), return_counts=True)
+        return int(differences[np.argmax(counts)])
+
+    def get_gaps(self, timeframe: int = None) -> list:
+        """
+        Returns ranges of candles missing between the oldest and the newest candle.
+        :param timeframe: Interval of candles in milliseconds. If none, it is inferred from open times.
+        :return: List of tuples with open times of the first and last missing candle of every gap.
+        """
+        if timeframe is None:
+            timeframe = self.get_timeframe()
+        return find_gaps(self.timestamps, timeframe)
+
+    def resample(self, timeframe: int):
+        """
+        Aggregates candles into coarser candles of timeframe provided. Candles are grouped by the epoch-aligned period
+        they opened in; open is the first open, high the highest high, low the lowest low, close the last close, and
+        volumes and trade counts are summed. Periods are aggregated from whatever candles they have, so callers should
+        only pass candles of periods that have closed.
+        :param timeframe: Interval of resampled candles in milliseconds.
+        :return: New candle store with resampled candles.
+        """
+        if len(self) == 0:
+            return CandleStore()
+
+        periods = self.timestamps // timeframe
+        starts = np.flatnonzero(np.concatenate(([True], periods[1:] != periods[:-1])))
+        ends = np.concatenate((starts[1:], [len(self)])) - 1
+        columns = {
+            'open': self.columns['open'][starts],
+            'high': np.maximum.reduceat(self.columns['high'], starts),
+            'low': np.minimum.reduceat(self.columns['low'], starts),
+            'close': self.columns['close'][ends],
+        }
+        for field in CANDLE_FIELDS[4:]:  # Volumes and trade counts.
+            columns[field] = np.add.reduceat(self.columns[field], starts)
+        return CandleStore(periods[starts] * timeframe, columns)
+
+    def is_ascending(self) -> bool:
+        """
+        Returns whether candles are in non-decreasing (duplicates allowed) chronological order or not.
+        """
+        return bool(np.all(self.timestamps[1:] >= self.timestamps[:-1]))
+
+    def sorted(self):
+        """
+        Returns candle store sorted in chronological order. If it is already sorted, the same store is returned.
+        """
+        if self.is_ascending():
+            return self
+        order = np.argsort(self.timestamps, kind='stable')
+        return CandleStore(self.timestamps[order], {field: column[order] for field, column in self.columns.items()})
+
+    def get_newest_first(self, parameter: str) -> np.ndarray:
+        """
+        Returns a reversed view of column of parameter provided, so index 0 is the newest candle.
+        """
+        return self.get_column(parameter)[::-1]
+
+    def set_length(self, length: int):
+        """
+        Points timestamps and columns at the first length candles in buffers.
+        """
+        self.timestamps = self.timestampBuffer[:length]
+        self.columns = {field: buffer[:length] for field, buffer in self.columnBuffers.items()}
+
+    def reserve(self, capacity: int):
+        """
+        Makes sure buffers can hold capacity candles, so candles can be appended without copying. Buffers that are
+        too small or read-only (e.g. memory-mapped) are replaced with new buffers that have spare room.
+        :param capacity: Amount of candles buffers have to hold.
+        """
+        if capacity <= len(self.timestampBuffer) and self.timestampBuffer.flags.writeable:
+            return
+
+        length = len(self)
+        capacity = max(capacity, length + length // 4 + 16)  # Grow geometrically for amortized constant appends.
+        self.timestampBuffer = np.empty(capacity, dtype=np.int64)
+        self.timestampBuffer[:length] = self.timestamps
+        for field, column in self.columns.items():
+            self.columnBuffers[field] = np.empty(capacity, dtype=np.float64)
+            self.columnBuffers[field][:length] = column
+        self.set_length(length)
+
+    def extend(self, other):
+        """
+        Appends candles from other store after the candles in this store in place.
+        :param other: Other candle store containing newer candles.
+        """
+        length = len(self)
+        newLength = length + len(other)
+        if newLength == length:
+            return
+
+        self.reserve(newLength)
+        self.timestampBuffer[length:newLength] = other.timestamps
+        for field, buffer in self.columnBuffers.items():
+            buffer[length:newLength] = other.columns[field]
+        self.set_length(newLength)
+
+    def append(self, row: dict):
+        """
+        Appends dictionary row provided as the newest candle in place.
+        :param row: Dictionary row with date_utc and candle fields.
+        """
+        self.extend(CandleStore.from_rows([row]))
+
+    def pop(self) -> dict:
+        """
+        Removes the newest candle in place and returns it.
+        :return: Dictionary row of removed candle.
+        """
+        row = self.get_row(-1)
+        self.set_length(len(self) - 1)
+        return row
+
+    def concatenate(self, other):
+        """
+        Returns a new candle store with candles from other store added after the candles in this store.
+        :param other: Other candle store containing newer candles.
+        :return: New candle store with both stores' candles.
+        """
+        if len(other) == 0:
+            return self
+        if len(self) == 0:
+            return other
+        return CandleStore(np.concatenate((self.timestamps, other.timestamps)),
+                           {field: np.concatenate((column, other.columns[field]))
+                            for field, column in self.columns.items()})
+
+    def append_row(self, row: dict):
+        """
+        Returns a new candle store with dictionary row provided added as the newest candle.
+        :param row: Dictionary row with date_utc and candle fields.
+        :return: New candle store with row added.
+        """
+        return self.concatenate(CandleStore.from_rows([row]))
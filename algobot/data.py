@@ -1,23 +1,47 @@
 import sqlite3
 import time
 import os
+import database
+import indicators
+import numpy as np
 
 from datetime import timedelta, timezone, datetime
-from helpers import get_logger, ROOT_DIR, get_ups_and_downs, get_data_from_parameter
-from contextlib import closing
+from helpers import get_logger, ROOT_DIR, get_data_from_parameter
+from candles import CandleStore, add_derived_fields, datetime_to_timestamp, get_kline_row, timestamp_to_datetime
+from candlecache import CandleCache, get_cache_file
+from databasepool import get_database_pool
+from indicatorcache import get_indicator_cache
+from downloader import DOWNLOAD_WORKERS, stream_klines
+from marketstream import MarketStream, MarketSnapshot, SNAPSHOT_TTL
+from indicators import RunningSMA, RunningWMA, RunningRSI
 from binance.client import Client
 from binance.helpers import interval_to_milliseconds
 
+DAY_MILLISECONDS = 24 * 60 * 60 * 1000
+EMA_WARMUP_MULTIPLE = 10  # Periods of history loaded per EMA period before seeding an EMA from windowed data.
+EMA_CACHED_PERIODS = 1000  # Newest closed EMAs cached after calculating EMAs from the initial SMA again.
+RSI_WARMUP = 500  # Periods RSI average gains and losses are smoothed over before their RSI values are used.
+RSI_HISTORY = 100  # Minimum amount of past RSI values kept per RSI state.
+
 
 class Data:
     def __init__(self, interval: str = '1h', symbol: str = 'BTCUSDT', loadData: bool = True,
-                 updateData: bool = True, log: bool = False, logFile: str = 'data', logObject=None):
+                 updateData: bool = True, log: bool = False, logFile: str = 'data', logObject=None,
+                 lookback: int = None, startDate=None, endDate=None, useCache: bool = False,
+                 snapshotTTL: float = SNAPSHOT_TTL, rsiWarmup: int = RSI_WARMUP):
         """
         Data object that will retrieve current and historical prices from the Binance API and calculate moving averages.
         :param interval: Interval for which the data object will track prices.
         :param symbol: Symbol for which the data object will track prices.
         :param: loadData: Boolean for whether data will be loaded or not.
         :param: updateData: Boolean for whether data will be updated if it is loaded.
+        :param lookback: If provided, only the newest lookback periods are loaded from the database. Older periods are
+                         paged in when an indicator needs them.
+        :param startDate: If provided, only periods from this datetime onwards are loaded from the database.
+        :param endDate: If provided, only periods up to this datetime are loaded from the database.
+        :param useCache: Boolean for whether data is loaded from a memory-mapped binary cache of the database or not.
+        :param snapshotTTL: Seconds the period in progress is reused for by indicators outside of a tick.
+        :param rsiWarmup: Periods RSI average gains and losses are smoothed over before their RSI values are used.
         """
         self.binanceClient = Client()  # Initialize Binance client
         self.logger = self.get_logging_object(log=log, logFile=logFile, logObject=logObject)
@@ -31,13 +55,25 @@ class Data:
         symbol = symbol.upper()
         self.validate_symbol(symbol)
         self.symbol = symbol  # Symbol of data being used.
-        self.data = []  # Total bot data.
-        self.ema_data = {}  # Cached past EMA data for memoization.
+        self.data = CandleStore()  # Total bot data in chronological order.
+        self.indicatorCache = get_indicator_cache()  # Closed period EMAs shared by every data object of this market.
         self.rsi_data = {}  # Cached past RSI data for memoization.
+        self.rsiStates = {}  # Running RSI states of closed periods, keyed by prices and parameter.
+        self.rsiWarmup = rsiWarmup
+        self.runningAverages = {}  # Running SMA and WMA states of closed periods, keyed by type, prices, and parameter.
+
+        self.lookback = lookback  # Amount of newest periods to load from database. If none, load everything in range.
+        self.startTimestamp = None if startDate is None else datetime_to_timestamp(startDate)
+        self.endTimestamp = None if endDate is None else datetime_to_timestamp(endDate)
+        self.historyExhausted = lookback is None and startDate is None  # Whether older periods exist in database.
 
         self.databaseTable = f'data_{self.interval}'
         self.databaseFile = self.get_database_file()
+        self.databasePool = get_database_pool(self.databaseFile)  # Shared by every data object of this symbol.
         self.create_table()
+        self.candleCache = CandleCache(get_cache_file(self.databaseFile, self.databaseTable)) if useCache else None
+        self.marketStream = None  # Streams current period and price once started. If none, REST requests are used.
+        self.currentSnapshot = MarketSnapshot(snapshotTTL)  # Period in progress shared by indicators.
 
         if loadData:
             # Create, initialize, store, and get values from database.
@@ -78,9 +114,11 @@ class Data:
 
     def load_data(self, update: bool = True):
         """
-        Loads data to Data object.
+        Loads data to Data object. Periods that can be built from a finer interval stored locally are resampled first,
+        so they don't have to be downloaded.
         :param update: Boolean that determines whether data is updated or not.
         """
+        self.resample_from_finer_data()
         self.get_data_from_database()
         if update:
             if not self.database_is_updated():
@@ -126,103 +164,249 @@ class Data:
 
     def create_table(self):
         """
-        Creates a new table with interval if it does not exist
-        """
-        with closing(sqlite3.connect(self.databaseFile)) as connection:
-            with closing(connection.cursor()) as cursor:
-                cursor.execute(f'''
-                                CREATE TABLE IF NOT EXISTS {self.databaseTable}(
-                                date_utc TEXT PRIMARY KEY,
-                                open_price TEXT NOT NULL,
-                                high_price TEXT NOT NULL,
-                                low_price TEXT NOT NULL,
-                                close_price TEXT NOT NULL,
-                                volume TEXT NOT NULL,
-                                quote_asset_volume TEXT NOT NULL,
-                                number_of_trades TEXT NOT NULL,
-                                taker_buy_base_asset TEXT NOT NULL,
-                                taker_buy_quote_asset TEXT NOT NULL
-                                );''')
-                connection.commit()
+        Creates a new table with interval if it does not exist. Databases using an older schema are migrated first.
+        """
+        connection = self.databasePool.get_connection()
+        if database.get_schema_version(connection) < database.SCHEMA_VERSION:
+            self.output_message("Migrating database to the latest schema. This may take a while...")
+            migratedTables = database.migrate_database(connection)
+            self.databasePool.invalidate()
+            self.output_message(f"Migrated tables: {migratedTables}.")
+        database.create_candle_table(connection, self.databaseTable)
 
     def dump_to_table(self, totalData=None) -> bool:
         """
-        Dumps date and price information to database.
+        Dumps date and price information to database. Rows are written in bulk transactions and rows that already exist
+        in the database are ignored.
+        :param totalData: Candle store to dump. If none, all run-time data is dumped.
         :return: A boolean whether data entry was successful or not.
         """
+        self.release_cache_views()
         if totalData is None:
             totalData = self.data
 
-        query = f'''INSERT INTO {self.databaseTable} (date_utc, open_price, high_price, low_price, close_price,
-                            volume, quote_asset_volume, number_of_trades, taker_buy_base_asset, taker_buy_quote_asset) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);'''
-        with closing(sqlite3.connect(self.databaseFile)) as connection:
-            with closing(connection.cursor()) as cursor:
-                for data in totalData:
-                    try:
-                        cursor.execute(query,
-                                       (data['date_utc'].strftime('%Y-%m-%d %H:%M:%S'),
-                                        data['open'],
-                                        data['high'],
-                                        data['low'],
-                                        data['close'],
-                                        data['volume'],
-                                        data['quote_asset_volume'],
-                                        data['number_of_trades'],
-                                        data['taker_buy_base_asset'],
-                                        data['taker_buy_quote_asset'],
-                                        ))
-                    except sqlite3.IntegrityError:
-                        pass  # This just means the data already exists in the database, so ignore.
-                    except sqlite3.OperationalError:
-                        connection.commit()
-                        self.output_message("Insertion to database failed. Will retry next run.", 4)
-                        return False
-            connection.commit()
+        try:
+            inserted = self.databasePool.insert_rows(self.databaseTable, database.get_candle_rows(totalData))
+        except sqlite3.OperationalError:
+            self.output_message("Insertion to database failed. Will retry next run.", 4)
+            return False
+
+        self.update_cache(totalData, inserted)
+
         self.output_message("Successfully stored all new data to database.")
         return True
 
+    def get_resample_source(self, connection: sqlite3.Connection) -> tuple or None:
+        """
+        Returns the locally stored interval table that can build the most new periods of this interval. Ties go to the
+        coarsest interval, since it has the fewest candles to aggregate.
+        :param connection: Connection to database.
+        :return: Tuple of source table and its interval in milliseconds, or None if no table can build new periods.
+        """
+        timeframe = interval_to_milliseconds(self.interval)
+        if DAY_MILLISECONDS % timeframe != 0:  # Only intervals up to a day are aligned to the epoch by Binance.
+            return None
+
+        latestTimestamp = self.get_latest_database_row()
+        latestClose = latestTimestamp[0] + timeframe if latestTimestamp else 0
+        best = None
+        for table in database.get_candle_tables(connection):
+            interval = table[len('data_'):]
+            if not self.is_valid_interval(interval) or table == self.databaseTable:
+                continue
+
+            sourceTimeframe = interval_to_milliseconds(interval)
+            if sourceTimeframe >= timeframe or timeframe % sourceTimeframe != 0:
+                continue
+
+            sourceLatest = self.databasePool.get_latest_timestamp(table)
+            if sourceLatest is None:
+                continue
+
+            closedUntil = (sourceLatest + sourceTimeframe) // timeframe * timeframe
+            if closedUntil > latestClose and (best is None or (closedUntil, sourceTimeframe) > best[:2]):
+                best = (closedUntil, sourceTimeframe, table)
+
+        return None if best is None else (best[2], best[1])
+
+    def resample_from_finer_data(self) -> int:
+        """
+        Builds periods newer than the newest stored period of this interval from a finer interval stored locally, e.g.
+        4h periods from 1m periods, without calling the API.
+        :return: Amount of periods built.
+        """
+        connection = self.databasePool.get_connection()
+        source = self.get_resample_source(connection)
+        if source is None:
+            return 0
+
+        sourceTable, sourceTimeframe = source
+        try:
+            inserted = database.resample_table(connection, sourceTable, sourceTimeframe, self.databaseTable,
+                                               interval_to_milliseconds(self.interval))
+        finally:
+            self.databasePool.invalidate(self.databaseTable)
+
+        self.output_message(f"Built {inserted} periods from {sourceTable[len('data_'):]} data stored locally.")
+        return inserted
+
+    def get_gap_map(self) -> list:
+        """
+        Scans candles stored since the previous scan for gaps and returns every known gap of the database table.
+        :return: List of tuples with open times of the first and last missing candle and status of every gap.
+        """
+        connection = self.databasePool.get_connection()
+        database.scan_gaps(connection, self.databaseTable, interval_to_milliseconds(self.interval))
+        return database.get_gaps(connection, self.databaseTable)
+
+    def backfill_gaps(self) -> int:
+        """
+        Downloads only the candles missing from gaps in the gap map. Ranges the exchange has no candles for are marked
+        as unavailable, so they are never downloaded again.
+        :return: Amount of candles backfilled.
+        """
+        gaps = [gap for gap in self.get_gap_map() if gap[2] == database.GAP_MISSING]
+        if len(gaps) == 0:
+            return 0
+
+        self.output_message(f"Backfilling {len(gaps)} gaps in data...")
+        timeframe = interval_to_milliseconds(self.interval)
+        backfilled = 0
+
+        for start, end, _ in gaps:
+            for tempData in stream_klines(self.binanceClient.get_klines, self.symbol, self.interval, start, end,
+                                          timeframe):
+                candles = CandleStore.from_klines(tempData).between(start, end)
+                try:
+                    backfilled += self.databasePool.insert_rows(self.databaseTable, database.get_candle_rows(candles))
+                except sqlite3.OperationalError:
+                    self.output_message("Backfilling data failed. Will retry next run.", 4)
+                    return backfilled
+
+            # Whatever is left, the exchange lacks.
+            database.update_gap(self.databasePool.get_connection(), self.databaseTable, timeframe, start, end,
+                                database.GAP_UNAVAILABLE)
+
+        if backfilled > 0 and self.candleCache is not None:
+            self.release_cache_views()
+            self.candleCache.rebuild(self.databasePool.get_connection(), self.databaseTable)
+
+        self.output_message(f"Backfilled {backfilled} missing periods.")
+        return backfilled
+
+    def release_cache_views(self):
+        """
+        Copies run-time data viewing the memory-mapped cache to memory, so the cache file can be appended to or
+        replaced. Run-time data that is already in memory is left as it is.
+        """
+        self.data.reserve(len(self.data))
+
+    def update_cache(self, candles: CandleStore, inserted: int):
+        """
+        Keeps binary cache in sync with candles that were just dumped to database. Candles newer than the cache are
+        appended to it; if any older candles were inserted, the cache is rebuilt from the database.
+        :param candles: Candles that were dumped to database.
+        :param inserted: Amount of candles that were actually inserted to database.
+        """
+        if self.candleCache is None:
+            return
+
+        latestTimestamp = self.candleCache.get_latest_timestamp()
+        newCandles = candles if latestTimestamp is None else candles.between(latestTimestamp + 1)
+        if inserted != len(newCandles) or not self.candleCache.append(newCandles):
+            self.output_message("Rebuilding candle cache from database...")
+            self.candleCache.rebuild(self.databasePool.get_connection(), self.databaseTable)
+
+    def get_candles_from_cache(self, connection: sqlite3.Connection) -> CandleStore:
+        """
+        Returns candles in lookback or date range window from binary cache. If the cache is missing, outdated, corrupt,
+        or out of sync with the database, it is rebuilt first.
+        :param connection: Connection to database.
+        :return: Candle store viewing the memory-mapped cache.
+        """
+        if not self.candleCache.is_valid() or not self.candleCache.is_synced(connection, self.databaseTable):
+            self.output_message("Rebuilding candle cache from database...")
+            self.release_cache_views()
+            self.candleCache.rebuild(connection, self.databaseTable)
+
+        candles = self.candleCache.get_candles().between(self.startTimestamp, self.endTimestamp)
+        if self.lookback is not None:
+            candles = candles[max(len(candles) - self.lookback, 0):]
+        return candles
+
     def get_latest_database_row(self):
         """
-        Returns the latest row from database table.
-        :return: Row data or None depending on if value exists.
+        Returns the latest row from database table. The latest timestamp is cached by the database pool until the table
+        is written to, so checking whether the database is updated does not query it again.
+        :return: Row with the latest timestamp in milliseconds or None depending on if value exists.
         """
-        with closing(sqlite3.connect(self.databaseFile)) as connection:
-            with closing(connection.cursor()) as cursor:
-                cursor.execute(f'SELECT date_utc FROM {self.databaseTable} ORDER BY date_utc DESC LIMIT 1')
-                return cursor.fetchone()
+        latestTimestamp = self.databasePool.get_latest_timestamp(self.databaseTable)
+        return None if latestTimestamp is None else (latestTimestamp,)
 
     def get_data_from_database(self):
         """
-        Loads data from database and appends it to run-time data.
+        Loads data in lookback or date range window from database (or its binary cache) to run-time data.
         """
-        with closing(sqlite3.connect(self.databaseFile)) as connection:
-            with closing(connection.cursor()) as cursor:
-                rows = cursor.execute(f'''
-                        SELECT "date_utc", "open_price", "high_price", "low_price", "close_price", "volume", 
-                        "quote_asset_volume", "number_of_trades", "taker_buy_base_asset", "taker_buy_quote_asset"
-                        FROM {self.databaseTable} ORDER BY date_utc DESC
-                        ''').fetchall()
+        connection = self.databasePool.get_connection()
+        if self.candleCache is not None:
+            candles = self.get_candles_from_cache(connection)
+        else:
+            candles = CandleStore.from_database_rows(database.get_candle_rows_between(
+                connection, self.databaseTable, self.startTimestamp, self.endTimestamp, limit=self.lookback))
 
-        if len(rows) > 0:
+        if len(candles) > 0:
             self.output_message("Retrieving data from database...")
         else:
             self.output_message("No data found in database.")
             return
 
-        for row in rows:
-            date_utc = datetime.strptime(row[0], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
-            self.data.append({'date_utc': date_utc,
-                              'open': float(row[1]),
-                              'high': float(row[2]),
-                              'low': float(row[3]),
-                              'close': float(row[4]),
-                              'volume': float(row[5]),
-                              'quote_asset_volume': float(row[6]),
-                              'number_of_trades': float(row[7]),
-                              'taker_buy_base_asset': float(row[8]),
-                              'taker_buy_quote_asset': float(row[9]),
-                              })
+        self.data = candles
+        if self.lookback is not None and len(candles) < self.lookback:
+            self.historyExhausted = True
+
+    def load_older_data(self, periods: int) -> int:
+        """
+        Pages in periods older than the oldest period in run-time data from database.
+        :param periods: Amount of older periods to load.
+        :return: Amount of periods that were loaded.
+        """
+        if self.historyExhausted or periods <= 0:
+            return 0
+
+        endTimestamp = self.data.get_timestamp(0) - 1 if len(self.data) > 0 else self.endTimestamp
+        rows = database.get_candle_rows_between(self.databasePool.get_connection(), self.databaseTable,
+                                                endTimestamp=endTimestamp, limit=periods)
+
+        if len(rows) < periods:
+            self.historyExhausted = True
+        if len(rows) > 0:
+            self.output_message(f"Loaded {len(rows)} older periods from database.")
+            self.data = CandleStore.from_database_rows(rows).concatenate(self.data)
+        return len(rows)
+
+    def load_newer_data(self):
+        """
+        Loads periods newer than the newest period in run-time data from database. If a binary cache is used, run-time
+        data is swapped for a view of the updated cache instead.
+        """
+        if self.candleCache is not None:
+            self.get_data_from_database()
+            return
+
+        startTimestamp = self.data.get_timestamp(-1) + 1 if len(self.data) > 0 else self.startTimestamp
+        rows = database.get_candle_rows_between(self.databasePool.get_connection(), self.databaseTable, startTimestamp,
+                                                self.endTimestamp)
+        self.data.extend(CandleStore.from_database_rows(rows))
+
+    def ensure_history(self, periods: int) -> bool:
+        """
+        Makes sure at least periods closed periods are in run-time data by paging in older periods if needed.
+        :param periods: Amount of periods required.
+        :return: A boolean whether enough periods are available or not.
+        """
+        if len(self.data) < periods:
+            self.load_older_data(periods - len(self.data))
+        return len(self.data) >= periods
 
     def database_is_updated(self) -> bool:
         """
@@ -232,8 +416,7 @@ class Data:
         result = self.get_latest_database_row()
         if result is None:
             return False
-        latestDate = datetime.strptime(result[0], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
-        return self.is_latest_date(latestDate)
+        return self.is_latest_date(timestamp_to_datetime(result[0]))
 
     # noinspection PyProtectedMember
     def get_latest_timestamp(self) -> int:
@@ -245,21 +428,21 @@ class Data:
         if result is None:
             return self.binanceClient._get_earliest_valid_timestamp(self.symbol, self.interval)
         else:
-            latestDate = datetime.strptime(result[0], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
-            return int(latestDate.timestamp()) * 1000  # Converting timestamp to milliseconds
+            return result[0]
 
     # noinspection PyProtectedMember
     def update_database_and_data(self):
         """
-        Updates database by retrieving information from Binance API
+        Updates database by retrieving information from Binance API. Afterwards, only the gaps in the gap map that can
+        still be downloaded are backfilled.
         """
         result = self.get_latest_database_row()
         if result is None:  # Then get the earliest timestamp possible
             timestamp = self.binanceClient._get_earliest_valid_timestamp(self.symbol, self.interval)
             self.output_message(f'Downloading all available historical data for {self.interval} intervals.')
         else:
-            latestDate = datetime.strptime(result[0], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
-            timestamp = int(latestDate.timestamp()) * 1000  # Converting timestamp to milliseconds
+            timestamp = result[0]
+            latestDate = timestamp_to_datetime(timestamp)
             dateWithIntervalAdded = latestDate + timedelta(minutes=self.get_interval_minutes())
             self.output_message(f"Previous data up to UTC {dateWithIntervalAdded} found.")
 
@@ -267,94 +450,104 @@ class Data:
             newData = self.get_new_data(timestamp)
             self.output_message("Successfully downloaded all new data.")
             self.output_message("Inserting data to live program...")
+            newStart = len(self.data)
             self.insert_data(newData)
             self.output_message("Storing updated data to database...")
-            self.dump_to_table(self.data[-len(newData):])
+            if newStart < len(self.data) and self.dump_to_table(self.data[newStart:]):
+                if self.candleCache is not None:  # Swap in-memory copy for a view of the updated cache.
+                    self.get_data_from_database()
         else:
             self.output_message("Database is up-to-date.")
 
+        if self.backfill_gaps() > 0:
+            self.get_data_from_database()
+
     # noinspection PyProtectedMember
-    def custom_get_new_data(self, limit: int = 500, progress_callback=None, locked=None, removeFirst=False,
-                            caller=-1):
+    def custom_get_new_data(self, limit: int = 1000, progress_callback=None, locked=None, removeFirst=False,
+                            caller=-1, workers: int = DOWNLOAD_WORKERS):
         """
-        Returns new data from Binance API from timestamp specified, however this one is custom-made.
+        Returns new data from Binance API from timestamp specified, however this one is custom-made. The range is split
+        into chunks that are downloaded concurrently under a shared request weight budget and merged in order.
+
+        Closed periods of every chunk are committed to the database as soon as the chunk arrives, so memory use does
+        not grow while downloading. Chunks are committed in chronological order, so the newest period in the database is
+        a checkpoint of the download: a download that was canceled or crashed continues from it the next time it runs.
         :param caller: Caller that called this function. Only used for botThread.
         :param removeFirst: Boolean whether newest data is removed or not.
         :param locked: Signal to emit back to GUI when storing data. Cannot be canceled once here.
         :param progress_callback: Signal to emit back to GUI to show progress.
         :param limit: Limit per pull.
-        :return: A list of dictionaries.
+        :param workers: Amount of requests that can be in flight at once.
+        :return: Candle store with all run-time data.
         """
-        # This code below is taken from binance client and slightly refactored.
         self.downloadLoop = True
-        output_data = []  # Initialize our list
+        currentData = []  # Current period is still open, so it is never stored to database.
         timeframe = interval_to_milliseconds(self.interval)
-        start_ts = total_beginning_timestamp = self.get_latest_timestamp()
-        end_progress = time.time() * 1000 - total_beginning_timestamp
-        idx = 0
-
-        while True and self.downloadLoop:
-            tempData = self.binanceClient.get_klines(
-                symbol=self.symbol,
-                interval=self.interval,
-                limit=limit,
-                startTime=start_ts,
-                endTime=None
-            )
-
-            if not len(tempData):
-                break
-
-            output_data += tempData
-            start_ts = tempData[-1][0]
-            if progress_callback:
-                progress = (start_ts - total_beginning_timestamp) / end_progress * 94
+        total_beginning_timestamp = self.get_latest_timestamp()
+        end_timestamp = int(time.time() * 1000)
+        end_progress = max(end_timestamp - total_beginning_timestamp, 1)
+
+        for tempData in stream_klines(self.binanceClient.get_klines, self.symbol, self.interval,
+                                      total_beginning_timestamp, end_timestamp, timeframe, limit=limit,
+                                      workers=workers, cancelled=lambda: not self.downloadLoop):
+            closedData = [kline for kline in tempData if kline[6] < end_timestamp]  # Close time has passed.
+            currentData += tempData[len(closedData):]
+            if closedData and not self.dump_to_table(CandleStore.from_klines(closedData)):
+                raise RuntimeError("Storing downloaded data to database failed. Download will resume next run.")
+
+            if progress_callback and len(tempData) > 0:
+                progress = (tempData[-1][0] - total_beginning_timestamp) / end_progress * 94
                 progress_callback.emit(int(progress), "Downloading data...", caller)
 
-            idx += 1
-            # check if we received less than the required limit and exit the loop
-            if len(tempData) < limit:
-                # exit the while loop
-                break
-
-            # increment next call by our timeframe
-            start_ts += timeframe
-
-            # sleep after every 5th call to be kind to the API
-            if idx % 5 == 0:
-                time.sleep(1)
-
         if not self.downloadLoop:
-            progress_callback.emit(-1, "Download canceled.", caller)
+            progress_callback.emit(-1, "Download canceled. Downloaded data was saved.", caller)
             return []
 
         if locked:
             locked.emit()
 
-        if removeFirst:
-            output_data = output_data[:-1]
-
-        progress_callback.emit(95, "Saving data...", caller)
-        self.insert_data(output_data)
-        progress_callback.emit(97, "This may take a while. Dumping data to database...", caller)
-
-        if removeFirst:  # We don't want current data as it's not the latest data.
-            self.dump_to_table(self.data[:len(output_data)])
-        else:
-            self.dump_to_table(self.data[1:len(output_data)])
+        progress_callback.emit(95, "Loading downloaded data...", caller)
+        self.load_newer_data()
+        if not removeFirst:  # We only want current data in run-time data if newest data is not removed.
+            self.insert_data(currentData)
 
         progress_callback.emit(100, "Downloaded all new data successfully.", caller)
         self.downloadLoop = False
         self.downloadCompleted = True
         return self.data
 
+    def start_stream(self, socketManager=None):
+        """
+        Starts streaming current period and price from the exchange's WebSocket streams, so they are read from memory
+        instead of being requested on every tick.
+        :param socketManager: Socket manager to stream with. If none, the shared socket manager is used.
+        """
+        if self.marketStream is None:
+            self.marketStream = MarketStream(self.binanceClient, self.symbol, self.interval, socketManager)
+            self.marketStream.start()
+
+    def stop_stream(self):
+        """
+        Stops streaming. Current period and price are requested from the REST API again afterwards.
+        """
+        if self.marketStream is not None:
+            self.marketStream.stop()
+            self.marketStream = None
+
     def get_new_data(self, timestamp, limit: int = 1000):
         """
-        Returns new data from Binance API from timestamp specified.
+        Returns new data from Binance API from timestamp specified. If the market stream is live, closed periods are
+        taken from it and only periods it missed are requested.
         :param timestamp: Initial timestamp.
         :param limit: Limit per pull.
         :return: A list of dictionaries.
         """
+        if self.marketStream is not None:
+            newData = self.marketStream.get_closed_klines(timestamp)
+            if newData is not None:
+                self.downloadCompleted = True
+                return newData
+
         newData = self.binanceClient.get_historical_klines(self.symbol, self.interval, timestamp + 1, limit=limit)
         self.downloadCompleted = True
         return newData[:-1]  # Up to -1st index, because we don't want current period data.
@@ -373,33 +566,27 @@ class Data:
         Checks whether data is fully updated or not.
         :return: A boolean whether data is updated or not with Binance values.
         """
-        latestDate = self.data[0]['date_utc']
+        latestDate = self.data.get_datetime(-1)
         return self.is_latest_date(latestDate)
 
     def insert_data(self, newData: list):
         """
-        Inserts data from newData to run-time data.
-        :param newData: List with new data values.
-        """
-        for data in newData:
-            parsedDate = datetime.fromtimestamp(int(data[0]) / 1000, tz=timezone.utc)
-            self.data.insert(0, {'date_utc': parsedDate,
-                                 'open': float(data[1]),
-                                 'high': float(data[2]),
-                                 'low': float(data[3]),
-                                 'close': float(data[4]),
-                                 'volume': float(data[5]),
-                                 'quote_asset_volume': float(data[6]),
-                                 'number_of_trades': float(data[7]),
-                                 'taker_buy_base_asset': float(data[8]),
-                                 'taker_buy_quote_asset': float(data[9]),
-                                 })
+        Inserts data from newData to run-time data. Periods that are not newer than the newest run-time period are
+        skipped, so overlapping downloads do not repeat periods.
+        :param newData: List with new data values in chronological order.
+        """
+        newCandles = CandleStore.from_klines(newData)
+        if len(self.data) > 0:
+            newCandles = newCandles.between(self.data.get_timestamp(-1) + 1)
+        if len(newCandles) > 0:
+            self.indicatorCache.invalidate(self.symbol, self.interval, newCandles.get_timestamp(0))
+        self.data.extend(newCandles)
 
     def update_data(self):
         """
         Updates run-time data with Binance API values.
         """
-        latestDate = self.data[0]['date_utc']
+        latestDate = self.data.get_datetime(-1)
         timestamp = int(latestDate.timestamp()) * 1000
         dateWithIntervalAdded = latestDate + timedelta(minutes=self.get_interval_minutes())
         self.output_message(f"Previous data found up to UTC {dateWithIntervalAdded}.")
@@ -410,46 +597,64 @@ class Data:
         else:
             self.output_message("Data is up-to-date.")
 
+    def tick(self):
+        """
+        Returns context manager during which every indicator shares one snapshot of the period in progress, e.g.
+        with data.tick(): trader.main_logic().
+        """
+        return self.currentSnapshot.tick()
+
     def get_current_data(self) -> dict:
         """
-        Retrieves current market dictionary with open, high, low, close prices.
+        Returns current market dictionary from the snapshot of the period in progress. A new snapshot is only retrieved
+        if the snapshot expired or run-time data moved on to another period.
+        :return: A dictionary with current open, high, low, and close prices. It is shared, so it should not be changed.
+        """
+        currentData = self.currentSnapshot.get()
+        if currentData is None or currentData['date_utc'] != self.data.get_datetime(-1) + timedelta(
+                minutes=self.get_interval_minutes()):
+            currentData = self.retrieve_current_data()
+            self.currentSnapshot.set(currentData)
+        return currentData
+
+    def retrieve_current_data(self) -> dict:
+        """
+        Retrieves current market dictionary with open, high, low, close prices. The period in progress is read from the
+        market stream if it is live.
         :return: A dictionary with current open, high, low, and close prices.
         """
         try:
             if not self.data_is_updated():
                 self.update_data()
 
-            currentInterval = self.data[0]['date_utc'] + timedelta(minutes=self.get_interval_minutes())
+            currentInterval = self.data.get_datetime(-1) + timedelta(minutes=self.get_interval_minutes())
             currentTimestamp = int(currentInterval.timestamp() * 1000)
 
-            nextInterval = currentInterval + timedelta(minutes=self.get_interval_minutes())
-            nextTimestamp = int(nextInterval.timestamp() * 1000) - 1
-            currentData = self.binanceClient.get_klines(symbol=self.symbol,
-                                                        interval=self.interval,
-                                                        startTime=currentTimestamp,
-                                                        endTime=nextTimestamp,
-                                                        )[0]
-            currentDataDictionary = {'date_utc': currentInterval,
-                                     'open': float(currentData[1]),
-                                     'high': float(currentData[2]),
-                                     'low': float(currentData[3]),
-                                     'close': float(currentData[4]),
-                                     'volume:': float(currentData[5]),
-                                     'quote_asset_volume:': float(currentData[6]),
-                                     'number_of_trades:': float(currentData[7]),
-                                     'taker_buy_base_asset:': float(currentData[8]),
-                                     'taker_buy_quote_asset:': float(currentData[9]), }
-            return currentDataDictionary
+            currentData = None if self.marketStream is None else self.marketStream.get_current_kline(currentTimestamp)
+            if currentData is None:
+                nextInterval = currentInterval + timedelta(minutes=self.get_interval_minutes())
+                nextTimestamp = int(nextInterval.timestamp() * 1000) - 1
+                currentData = self.binanceClient.get_klines(symbol=self.symbol,
+                                                            interval=self.interval,
+                                                            startTime=currentTimestamp,
+                                                            endTime=nextTimestamp,
+                                                            )[0]
+            currentDataDictionary = {'date_utc': currentInterval, **get_kline_row(currentData)}
+            return add_derived_fields(currentDataDictionary)
         except Exception as e:
             self.output_message(f"Error: {e}. Retrying in 5 seconds...", 4)
             time.sleep(5)
-            return self.get_current_data()
+            return self.retrieve_current_data()
 
     def get_current_price(self) -> float:
         """
-        Returns the current market ticker price.
+        Returns the current market ticker price. It is read from the market stream if it is live.
         :return: Ticker market price
         """
+        price = None if self.marketStream is None else self.marketStream.get_price()
+        if price is not None:
+            return price
+
         try:
             return float(self.binanceClient.get_symbol_ticker(symbol=self.symbol)['price'])
         except Exception as e:
@@ -480,11 +685,11 @@ class Data:
         else:
             raise ValueError("Invalid interval.", 4)
 
-    def write_csv_data(self, totalData: list, fileName: str, armyTime: bool = True) -> str:
+    def write_csv_data(self, totalData, fileName: str, armyTime: bool = True) -> str:
         """
         Writes CSV data to CSV folder in root directory of application.
         :param armyTime: Boolean if date will be in army type. If false, data will be in standard type.
-        :param totalData: Data to write to CSV file.
+        :param totalData: Iterable of dictionary rows to write to CSV file.
         :param fileName: Filename to name CSV in.
         :return: Absolute path to CSV file.
         """
@@ -526,9 +731,9 @@ class Data:
         self.update_database_and_data()  # Update data if updates exist.
         fileName = f'{self.symbol}_data_{self.interval}.csv'
         if descending:
-            path = self.write_csv_data(self.data, fileName=fileName, armyTime=armyTime)
+            path = self.write_csv_data(reversed(self.data), fileName=fileName, armyTime=armyTime)
         else:
-            path = self.write_csv_data(self.data[::-1], fileName=fileName, armyTime=armyTime)
+            path = self.write_csv_data(self.data, fileName=fileName, armyTime=armyTime)
 
         self.output_message(f'Data saved to {path}.')
         return path
@@ -584,32 +789,66 @@ class Data:
         elif prices <= 0:
             self.output_message("Prices cannot be 0 or less than 0.")
             return False
-        elif shift + extraShift + prices > len(self.data) + 1:
+
+        self.ensure_history(shift + extraShift + prices)
+        if shift + extraShift + prices > len(self.data) + 1:
             self.output_message("Shift + prices period cannot be more than data available.")
             return False
         return True
 
     def verify_integrity(self) -> bool:
         """
-        Verifies integrity of data by checking if there's any repeated data.
-        :return: A boolean whether the data contains no repeated data or not.
+        Verifies integrity of data by checking if there's any repeated or missing data. Gaps the exchange has no data
+        for are not counted as missing data.
+        :return: A boolean whether the data contains no repeated or missing data or not.
         """
         if len(self.data) < 1:
             self.output_message("No data found.", 4)
             return False
 
-        previousData = self.data[0]
-        for data in self.data[1:]:
-            if data['date_utc'] == previousData['date_utc']:
-                self.output_message("Repeated data detected.", 4)
-                self.output_message(f'Previous data: {previousData}', 4)
-                self.output_message(f'Next data: {data}', 4)
-                return False
-            previousData = data
+        repeatedIndices = np.flatnonzero(np.diff(self.data.timestamps) == 0)
+        if len(repeatedIndices) > 0:
+            index = int(repeatedIndices[0])
+            self.output_message("Repeated data detected.", 4)
+            self.output_message(f'Previous data: {self.data[index]}', 4)
+            self.output_message(f'Next data: {self.data[index + 1]}', 4)
+            return False
+
+        unavailableGaps = database.get_gaps(self.databasePool.get_connection(), self.databaseTable,
+                                            status=database.GAP_UNAVAILABLE)
+        unavailableGaps = {(start, end) for start, end, _ in unavailableGaps}
+        gaps = [gap for gap in self.data.get_gaps(interval_to_milliseconds(self.interval))
+                if gap not in unavailableGaps]
+        if len(gaps) > 0:
+            self.output_message(f"Missing data detected in {len(gaps)} ranges.", 4)
+            self.output_message(f'First missing range: UTC {timestamp_to_datetime(gaps[0][0])} to '
+                                f'{timestamp_to_datetime(gaps[0][1])}', 4)
+            return False
 
         self.output_message("Data has been verified to be correct.")
         return True
 
+    def get_latest_values(self, parameter: str, prices: int, shift: int = 0, update: bool = True) -> np.ndarray:
+        """
+        Returns values of parameter provided for the latest amount of prices in chronological order.
+        :param parameter: Parameter to get values of.
+        :param prices: Amount of values to return. Fewer values are returned if there is not enough data.
+        :param shift: Periods from current period to shift values by.
+        :param update: Boolean for whether function should call API and get latest data or not. If true, the current
+                       period is treated as the newest value.
+        :return: Array of values with the newest value last.
+        """
+        self.ensure_history(prices + shift)
+        if update:
+            if shift == 0:
+                closedValues = self.data[max(len(self.data) - prices + 1, 0):].get_column(parameter)
+                currentValue = get_data_from_parameter(data=self.get_current_data(), parameter=parameter)
+                return np.append(closedValues, currentValue)
+            shift -= 1  # The current period is shift 0, so closed periods start from 1.
+
+        end = len(self.data) - shift
+        return self.data[max(end - prices, 0):end].get_column(parameter)
+
     def get_summation(self, prices: int, parameter: str, round_value: bool = True, update: bool = True) -> float:
         """
         Returns total summation.
@@ -619,12 +858,7 @@ class Data:
         :param round_value: Boolean that determines whether returned output is rounded or not.
         :return: Total summation.
         """
-        data = [self.get_current_data()] + self.data if update else self.data
-        data = data[:prices]
-
-        total = 0
-        for period in data:
-            total += period[parameter]
+        total = float(np.sum(self.get_latest_values(parameter, prices, update=update)))
 
         if round_value:
             return round(total, 0)
@@ -640,14 +874,7 @@ class Data:
         :param round_value: Boolean that determines whether returned output is rounded or not.
         :return: Lowest low value from periods.
         """
-        data = [self.get_current_data()] + self.data if update else self.data
-        data = data[:prices]
-
-        lowest = data[0][parameter]
-
-        for period in data[1:]:
-            if period[parameter] < lowest:
-                lowest = period[parameter]
+        lowest = float(np.min(self.get_latest_values(parameter, prices, update=update)))
 
         if round_value:
             return round(lowest, 2)
@@ -663,14 +890,7 @@ class Data:
         :param round_value: Boolean that determines whether returned output is rounded or not.
         :return: Highest high value from periods.
         """
-        data = [self.get_current_data()] + self.data if update else self.data
-        data = data[:prices]
-
-        highest = data[0][parameter]
-
-        for period in data[1:]:
-            if period[parameter] > highest:
-                highest = period[parameter]
+        highest = float(np.max(self.get_latest_values(parameter, prices, update=update)))
 
         if round_value:
             return round(highest, 2)
@@ -710,20 +930,15 @@ class Data:
             raise ValueError('Invalid input specified.')
 
         if shift > 0:
-            data = self.data
+            update = False
             shift -= 1
-        else:
-            data = [self.get_current_data()] + self.data if update else self.data
 
-        start = 500 + prices + shift if len(data) > 500 + prices + shift else len(data)
-        data = data[shift:start]
-        data = data[:]
-        data.reverse()
-
-        ups, downs = get_ups_and_downs(data=data, parameter=parameter)
-        averageUp, averageDown = self.helper_get_ema(ups, downs, prices)
-        rs = averageUp / averageDown
-        rsi = 100 - 100 / (1 + rs)
+        runningRsi = self.get_running_rsi(prices, parameter, shift + 1)
+        if update:
+            currentValue = get_data_from_parameter(data=self.get_current_data(), parameter=parameter)
+            rsi = runningRsi.get_provisional(currentValue)
+        else:
+            rsi = runningRsi.get_closed(shift)
 
         if shift == 0:
             self.rsi_data[prices] = rsi
@@ -732,6 +947,64 @@ class Data:
             return round(rsi, 2)
         return rsi
 
+    def get_running_rsi(self, prices: int, parameter: str, historySize: int) -> RunningRSI:
+        """
+        Returns running RSI state of closed periods in run-time data. The state is kept between calls, and only periods
+        that closed since the previous call are pushed to it. It is seeded again if it has to keep more past RSI values.
+        :param prices: Amount of periods to smooth average gains and losses over.
+        :param parameter: Parameter to get the RSI of.
+        :param historySize: Amount of past RSI values required.
+        :return: Running RSI state.
+        """
+        key = (prices, parameter)
+        runningRsi, timestamp = self.rsiStates.get(key, (None, None))
+        latestTimestamp = self.data.get_timestamp(-1)
+        if runningRsi is not None and runningRsi.history.maxlen >= historySize:
+            if timestamp == latestTimestamp:
+                return runningRsi
+            start = -1 if timestamp > latestTimestamp else self.data.find_index(timestamp) + 1
+        else:
+            start = -1
+
+        if start <= 0:  # Nothing to continue from, so seed again after a warm-up.
+            historySize = max(historySize, RSI_HISTORY, 0 if runningRsi is None else runningRsi.history.maxlen)
+            self.ensure_history(self.rsiWarmup + prices + historySize)
+            runningRsi = RunningRSI(prices, historySize)
+            seedStart = max(len(self.data) - self.rsiWarmup - prices - historySize, 0)
+            runningRsi.reset(self.data[seedStart:].get_column(parameter).tolist())
+        else:
+            for value in self.data[start:].get_column(parameter).tolist():
+                runningRsi.push(value)
+
+        self.rsiStates[key] = (runningRsi, self.data.get_timestamp(-1))
+        return runningRsi
+
+    def get_running_average(self, runningClass, prices: int, parameter: str):
+        """
+        Returns running moving average state of closed periods in run-time data. The state is kept between calls, and
+        only periods that closed since the previous call are pushed to it.
+        :param runningClass: Running moving average class, e.g. RunningSMA.
+        :param prices: Amount of periods in the average.
+        :param parameter: Parameter to get the average of.
+        :return: Running moving average state.
+        """
+        key = (runningClass.__name__, prices, parameter)
+        runningAverage, timestamp = self.runningAverages.get(key, (None, None))
+        latestTimestamp = self.data.get_timestamp(-1)
+        if timestamp == latestTimestamp:
+            return runningAverage
+
+        start = -1 if runningAverage is None or timestamp > latestTimestamp else self.data.find_index(timestamp) + 1
+        if start <= 0 or len(self.data) - start > prices:  # Faster (or only possible) to start over.
+            runningAverage = runningClass(prices)
+            runningAverage.reset(self.data[max(len(self.data) - prices, 0):].get_column(parameter).tolist())
+        else:
+            for value in self.data[start:].get_column(parameter).tolist():
+                runningAverage.push(value)
+
+        self.runningAverages[key] = (runningAverage, latestTimestamp)
+        return runningAverage
+
     def get_sma(self, prices: int, parameter: str, shift: int = 0, round_value: bool = True,
                 update: bool = True) -> float:
         """
@@ -746,9 +1019,16 @@ class Data:
         if not self.is_valid_average_input(shift, prices):
             raise ValueError('Invalid average input specified.')
 
-        data = [self.get_current_data()] + self.data if update else self.data
-        data = data[shift: prices + shift]  # Data now starts from shift and goes up to prices + shift
-        sma = sum([get_data_from_parameter(data=period, parameter=parameter) for period in data]) / prices
+        if shift == 0:  # Newest averages come from running state in O(1).
+            self.ensure_history(prices)
+            runningAverage = self.get_running_average(RunningSMA, prices, parameter)
+            if update:
+                sma = runningAverage.get_provisional(get_data_from_parameter(self.get_current_data(), parameter))
+            else:
+                sma = runningAverage.get_closed()
+        else:
+            values = self.get_latest_values(parameter, prices, shift=shift, update=update)
+            sma = float(np.sum(values)) / prices
 
         if round_value:
             return round(sma, 2)
@@ -768,21 +1048,61 @@ class Data:
         if not self.is_valid_average_input(shift, prices):
             raise ValueError('Invalid average input specified.')
 
-        data = [self.get_current_data()] + self.data if update else self.data
-        total = get_data_from_parameter(data=data[shift], parameter=parameter) * prices
-        data = data[shift + 1: prices + shift]  # Data now does not include the first shift period.
-
-        index = 0
-        for x in range(prices - 1, 0, -1):
-            total += x * get_data_from_parameter(data=data[index], parameter=parameter)
-            index += 1
+        if shift == 0:  # Newest averages come from running state in O(1).
+            self.ensure_history(prices)
+            runningAverage = self.get_running_average(RunningWMA, prices, parameter)
+            if update:
+                wma = runningAverage.get_provisional(get_data_from_parameter(self.get_current_data(), parameter))
+            else:
+                wma = runningAverage.get_closed()
+        else:
+            values = self.get_latest_values(parameter, prices, shift=shift, update=update)
+            weights = np.arange(prices - len(values) + 1, prices + 1)  # Newest period has the largest weight.
+            total = float(np.dot(values, weights))
 
-        divisor = prices * (prices + 1) / 2
-        wma = total / divisor
+            divisor = prices * (prices + 1) / 2
+            wma = total / divisor
         if round_value:
             return round(wma, 2)
         return wma
 
+    def get_closed_ema(self, prices: int, parameter: str, sma_prices: int = 5, shift: int = 0) -> float:
+        """
+        Returns EMA of a closed period. EMAs are cached in the shared indicator cache. A missing EMA is calculated from
+        the EMA of the period before it if that one is cached; otherwise, EMAs of every closed period are calculated
+        again from the initial SMA at once. If data is windowed, enough older periods are paged in before seeding for
+        the EMA to converge.
+        :param prices: Days to iterate EMA over (or the period).
+        :param parameter: Parameter to get the average of (e.g. open, close, high, or low values).
+        :param sma_prices: SMA prices to get first EMA over.
+        :param shift: Closed periods to shift by. Shift of 0 is the newest closed period.
+        :return: EMA of closed period.
+        """
+        key = (self.symbol, self.interval, 'ema', (prices, sma_prices), parameter)
+        index = len(self.data) - 1 - shift
+        ema = self.indicatorCache.get(key + (self.data.get_timestamp(index),))
+        if ema is not None:
+            return ema
+
+        if index >= sma_prices:
+            previousEma = self.indicatorCache.get(key + (self.data.get_timestamp(index - 1),))
+            if previousEma is not None:
+                multiplier = 2 / (prices + 1)
+                price = float(self.data[index:index + 1].get_column(parameter)[0])
+                ema = price * multiplier + previousEma * (1 - multiplier)
+                self.indicatorCache.set(key + (self.data.get_timestamp(index),), ema)
+                return ema
+
+        if not self.historyExhausted:
+            self.ensure_history(EMA_WARMUP_MULTIPLE * prices + sma_prices)
+            index = len(self.data) - 1 - shift
+
+        emas = indicators.ema(self.data.get_column(parameter), prices, sma_prices)
+        start = max(min(index, len(self.data) - EMA_CACHED_PERIODS), sma_prices - 1)
+        for timestamp, ema in zip(self.data.timestamps[start:].tolist(), emas[start:].tolist()):
+            self.indicatorCache.set(key + (timestamp,), ema)
+        return float(emas[index])
+
     def get_ema(self, prices: int, parameter: str, shift: int = 0, sma_prices: int = 5,
                 round_value: bool = True, update: bool = True) -> float:
         """
@@ -800,63 +1120,15 @@ class Data:
         elif sma_prices <= 0:
             raise ValueError("Initial amount of SMA values for initial EMA must be greater than 0.")
 
-        ema_data = self.ema_data
-        if shift > 0:
-            if prices in ema_data and parameter in ema_data[prices] and len(ema_data[prices][parameter]) > 0:
-                latestDate = ema_data[prices][parameter][-1][1]
-                if self.is_latest_date(latestDate):
-                    shift += 1
-                    ema = ema_data[prices][parameter][-shift][0]
-                    if round_value:
-                        return round(ema, 2)
-                    return ema
-
-        multiplier = 2 / (prices + 1)
-
-        if prices in ema_data and parameter in ema_data[prices] and len(ema_data[prices][parameter]) > 0:
-            latestDate = ema_data[prices][parameter][-1][1]
-            if self.is_latest_date(latestDate):
-                current_data = self.get_current_data() if update else self.data[0]
-                current_price = get_data_from_parameter(data=current_data, parameter=parameter)
-                previous_ema = ema_data[prices][parameter][-2][0]
-                ema = current_price * multiplier + previous_ema * (1 - multiplier)
-                ema_data[prices][parameter][-1] = (round(ema, 2), latestDate)
-            else:
-                current_data = self.get_current_data() if update else self.data[0]
-                current_price = current_data[parameter]
-                counter = 1
-                for period in self.data[::-1]:
-                    if period['date_utc'] == latestDate:
-                        break
-                    counter += 1
-
-                ema_data[prices][parameter].pop()  # Remove last EMA as it could be invalid.
-                for period in self.data[-counter:]:
-                    previous_ema = ema_data[prices][parameter][-1][0]
-                    ema = period[parameter] * multiplier + previous_ema * (1 - multiplier)
-                    ema_data[prices][parameter].append((round(ema, 2), period['date_utc']))
-
-                previous_ema = ema_data[prices][parameter][-1][0]
-                ema = current_price * multiplier * previous_ema * (1 - multiplier)  # Set current EMA.
-                ema_data[prices][parameter].append((round(ema, 2), current_data['date_utc']))
-
-            if shift > 0:
-                ema = ema_data[prices][parameter][-shift][0]
+        if update and shift == 0:
+            multiplier = 2 / (prices + 1)
+            currentPrice = get_data_from_parameter(data=self.get_current_data(), parameter=parameter)
+            ema = currentPrice * multiplier + self.get_closed_ema(prices, parameter, sma_prices) * (1 - multiplier)
+        elif update:
+            ema = self.get_closed_ema(prices, parameter, sma_prices, shift - 1)  # Shift of 1 is the newest closed one.
         else:
-            data = [self.get_current_data()] + self.data if update else self.data
-            sma_shift = len(data) - sma_prices
-            ema = self.get_sma(sma_prices, parameter, shift=sma_shift, round_value=False, update=update)
-            values = [(round(ema, 2), str(data[sma_shift]['date_utc']))]
-
-            for day in range(len(data) - sma_prices - shift):
-                current_index = len(data) - sma_prices - day - 1
-                current_price = get_data_from_parameter(data=data[current_index], parameter=parameter)
-                ema = current_price * multiplier + ema * (1 - multiplier)
-                values.append((round(ema, 2), data[current_index]['date_utc']))
-
-            ema_data[prices] = {parameter: values}
+            ema = self.get_closed_ema(prices, parameter, sma_prices, shift)
 
-        self.ema_data = ema_data
         if round_value:
             return round(ema, 2)
         return ema
@@ -0,0 +1,381 @@
+import sqlite3
+import numpy as np
+
+from itertools import islice
+from contextlib import closing
+from candles import CANDLE_FIELDS, CandleStore, find_gaps, timestamp_to_datetime
+
+SCHEMA_VERSION = 1  # Stored in the user_version pragma. Version 0 databases store dates and prices as text.
+CHUNK_SIZE = 50000  # Rows written per transaction when bulk inserting or migrating.
+MIGRATION_SUFFIX = '_migration'
+LEGACY_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+GAP_MISSING = 0  # Candles are missing from the database and can be backfilled.
+GAP_UNAVAILABLE = 1  # Exchange has no candles in the range (e.g. it was down), so it is never downloaded again.
+DATABASE_FIELDS = ('timestamp_utc', 'open_price', 'high_price', 'low_price', 'close_price', 'volume',
+                   'quote_asset_volume', 'number_of_trades', 'taker_buy_base_asset', 'taker_buy_quote_asset')
+
+
+def set_pragmas(connection: sqlite3.Connection):
+    """
+    Sets pragmas tuned for large candle tables on connection provided. WAL journal mode is persistent, so readers
+    opening the database later also benefit from it.
+    :param connection: Connection to set pragmas on.
+    """
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')  # Safe with WAL; only the last transaction can roll back.
+    connection.execute('PRAGMA temp_store=MEMORY')
+    connection.execute('PRAGMA cache_size=-65536')  # 64 MB page cache.
+
+
+def create_candle_table(connection: sqlite3.Connection, table: str):
+    """
+    Creates candle table provided if it does not exist. Candles are keyed by their open time in epoch milliseconds.
+    Since the key is an INTEGER PRIMARY KEY, it is the table's rowid, so range queries and latest row lookups walk the
+    table's own B-tree instead of a separate index.
+    :param connection: Connection to database.
+    :param table: Name of table to create.
+    """
+    connection.execute(f'''
+                       CREATE TABLE IF NOT EXISTS {table}(
+                       timestamp_utc INTEGER PRIMARY KEY,
+                       open_price REAL NOT NULL,
+                       high_price REAL NOT NULL,
+                       low_price REAL NOT NULL,
+                       close_price REAL NOT NULL,
+                       volume REAL NOT NULL,
+                       quote_asset_volume REAL NOT NULL,
+                       number_of_trades INTEGER NOT NULL,
+                       taker_buy_base_asset REAL NOT NULL,
+                       taker_buy_quote_asset REAL NOT NULL
+                       );''')
+    connection.commit()
+
+
+def get_schema_version(connection: sqlite3.Connection) -> int:
+    """
+    Returns schema version of database connected to.
+    """
+    return connection.execute('PRAGMA user_version').fetchone()[0]
+
+
+def get_candle_tables(connection: sqlite3.Connection) -> list:
+    """
+    Returns names of all candle tables (including unfinished migration tables) in database connected to.
+    """
+    rows = connection.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'data!_%' ESCAPE '!'")
+    return [row[0] for row in rows]
+
+
+def is_legacy_table(connection: sqlite3.Connection, table: str) -> bool:
+    """
+    Returns whether table provided uses the legacy text schema or not.
+    """
+    columns = [row[1] for row in connection.execute(f'PRAGMA table_info({table})')]
+    return 'date_utc' in columns
+
+
+def finish_migration(connection: sqlite3.Connection, table: str):
+    """
+    Replaces legacy table with its fully migrated table in one transaction.
+    :param connection: Connection to database.
+    :param table: Name of legacy table.
+    """
+    with connection:
+        connection.execute('BEGIN')
+        connection.execute(f'DROP TABLE IF EXISTS {table}')
+        connection.execute(f'ALTER TABLE {table}{MIGRATION_SUFFIX} RENAME TO {table}')
+
+
+def migrate_legacy_table(connection: sqlite3.Connection, table: str, chunkSize: int = CHUNK_SIZE):
+    """
+    Migrates legacy table to the current schema. Rows are copied in chunks to a migration table and every chunk is
+    committed on its own, so an interrupted migration continues from the newest copied row the next time it runs.
+    :param connection: Connection to database.
+    :param table: Name of legacy table to migrate.
+    :param chunkSize: Amount of rows to copy per transaction.
+    """
+    migrationTable = f'{table}{MIGRATION_SUFFIX}'
+    create_candle_table(connection, migrationTable)
+    fields = ', '.join(DATABASE_FIELDS)
+    values = ', '.join(f'CAST({field} AS {"INTEGER" if field == "number_of_trades" else "REAL"})'
+                       for field in DATABASE_FIELDS[1:])
+
+    latestTimestamp = connection.execute(f'SELECT MAX(timestamp_utc) FROM {migrationTable}').fetchone()[0]
+    latestDate = '' if latestTimestamp is None else timestamp_to_datetime(latestTimestamp).strftime(LEGACY_DATE_FORMAT)
+
+    while True:
+        endDate = connection.execute(f'''SELECT MAX(date_utc) FROM (
+                                         SELECT date_utc FROM {table} WHERE date_utc > ? ORDER BY date_utc LIMIT ?
+                                         )''', (latestDate, chunkSize)).fetchone()[0]
+        if endDate is None:
+            break
+
+        with connection:
+            connection.execute(f'''INSERT OR IGNORE INTO {migrationTable} ({fields})
+                                   SELECT CAST(strftime('%s', date_utc) AS INTEGER) * 1000, {values}
+                                   FROM {table}
+                                   WHERE date_utc > ? AND date_utc <= ? AND strftime('%s', date_utc) IS NOT NULL
+                                   ''', (latestDate, endDate))
+        latestDate = endDate
+
+    finish_migration(connection, table)
+
+
+def migrate_database(connection: sqlite3.Connection, chunkSize: int = CHUNK_SIZE) -> list:
+    """
+    Migrates every candle table in database connected to to the current schema version. Migrations that were
+    interrupted are resumed.
+    :param connection: Connection to database.
+    :param chunkSize: Amount of rows to copy per transaction.
+    :return: List of tables that were migrated.
+    """
+    if get_schema_version(connection) >= SCHEMA_VERSION:
+        return []
+
+    migrated = []
+    tables = get_candle_tables(connection)
+    for table in tables:
+        if table.endswith(MIGRATION_SUFFIX):
+            legacyTable = table[:-len(MIGRATION_SUFFIX)]
+            if legacyTable not in tables:  # Legacy table was dropped, but migration table was never renamed.
+                finish_migration(connection, legacyTable)
+                migrated.append(legacyTable)
+        elif is_legacy_table(connection, table):
+            migrate_legacy_table(connection, table, chunkSize=chunkSize)
+            migrated.append(table)
+
+    connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    return migrated
+
+
+def get_insert_query(table: str) -> str:
+    """
+    Returns query that inserts candle rows to table provided and ignores rows that already exist.
+    :param table: Table to insert rows to.
+    :return: Insert query.
+    """
+    return f'''INSERT OR IGNORE INTO {table} ({", ".join(DATABASE_FIELDS)})
+               VALUES ({", ".join("?" * len(DATABASE_FIELDS))});'''
+
+
+def get_candle_rows(candles):
+    """
+    Returns an iterator of database rows from candle store provided.
+    :param candles: Candle store to convert.
+    :return: Iterator of row tuples in the same order as DATABASE_FIELDS.
+    """
+    columns = [candles.columns[field].tolist() for field in CANDLE_FIELDS]
+    return zip(candles.timestamps.tolist(), *columns)
+
+
+def get_latest_timestamp(connection: sqlite3.Connection, table: str) -> int or None:
+    """
+    Returns open time of newest candle in table provided or None if table has no candles.
+    """
+    return connection.execute(f'SELECT MAX(timestamp_utc) FROM {table}').fetchone()[0]
+
+
+def get_candle_rows_between(connection: sqlite3.Connection, table: str, startTimestamp: int = None,
+                            endTimestamp: int = None, limit: int = None) -> list:
+    """
+    Returns database rows of candles that opened between start and end timestamps (both inclusive) in chronological
+    order. Since timestamps are the table's rowid, the range is found with a B-tree seek instead of a full scan.
+    :param connection: Connection to database.
+    :param table: Table to retrieve rows from.
+    :param startTimestamp: Starting timestamp in milliseconds. If none, starts from the oldest candle.
+    :param endTimestamp: Ending timestamp in milliseconds. If none, ends at the newest candle.
+    :param limit: If provided, only the newest limit rows in range are returned.
+    :return: List of row tuples in the same order as DATABASE_FIELDS.
+    """
+    conditions, parameters = [], []
+    if startTimestamp is not None:
+        conditions.append('timestamp_utc >= ?')
+        parameters.append(int(startTimestamp))
+    if endTimestamp is not None:
+        conditions.append('timestamp_utc <= ?')
+        parameters.append(int(endTimestamp))
+
+    where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+    query = f'SELECT {", ".join(DATABASE_FIELDS)} FROM {table} {where}'
+    if limit is None:
+        query += ' ORDER BY timestamp_utc'
+    else:  # Walk the table backwards from the newest candle in range, then put the page back in chronological order.
+        query = f'SELECT * FROM ({query} ORDER BY timestamp_utc DESC LIMIT ?) ORDER BY timestamp_utc'
+        parameters.append(int(limit))
+
+    return connection.execute(query, parameters).fetchall()
+
+
+def resample_table(connection: sqlite3.Connection, sourceTable: str, sourceTimeframe: int, table: str,
+                   timeframe: int, chunkSize: int = CHUNK_SIZE) -> int:
+    """
+    Builds candles of table provided from the finer candles of source table. Only periods newer than the newest candle
+    in table are built, so calling this again after source table was updated only aggregates the new candles. Periods
+    that have not closed yet in source table and a period source table starts in the middle of are left out.
+    :param connection: Connection to database.
+    :param sourceTable: Table with finer candles.
+    :param sourceTimeframe: Interval of source table candles in milliseconds.
+    :param table: Table to store resampled candles to.
+    :param timeframe: Interval of table candles in milliseconds. It has to be a multiple of sourceTimeframe.
+    :param chunkSize: Amount of resampled candles built per transaction.
+    :return: Amount of candles inserted.
+    """
+    sourceStart, sourceEnd = connection.execute(f'SELECT MIN(timestamp_utc), MAX(timestamp_utc) FROM {sourceTable}'
+                                                ).fetchone()
+    latestTimestamp = connection.execute(f'SELECT MAX(timestamp_utc) FROM {table}').fetchone()[0]
+    if sourceStart is None:
+        return 0
+
+    start = -(-sourceStart // timeframe) * timeframe  # First period source table has from the start.
+    if latestTimestamp is not None:
+        start = max(start, latestTimestamp + timeframe)
+    end = (sourceEnd + sourceTimeframe) // timeframe * timeframe  # Open time of the first period that has not closed.
+
+    query = get_insert_query(table)
+    inserted = 0
+    while start < end:
+        chunkEnd = min(start + timeframe * chunkSize, end)
+        rows = get_candle_rows_between(connection, sourceTable, start, chunkEnd - 1)
+        candles = CandleStore.from_database_rows(rows).resample(timeframe)
+        with connection:
+            inserted += connection.executemany(query, get_candle_rows(candles)).rowcount
+        start = chunkEnd
+
+    return inserted
+
+
+def insert_rows(connection: sqlite3.Connection, table: str, rows, chunkSize: int = CHUNK_SIZE) -> int:
+    """
+    Inserts rows to table with connection provided. Rows are written with executemany in chunks, and every chunk is
+    committed in its own transaction. Rows that already exist are ignored.
+    :param connection: Connection to database.
+    :param table: Table to insert rows to.
+    :param rows: Iterable of row tuples in the same order as DATABASE_FIELDS.
+    :param chunkSize: Amount of rows to write per transaction.
+    :return: Amount of rows that were actually inserted.
+    """
+    query = get_insert_query(table)
+    rows = iter(rows)
+    inserted = 0
+
+    while True:
+        chunk = list(islice(rows, chunkSize))
+        if not chunk:
+            break
+        with connection:  # Commits chunk if successful, otherwise rolls it back.
+            inserted += connection.executemany(query, chunk).rowcount
+
+    return inserted
+
+
+def bulk_insert(databaseFile: str, table: str, rows, chunkSize: int = CHUNK_SIZE) -> int:
+    """
+    Inserts rows to table in database file provided with a connection of its own. See insert_rows.
+    :param databaseFile: Path to database file.
+    :param table: Table to insert rows to.
+    :param rows: Iterable of row tuples in the same order as DATABASE_FIELDS.
+    :param chunkSize: Amount of rows to write per transaction.
+    :return: Amount of rows that were actually inserted.
+    """
+    with closing(sqlite3.connect(databaseFile)) as connection:
+        set_pragmas(connection)
+        return insert_rows(connection, table, rows, chunkSize=chunkSize)
+
+
+def create_gap_tables(connection: sqlite3.Connection):
+    """
+    Creates tables of the gap map if they do not exist. The gap map holds every range of candles missing from every
+    candle table and how far each table has been scanned for gaps.
+    :param connection: Connection to database.
+    """
+    connection.execute('''
+                       CREATE TABLE IF NOT EXISTS candle_gaps(
+                       table_name TEXT NOT NULL,
+                       start_timestamp INTEGER NOT NULL,
+                       end_timestamp INTEGER NOT NULL,
+                       status INTEGER NOT NULL,
+                       PRIMARY KEY (table_name, start_timestamp)
+                       );''')
+    connection.execute('''
+                       CREATE TABLE IF NOT EXISTS candle_gap_scans(
+                       table_name TEXT PRIMARY KEY,
+                       scanned_until INTEGER NOT NULL
+                       );''')
+    connection.commit()
+
+
+def scan_gaps(connection: sqlite3.Connection, table: str, timeframe: int, chunkSize: int = CHUNK_SIZE) -> int:
+    """
+    Scans candles stored since the previous scan of table provided for gaps and adds them to the gap map. Only open
+    times are read, and they are checked in vectorized chunks.
+    :param connection: Connection to database.
+    :param table: Candle table to scan.
+    :param timeframe: Interval of candles in table in milliseconds.
+    :param chunkSize: Amount of open times checked at a time.
+    :return: Amount of new gaps found.
+    """
+    create_gap_tables(connection)
+    scan = connection.execute('SELECT scanned_until FROM candle_gap_scans WHERE table_name = ?', (table,)).fetchone()
+    # Start from the last scanned candle to catch gaps after it.
+    cursor = connection.execute(f'SELECT timestamp_utc FROM {table} WHERE timestamp_utc >= ? ORDER BY timestamp_utc',
+                                (scan[0] if scan else -1,))
+    gaps = []
+    previousTimestamp = None
+
+    while True:
+        rows = cursor.fetchmany(chunkSize)
+        if not rows:
+            break
+
+        timestamps = np.array(rows, dtype=np.int64).ravel()
+        if previousTimestamp is not None:
+            timestamps = np.concatenate(([previousTimestamp], timestamps))
+        gaps += find_gaps(timestamps, timeframe)
+        previousTimestamp = int(timestamps[-1])
+
+    if previousTimestamp is not None:
+        with connection:
+            connection.executemany('INSERT OR IGNORE INTO candle_gaps VALUES (?, ?, ?, ?)',
+                                   [(table, start, end, GAP_MISSING) for start, end in gaps])
+            connection.execute('INSERT OR REPLACE INTO candle_gap_scans VALUES (?, ?)', (table, previousTimestamp))
+    return len(gaps)
+
+
+def get_gaps(connection: sqlite3.Connection, table: str, status: int = None) -> list:
+    """
+    Returns gaps in gap map of table provided.
+    :param connection: Connection to database.
+    :param table: Candle table to get gaps of.
+    :param status: If provided, only gaps with this status are returned.
+    :return: List of tuples with open times of the first and last missing candle and status of every gap.
+    """
+    create_gap_tables(connection)
+    query = 'SELECT start_timestamp, end_timestamp, status FROM candle_gaps WHERE table_name = ?'
+    parameters = [table]
+    if status is not None:
+        query += ' AND status = ?'
+        parameters.append(status)
+    return connection.execute(query + ' ORDER BY start_timestamp', parameters).fetchall()
+
+
+def update_gap(connection: sqlite3.Connection, table: str, timeframe: int, start: int, end: int,
+               status: int = GAP_MISSING) -> list:
+    """
+    Re-scans range of a gap after candles were backfilled into it and replaces the gap with the gaps that remain.
+    :param connection: Connection to database.
+    :param table: Candle table the gap is in.
+    :param timeframe: Interval of candles in table in milliseconds.
+    :param start: Open time of the first missing candle of the gap.
+    :param end: Open time of the last missing candle of the gap.
+    :param status: Status to give remaining gaps.
+    :return: List of tuples with open times of the first and last missing candle of remaining gaps.
+    """
+    rows = connection.execute(f'''SELECT timestamp_utc FROM {table} WHERE timestamp_utc BETWEEN ? AND ?
+                                  ORDER BY timestamp_utc''', (start - timeframe, end + timeframe)).fetchall()
+    remaining = find_gaps(np.array(rows, dtype=np.int64).ravel(), timeframe)
+
+    with connection:
+        connection.execute('DELETE FROM candle_gaps WHERE table_name = ? AND start_timestamp = ?', (table, start))
+        connection.executemany('INSERT OR REPLACE INTO candle_gaps VALUES (?, ?, ?, ?)',
+                               [(table, gapStart, gapEnd, status) for gapStart, gapEnd in remaining])
+    return remaining
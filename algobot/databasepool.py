@@ -0,0 +1,144 @@
+import os
+import sqlite3
+import threading
+import database
+
+DATABASE_TIMEOUT = 30  # Seconds a connection waits for another connection's write to finish before giving up.
+STATEMENT_CACHE_SIZE = 256  # Prepared statements kept per connection, so repeated queries are not compiled again.
+
+
+class DatabasePool:
+    """
+    Connection manager of one database file. Every thread gets a connection of its own that stays open and is reused
+    for every query the thread runs on the database, so connections and their prepared statements are not created
+    again for every query. Since the database is in WAL mode, readers on different threads never block each other or
+    the writer.
+
+    The newest timestamp of every candle table is cached. The cache is invalidated whenever candles are written through
+    the pool, and whenever another connection (e.g. another process) wrote to the database, which SQLite reports
+    through the data_version pragma.
+    """
+    def __init__(self, databaseFile: str):
+        self.databaseFile = databaseFile
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = {}  # Threads and the connections they own.
+        self.latestTimestamps = {}  # Tables and their cached newest timestamps.
+        self.generation = 0  # Increased on every invalidation, so lookups that raced a write are not cached.
+
+    def get_connection(self) -> sqlite3.Connection:
+        """
+        Returns connection owned by the current thread, opening it if the thread has none yet. Connections of threads
+        that have finished are closed along the way.
+        :return: Connection to database.
+        """
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            return connection
+
+        # Connections are only ever used by the thread that owns them, but closing them is allowed from any thread.
+        connection = sqlite3.connect(self.databaseFile, timeout=DATABASE_TIMEOUT, check_same_thread=False,
+                                     cached_statements=STATEMENT_CACHE_SIZE)
+        database.set_pragmas(connection)
+        self.local.connection = connection
+        self.local.dataVersion = None
+
+        with self.lock:
+            for thread in [thread for thread in self.connections if not thread.is_alive()]:
+                self.connections.pop(thread).close()
+            self.connections[threading.current_thread()] = connection
+        return connection
+
+    def invalidate(self, table: str = None):
+        """
+        Invalidates cached newest timestamp of table provided. Has to be called after writing to a candle table
+        through a connection of the pool, unless the write went through insert_rows.
+        :param table: Table that was written to. If none, the cache of every table is invalidated.
+        """
+        with self.lock:
+            self.generation += 1
+            if table is None:
+                self.latestTimestamps.clear()
+            else:
+                self.latestTimestamps.pop(table, None)
+
+    def check_data_version(self, connection: sqlite3.Connection):
+        """
+        Invalidates every cached timestamp if a connection other than the one provided wrote to the database since the
+        current thread last checked.
+        :param connection: Connection owned by the current thread.
+        """
+        dataVersion = connection.execute('PRAGMA data_version').fetchone()[0]
+        if dataVersion != self.local.dataVersion:
+            self.local.dataVersion = dataVersion
+            self.invalidate()
+
+    def get_latest_timestamp(self, table: str) -> int or None:
+        """
+        Returns open time of newest candle in table provided. The value is cached until the table is written to.
+        :param table: Candle table to look up.
+        :return: Timestamp in milliseconds or None if table has no candles.
+        """
+        connection = self.get_connection()
+        self.check_data_version(connection)
+        with self.lock:
+            if table in self.latestTimestamps:
+                return self.latestTimestamps[table]
+            generation = self.generation
+
+        latestTimestamp = database.get_latest_timestamp(connection, table)
+        with self.lock:
+            if generation == self.generation:
+                self.latestTimestamps[table] = latestTimestamp
+        return latestTimestamp
+
+    def insert_rows(self, table: str, rows, chunkSize: int = database.CHUNK_SIZE) -> int:
+        """
+        Inserts rows to table with the current thread's connection and invalidates the table's cached timestamp.
+        :param table: Table to insert rows to.
+        :param rows: Iterable of row tuples in the same order as DATABASE_FIELDS.
+        :param chunkSize: Amount of rows to write per transaction.
+        :return: Amount of rows that were actually inserted.
+        """
+        try:
+            return database.insert_rows(self.get_connection(), table, rows, chunkSize=chunkSize)
+        finally:
+            self.invalidate(table)
+
+    def close(self):
+        """
+        Closes every connection of the pool. Threads that use the pool afterwards open new connections.
+        """
+        with self.lock:
+            for connection in self.connections.values():
+                connection.close()
+            self.connections.clear()
+        self.local = threading.local()
+        self.invalidate()
+
+
+POOLS = {}  # Database files and their pools.
+POOLS_LOCK = threading.Lock()
+
+
+def get_database_pool(databaseFile: str) -> DatabasePool:
+    """
+    Returns connection pool of database file provided. Every caller using the same database file shares one pool.
+    :param databaseFile: Path to database file.
+    :return: Connection pool of database file.
+    """
+    path = os.path.abspath(databaseFile)
+    with POOLS_LOCK:
+        if path not in POOLS:
+            POOLS[path] = DatabasePool(path)
+        return POOLS[path]
+
+
+def close_database_pools():
+    """
+    Closes and forgets the connection pools of every database file.
+    """
+    with POOLS_LOCK:
+        for pool in POOLS.values():
+            pool.close()
+        POOLS.clear()
@@ -0,0 +1,125 @@
+import time
+import threading
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+DOWNLOAD_WORKERS = 4  # Requests in flight at once while downloading historical data.
+WEIGHT_PERIOD = 60  # Binance limits request weight per minute.
+DOWNLOAD_WEIGHT_BUDGET = 1000  # Of Binance's 1200 weight per minute, so other API calls still have room.
+
+
+def get_klines_weight(limit: int) -> int:
+    """
+    Returns request weight Binance charges for a klines request with limit provided.
+    """
+    if limit < 100:
+        return 1
+    elif limit < 500:
+        return 2
+    elif limit <= 1000:
+        return 5
+    return 10
+
+
+class RequestBudget:
+    """
+    Thread-safe budget of request weight that can be spent in a sliding period of time. Workers acquire the weight of
+    their request before sending it and wait while the budget is used up.
+    """
+    def __init__(self, weight: int = DOWNLOAD_WEIGHT_BUDGET, period: float = WEIGHT_PERIOD):
+        self.weight = weight
+        self.period = period
+        self.spent = deque()  # Tuples of times weight was spent at and weight spent.
+        self.spentWeight = 0
+        self.lock = threading.Lock()
+
+    def acquire(self, weight: int, cancelled=None) -> bool:
+        """
+        Spends weight provided, waiting until enough weight is available.
+        :param weight: Weight of request about to be sent.
+        :param cancelled: Optional function that returns true if waiting should stop.
+        :return: A boolean whether weight was spent or not. False is only returned if waiting was cancelled.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.spent and self.spent[0][0] <= now - self.period:
+                    self.spentWeight -= self.spent.popleft()[1]
+
+                if self.spentWeight + weight <= self.weight or not self.spent:
+                    self.spent.append((now, weight))
+                    self.spentWeight += weight
+                    return True
+                wait = self.spent[0][0] + self.period - now
+
+            if cancelled is not None and cancelled():
+                return False
+            time.sleep(min(wait, 0.25))  # Wake up regularly to check for cancellation.
+
+
+REQUEST_BUDGET = RequestBudget()  # Shared by every download, so concurrent downloads cannot exceed the limit together.
+
+
+def get_chunks(startTimestamp: int, endTimestamp: int, timeframe: int, limit: int) -> list:
+    """
+    Splits time range into chunks that can each be retrieved with one klines request.
+    :param startTimestamp: Open time of first candle in milliseconds.
+    :param endTimestamp: Open time of last candle in milliseconds.
+    :param timeframe: Interval of candles in milliseconds.
+    :param limit: Maximum amount of candles per request.
+    :return: List of start and end timestamp tuples in chronological order.
+    """
+    chunkLength = timeframe * limit
+    return [(start, min(start + chunkLength - 1, endTimestamp))
+            for start in range(startTimestamp, endTimestamp + 1, chunkLength)]
+
+
+def stream_klines(get_klines, symbol: str, interval: str, startTimestamp: int, endTimestamp: int, timeframe: int,
+                  limit: int = 1000, workers: int = DOWNLOAD_WORKERS, budget: RequestBudget = REQUEST_BUDGET,
+                  cancelled=None):
+    """
+    Downloads klines between start and end timestamps with a pool of workers. Chunks are fetched concurrently, but
+    yielded strictly in chronological order. Only a bounded amount of chunks is requested ahead of the oldest chunk not
+    yielded yet, so memory use does not grow with the size of the range.
+    :param get_klines: Function that retrieves klines, e.g. binance.client.Client.get_klines.
+    :param symbol: Symbol to download klines of.
+    :param interval: Interval to download klines of.
+    :param startTimestamp: Open time of first candle in milliseconds.
+    :param endTimestamp: Open time of last candle in milliseconds.
+    :param timeframe: Interval of candles in milliseconds.
+    :param limit: Maximum amount of candles per request.
+    :param workers: Maximum amount of requests in flight.
+    :param budget: Request weight budget to spend from.
+    :param cancelled: Optional function that returns true if download should stop.
+    :return: Generator of kline lists, one per chunk.
+    """
+    def is_cancelled() -> bool:
+        return cancelled is not None and cancelled()
+
+    def fetch(chunk: tuple) -> list:
+        if is_cancelled() or not budget.acquire(get_klines_weight(limit), is_cancelled):
+            return []
+        return get_klines(symbol=symbol, interval=interval, limit=limit, startTime=chunk[0], endTime=chunk[1])
+
+    chunks = iter(get_chunks(startTimestamp, endTimestamp, timeframe, limit))
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for chunk in chunks:
+            pending.append(executor.submit(fetch, chunk))
+            if len(pending) >= workers * 2:
+                break
+
+        while pending:
+            klines = pending.popleft().result()
+            chunk = next(chunks, None)
+            if chunk is not None:
+                pending.append(executor.submit(fetch, chunk))
+            if is_cancelled():
+                return
+            yield klines
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
@@ -8,6 +8,7 @@ import time
 from datetime import datetime
 from dateutil import parser
 from typing import Tuple
+from candles import PARAMETER_COLUMNS, get_parameter_column
 
 BASE_DIR = os.path.dirname(__file__)
 ROOT_DIR = os.path.dirname(BASE_DIR)
@@ -188,16 +189,20 @@ def get_elapsed_time(startingTime) -> str:
 def get_data_from_parameter(data, parameter) -> float:
     """
     Helper function for trading. Will return appropriate data from parameter passed in.
-    :param data: Dictionary data with parameters.
+    Parameters such as high/low are read from their derived field. Loops should resolve the parameter once with
+    get_parameter_column() and read rows directly instead.
+    :param data: Dictionary data with parameters or a candle store. If a candle store is passed in, the whole column
+                 for the parameter is returned.
     :param parameter: Data parameter to return.
     :return: Appropriate data to return.
     """
-    if parameter == 'high/low':
-        return (data['high'] + data['low']) / 2
-    elif parameter == 'open/close':
-        return (data['open'] + data['close']) / 2
-    else:
-        return data[parameter]
+    try:
+        return data[get_parameter_column(parameter)]
+    except KeyError:
+        if parameter not in PARAMETER_COLUMNS:
+            raise
+        first, second = parameter.split('/')  # Dictionary without derived fields, so average them here.
+        return (data[first] + data[second]) / 2
 
 
 def load_from_csv(path, descending=True) -> list:
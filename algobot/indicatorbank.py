@@ -0,0 +1,129 @@
+import os
+import threading
+import numpy as np
+
+from collections import OrderedDict
+
+INDICATOR_BANK_MEMORY = 512 * 1024 * 1024  # Bytes of series kept in memory before the least recently used are spilled.
+CENTS_SENTINEL = np.iinfo(np.int32).min  # Cents value that stands for NaN in compactly stored series.
+
+
+def encode_series(values: np.ndarray) -> np.ndarray:
+    """
+    Returns series of values provided in its most compact exact form. Series rounded to cents, like the rounded moving
+    averages of backtests, are stored as 32-bit integer cents with NaNs as CENTS_SENTINEL, which takes half the memory
+    of floats. Any other series is stored as it is.
+    :param values: Array of values.
+    :return: Array of int32 cents or float64 values.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    finite = np.isfinite(values)
+    cents = np.round(np.where(finite, values, 0) * 100)
+    if np.any(np.isinf(values)) or np.any(np.abs(cents) >= -CENTS_SENTINEL) or \
+            not np.array_equal(cents[finite] / 100, values[finite]):
+        return values
+    return np.where(finite, cents, CENTS_SENTINEL).astype(np.int32)
+
+
+def decode_series(values: np.ndarray) -> np.ndarray:
+    """
+    Returns float values of series returned by encode_series.
+    :param values: Array of int32 cents or float64 values.
+    :return: Array of float64 values.
+    """
+    if values.dtype != np.int32:
+        return values
+    return np.where(values == CENTS_SENTINEL, np.nan, values / 100)
+
+
+class IndicatorBank:
+    """
+    Bank of indicator series of one dataset, e.g. the moving averages of every period of a sweep's candles. Every
+    series is computed once and then read by every backtest that needs it. Series are stored compactly with
+    encode_series and kept in memory until their size exceeds the memory limit; then the least recently used ones are
+    spilled to files in the spill directory and memory-mapped when read again, or dropped if there is no directory.
+    """
+    def __init__(self, maxMemory: int = INDICATOR_BANK_MEMORY, spillDirectory: str = None):
+        """
+        :param maxMemory: Bytes of series kept in memory.
+        :param spillDirectory: Directory to spill series to. If none, series that do not fit are dropped.
+        """
+        self.maxMemory = maxMemory
+        self.spillDirectory = spillDirectory
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # Keys and encoded series in memory from least to most recently used.
+        self.spilled = {}  # Keys and paths of series spilled to files.
+        self.memory = 0
+        self.hits = 0
+        self.misses = 0
+        self.spills = 0
+
+    def get(self, key: tuple) -> np.ndarray or None:
+        """
+        Returns series stored with key provided, marking it as most recently used.
+        :param key: Key of series, e.g. moving average, prices, parameter, and range of periods.
+        :return: Array of series values or None if series is not in the bank.
+        """
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return decode_series(self.entries[key])
+            elif key in self.spilled:
+                self.hits += 1
+                return decode_series(np.load(self.spilled[key], mmap_mode='r'))
+            self.misses += 1
+            return None
+
+    def set(self, key: tuple, values: np.ndarray):
+        """
+        Stores series with key provided, spilling the least recently used series if the bank is over its memory limit.
+        :param key: Key of series.
+        :param values: Array of series values.
+        """
+        encoded = encode_series(values)
+        with self.lock:
+            if key in self.entries:
+                self.memory -= self.entries.pop(key).nbytes
+            self.entries[key] = encoded
+            self.memory += encoded.nbytes
+            while self.memory > self.maxMemory and len(self.entries) > 0:
+                self.spill()
+
+    def get_series(self, key: tuple, calculate) -> np.ndarray:
+        """
+        Returns series stored with key provided, calculating and storing it first if it is not in the bank.
+        :param key: Key of series.
+        :param calculate: Function that returns series values.
+        :return: Array of series values.
+        """
+        values = self.get(key)
+        if values is None:
+            values = calculate()
+            self.set(key, values)
+        return values
+
+    def spill(self):
+        """
+        Moves least recently used series in memory to a file in the spill directory or drops it if there is none.
+        """
+        key, encoded = self.entries.popitem(last=False)
+        self.memory -= encoded.nbytes
+        if self.spillDirectory is not None:
+            os.makedirs(self.spillDirectory, exist_ok=True)
+            path = os.path.join(self.spillDirectory, f'series_{self.spills}.npy')
+            np.save(path, encoded)
+            self.spilled[key] = path
+            self.spills += 1
+
+    def clear(self):
+        """
+        Removes every series and spilled file from the bank.
+        """
+        with self.lock:
+            for path in self.spilled.values():
+                if os.path.exists(path):
+                    os.remove(path)
+            self.entries.clear()
+            self.spilled.clear()
+            self.memory = 0
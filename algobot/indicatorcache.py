@@ -0,0 +1,124 @@
+import threading
+
+from collections import OrderedDict
+
+INDICATOR_CACHE_SIZE = 100000  # Indicator values kept before the least recently used ones are evicted.
+
+INDICATOR_CACHE = None
+INDICATOR_CACHE_LOCK = threading.Lock()
+
+
+class IndicatorCache:
+    """
+    Least recently used cache of indicator values of closed periods. Keys are tuples of symbol, interval, indicator,
+    period, parameter, and timestamp of the period the value is of, so every data object, trader, and backtest of the
+    same market can reuse the values any of them calculated. Values of closed periods never change, but if periods are
+    appended or replaced, values from their timestamp onwards can be invalidated. Symbols and intervals are forgotten
+    once none of their values are cached anymore, so bookkeeping stays as bounded as the values.
+    """
+    def __init__(self, maxSize: int = INDICATOR_CACHE_SIZE):
+        """
+        :param maxSize: Amount of values kept before the least recently used ones are evicted.
+        """
+        self.maxSize = maxSize
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # Keys and values from least to most recently used.
+        self.latestTimestamps = {}  # Symbols and intervals and the newest timestamps cached for them.
+        self.seriesSizes = {}  # Symbols and intervals and the amount of values cached for them.
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple, default=None):
+        """
+        Returns value cached with key provided, marking it as most recently used.
+        :param key: Symbol, interval, indicator, period, parameter, and timestamp of the value.
+        :param default: Value to return if nothing is cached with key.
+        :return: Cached value or default.
+        """
+        with self.lock:
+            value = self.entries.get(key, None)
+            if value is None:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: tuple, value):
+        """
+        Caches value with key provided, evicting the least recently used values if the cache is full.
+        :param key: Symbol, interval, indicator, period, parameter, and timestamp of the value.
+        :param value: Value to cache. It can not be None.
+        """
+        with self.lock:
+            series = key[:2]
+            if key not in self.entries:
+                self.seriesSizes[series] = self.seriesSizes.get(series, 0) + 1
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            self.latestTimestamps[series] = max(self.latestTimestamps.get(series, key[-1]), key[-1])
+            while len(self.entries) > self.maxSize:
+                self.remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def remove(self, key: tuple):
+        """
+        Removes value cached with key provided and forgets its symbol and interval if it was their last value. The
+        lock has to be held.
+        :param key: Key of cached value.
+        """
+        del self.entries[key]
+        series = key[:2]
+        self.seriesSizes[series] -= 1
+        if self.seriesSizes[series] == 0:
+            del self.seriesSizes[series]
+            del self.latestTimestamps[series]
+
+    def invalidate(self, symbol, interval: str, timestamp: int = None):
+        """
+        Removes cached values of symbol and interval provided from the timestamp provided onwards.
+        :param symbol: Symbol of values to remove.
+        :param interval: Interval of values to remove.
+        :param timestamp: Timestamp of the oldest period to remove values of. If none, every value is removed.
+        """
+        with self.lock:
+            latestTimestamp = self.latestTimestamps.get((symbol, interval))
+            if latestTimestamp is None or (timestamp is not None and latestTimestamp < timestamp):
+                return  # Nothing from the timestamp onwards is cached, so there is no need to look.
+
+            for key in [key for key in self.entries if key[:2] == (symbol, interval)]:
+                if timestamp is None or key[-1] >= timestamp:
+                    self.remove(key)
+            if timestamp is not None and (symbol, interval) in self.latestTimestamps:
+                self.latestTimestamps[(symbol, interval)] = timestamp - 1
+
+    def clear(self):
+        """
+        Removes every cached value and resets counters.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.latestTimestamps.clear()
+            self.seriesSizes.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def get_hit_ratio(self) -> float:
+        """
+        Returns ratio of lookups that were found in the cache.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0
+
+
+def get_indicator_cache() -> IndicatorCache:
+    """
+    Returns indicator cache shared by every data object, trader, and backtest in the process, creating it if needed.
+    :return: Shared indicator cache.
+    """
+    global INDICATOR_CACHE
+    with INDICATOR_CACHE_LOCK:
+        if INDICATOR_CACHE is None:
+            INDICATOR_CACHE = IndicatorCache()
+        return INDICATOR_CACHE
+
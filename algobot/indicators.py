@@ -0,0 +1,413 @@
+import numpy as np
+import pandas as pd
+
+from collections import deque
+from enums import BEARISH, BULLISH
+
+RESYNC_PERIODS = 10000  # Pushes after which running sums are summed from scratch, so rounding errors cannot pile up.
+
+
+def sma(values: np.ndarray, prices: int) -> np.ndarray:
+    """
+    Returns simple moving average of every period of values provided.
+    :param values: Values in chronological order, e.g. a column of a candle store.
+    :param prices: Amount of periods in the average.
+    :return: Array of averages aligned with values. Periods without enough values before them are NaN.
+    """
+    return weighted_average(values, np.ones(prices))
+
+
+def wma(values: np.ndarray, prices: int) -> np.ndarray:
+    """
+    Returns linearly weighted moving average of every period of values provided. The newest period in the average has
+    a weight of prices and every older period a weight of one less.
+    :param values: Values in chronological order, e.g. a column of a candle store.
+    :param prices: Amount of periods in the average.
+    :return: Array of averages aligned with values. Periods without enough values before them are NaN.
+    """
+    return weighted_average(values, np.arange(1, prices + 1))
+
+
+def weighted_average(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Returns weighted average of every window of values provided. Windows are summed directly instead of from a
+    cumulative sum, so the averages of a long history are as precise as the ones of a short one. Every window is summed
+    from its newest period to its oldest one, like the backtester sums a window, so both get identical averages.
+    :param values: Values in chronological order.
+    :param weights: Weights of a window with the weight of the newest period last.
+    :return: Array of averages aligned with values. Periods without a full window are NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    prices = len(weights)
+    if prices <= 0:
+        raise ValueError("Amount of prices must be greater than 0.")
+
+    averages = np.full(len(values), np.nan)
+    if len(values) >= prices:
+        count = len(values) - prices + 1
+        totals = weights[-1] * values[prices - 1:]
+        for offset in range(1, prices):  # Windows are summed together one period at a time.
+            totals += weights[-1 - offset] * values[prices - 1 - offset:prices - 1 - offset + count]
+        averages[prices - 1:] = totals / np.sum(weights)
+    return averages
+
+
+def exponential_filter(values: np.ndarray, alpha: float, initial: float) -> np.ndarray:
+    """
+    Returns every value of the recursive filter result = alpha * value + (1 - alpha) * previous result.
+    The recursion is run by pandas' exponentially weighted mean without adjustment, which steps through the values
+    exactly like the recursion does, but in compiled code.
+    :param values: Values in chronological order.
+    :param alpha: Weight of the newest value.
+    :param initial: Result before the first value.
+    :return: Array of results aligned with values.
+    """
+    values = np.concatenate(([initial], np.asarray(values, dtype=float)))
+    return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()[1:]
+
+
+def ema(values: np.ndarray, prices: int, smaPrices: int = 5) -> np.ndarray:
+    """
+    Returns exponential moving average of every period of values provided. Like Data's EMAs, the first average is the
+    simple moving average of the first smaPrices values.
+    :param values: Values in chronological order, e.g. a column of a candle store.
+    :param prices: Days to iterate EMA over (or the period).
+    :param smaPrices: SMA prices to get first EMA over.
+    :return: Array of averages aligned with values. Periods before the first average are NaN.
+    """
+    if prices <= 0:
+        raise ValueError("Amount of prices must be greater than 0.")
+    elif smaPrices <= 0:
+        raise ValueError("Initial amount of SMA values for initial EMA must be greater than 0.")
+
+    values = np.asarray(values, dtype=float)
+    averages = np.full(len(values), np.nan)
+    if len(values) >= smaPrices:
+        averages[smaPrices - 1] = np.sum(values[:smaPrices]) / smaPrices
+        averages[smaPrices:] = exponential_filter(values[smaPrices:], 2 / (prices + 1), averages[smaPrices - 1])
+    return averages
+
+
+def rsi(values: np.ndarray, prices: int = 14) -> np.ndarray:
+    """
+    Returns relative strength index of every period of values provided. Ups and downs are averaged with Wilder's
+    smoothing from the first period on, like the helper EMA of Data's RSI.
+    :param values: Values in chronological order, e.g. a column of a candle store.
+    :param prices: Amount of prices to iterate through.
+    :return: Array of relative strength indexes aligned with values. The first period has no RSI and is NaN.
+    """
+    if prices <= 0:
+        raise ValueError("Amount of prices must be greater than 0.")
+
+    differences = np.diff(np.asarray(values, dtype=float))
+    averageUps = exponential_filter(np.where(differences > 0, differences, 0), 1 / prices, 0)
+    averageDowns = exponential_filter(np.where(differences > 0, 0, -differences), 1 / prices, 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        indexes = 100 - 100 / (1 + averageUps / averageDowns)
+    return np.concatenate(([np.nan], indexes))
+
+
+def get_moving_average_series(candles, average: str, prices: int, parameter: str) -> np.ndarray:
+    """
+    Returns moving average of every period of candles provided.
+    :param candles: Candle store to get moving averages from.
+    :param average: Type of average to retrieve, i.e. -> SMA, WMA, EMA
+    :param prices: Amount of prices to get moving averages of.
+    :param parameter: Parameter to use to get moving average, e.g. close, high/low, or open/close.
+    :return: Array of averages aligned with candles.
+    """
+    functions = {'sma': sma, 'wma': wma, 'ema': ema}
+    if average.lower() not in functions:
+        raise ValueError('Invalid average provided.')
+    return functions[average.lower()](candles.get_column(parameter), prices)
+
+
+class RunningSMA:
+    """
+    Running state of a simple moving average over the newest closed periods. Pushing a closed period and getting the
+    average of the closed periods or the provisional average with the period in progress are all O(1).
+    """
+    def __init__(self, prices: int):
+        """
+        :param prices: Amount of periods in the average.
+        """
+        self.prices = prices
+        self.window = deque(maxlen=prices)  # Newest closed values in chronological order.
+        self.total = 0
+        self.pushes = 0  # Pushes since running sums were last summed from scratch.
+
+    def reset(self, values):
+        """
+        Resets state to closed values provided. Only the newest prices values are kept.
+        :param values: Closed values in chronological order.
+        """
+        self.window = deque(values, maxlen=self.prices)
+        self.resync()
+
+    def resync(self):
+        """
+        Sums running sums again from the values in window.
+        """
+        self.total = sum(self.window)
+        self.pushes = 0
+
+    def push(self, value: float):
+        """
+        Adds value of a period that just closed, dropping the oldest value if the window is full.
+        """
+        if len(self.window) == self.prices:
+            self.total -= self.window[0]
+        self.window.append(value)
+        self.total += value
+        self.pushes += 1
+        if self.pushes >= RESYNC_PERIODS:
+            self.resync()
+
+    def get_closed(self) -> float:
+        """
+        Returns average of the newest closed periods.
+        """
+        return self.total / self.prices
+
+    def get_provisional(self, currentValue: float) -> float:
+        """
+        Returns average of the period in progress and the newest closed periods before it.
+        :param currentValue: Value of the period in progress.
+        """
+        total = self.total - self.window[0] if len(self.window) == self.prices else self.total
+        return (total + currentValue) / self.prices
+
+
+class RunningWMA(RunningSMA):
+    """
+    Running state of a linearly weighted moving average over the newest closed periods. The newest period has a weight
+    of prices and every older period a weight of one less. When a period closes, every weight drops by one, so the
+    weighted sum is updated in O(1) by subtracting the plain sum of the window.
+    """
+    def __init__(self, prices: int):
+        super().__init__(prices)
+        self.weightedTotal = 0
+        self.divisor = prices * (prices + 1) / 2
+
+    def resync(self):
+        """
+        Sums running sums again from the values in window.
+        """
+        super().resync()
+        offset = self.prices - len(self.window)
+        self.weightedTotal = sum(value * (offset + index + 1) for index, value in enumerate(self.window))
+
+    def push(self, value: float):
+        """
+        Adds value of a period that just closed, dropping the oldest value if the window is full.
+        """
+        self.weightedTotal += self.prices * value - self.total  # Oldest value's weight drops from one to zero.
+        super().push(value)
+
+    def get_closed(self) -> float:
+        """
+        Returns weighted average of the newest closed periods.
+        """
+        return self.weightedTotal / self.divisor
+
+    def get_provisional(self, currentValue: float) -> float:
+        """
+        Returns weighted average of the period in progress and the newest closed periods before it.
+        :param currentValue: Value of the period in progress.
+        """
+        return (self.weightedTotal - self.total + self.prices * currentValue) / self.divisor
+
+
+class RunningRSI:
+    """
+    Running state of a relative strength index over closed periods. Average gains and losses are smoothed with Wilder's
+    smoothing, so pushing a closed period is O(1). RSI values of past closed periods are kept in a history ring, so
+    shifted RSI values are read instead of calculated again.
+    """
+    def __init__(self, prices: int, historySize: int):
+        """
+        :param prices: Amount of periods to smooth average gains and losses over.
+        :param historySize: Amount of RSI values of past closed periods to keep.
+        """
+        self.prices = prices
+        self.alpha = 1 / prices
+        self.averageUp = 0
+        self.averageDown = 0
+        self.previous = None  # Value of newest closed period.
+        self.history = deque(maxlen=historySize)  # RSI values of newest closed periods in chronological order.
+
+    def reset(self, values):
+        """
+        Resets state to closed values provided. Average gains and losses start from zero at the first value, so enough
+        values have to be provided for them to warm up.
+        :param values: Closed values in chronological order.
+        """
+        self.averageUp = self.averageDown = 0
+        self.previous = None
+        self.history.clear()
+        for value in values:
+            self.push(value)
+
+    def get_averages(self, value: float) -> tuple:
+        """
+        Returns average gain and loss after value provided follows the newest closed period.
+        """
+        if self.previous is None:
+            return self.averageUp, self.averageDown
+
+        difference = value - self.previous
+        up = difference if difference > 0 else 0
+        down = 0 if difference > 0 else -difference
+        return (up * self.alpha + self.averageUp * (1 - self.alpha),
+                down * self.alpha + self.averageDown * (1 - self.alpha))
+
+    @staticmethod
+    def get_index(averageUp: float, averageDown: float) -> float:
+        """
+        Returns relative strength index of average gain and loss provided.
+        """
+        if averageDown == 0:
+            return 100 if averageUp > 0 else float('nan')
+        return 100 - 100 / (1 + averageUp / averageDown)
+
+    def push(self, value: float):
+        """
+        Adds value of a period that just closed and stores its RSI in history.
+        """
+        self.averageUp, self.averageDown = self.get_averages(value)
+        self.previous = value
+        self.history.append(self.get_index(self.averageUp, self.averageDown))
+
+    def get_closed(self, shift: int = 0) -> float:
+        """
+        Returns RSI of a closed period.
+        :param shift: Closed periods to shift by. Shift of 0 is the newest closed period.
+        """
+        return self.history[-shift - 1]
+
+    def get_provisional(self, currentValue: float) -> float:
+        """
+        Returns RSI of the period in progress.
+        :param currentValue: Value of the period in progress.
+        """
+        return self.get_index(*self.get_averages(currentValue))
+
+
+class RollingExtrema:
+    """
+    Minimum and maximum of the newest values pushed, kept with monotonic deques. Pushing a value is amortized O(1), and
+    reading the extrema is O(1).
+    """
+    def __init__(self, size: int):
+        """
+        :param size: Amount of newest values the extrema are of.
+        """
+        self.size = size
+        self.pushes = 0
+        self.maxima = deque()  # Pushes and values of decreasing values that can still become the maximum.
+        self.minima = deque()  # Pushes and values of increasing values that can still become the minimum.
+
+    def push(self, value: float):
+        """
+        Adds value, dropping the oldest value if there are more than size values.
+        """
+        if self.size <= 0:
+            return
+
+        self.pushes += 1
+        while self.maxima and self.maxima[-1][1] <= value:
+            self.maxima.pop()
+        while self.minima and self.minima[-1][1] >= value:
+            self.minima.pop()
+        self.maxima.append((self.pushes, value))
+        self.minima.append((self.pushes, value))
+
+        if self.maxima[0][0] <= self.pushes - self.size:
+            self.maxima.popleft()
+        if self.minima[0][0] <= self.pushes - self.size:
+            self.minima.popleft()
+
+    def get_max(self, value: float) -> float:
+        """
+        Returns maximum of the newest values and value provided.
+        """
+        return max(self.maxima[0][1], value) if self.maxima else value
+
+    def get_min(self, value: float) -> float:
+        """
+        Returns minimum of the newest values and value provided.
+        """
+        return min(self.minima[0][1], value) if self.minima else value
+
+
+class StoicIndicator:
+    """
+    Streaming state of the stoic strategy. The strategy looks at the RSI values of the newest input1 and input2
+    periods. Their extrema are kept in rolling windows of closed periods, and the values derived from them are kept in
+    fixed-size rings with running sums, so every update is O(1) and memory stays bounded however long the strategy runs.
+    """
+    def __init__(self, input1: int, input2: int, input3: int, currentPeriods: int = 1):
+        """
+        :param input1: Custom input 1 for the stoic strategy.
+        :param input2: Custom input 2 for the stoic strategy.
+        :param input3: Custom input 3 for the stoic strategy.
+        :param currentPeriods: Amount of the newest values of each RSI window taken by the period in progress.
+        """
+        self.inputs = (input1, input2, input3)
+        self.windowOne = RollingExtrema(input1 - currentPeriods)  # RSI values of the closed periods in the windows.
+        self.windowTwo = RollingExtrema(input2 - currentPeriods)
+        self.seneca = deque(maxlen=3)  # Rings of the newest values. Three values are summed from scratch every time.
+        self.zeno = deque(maxlen=3)
+        self.gaius = deque(maxlen=3)
+        self.philo = deque(maxlen=3)
+        self.hadot = RunningSMA(input3)
+        self.hadotExtrema = RollingExtrema(input3)
+        self.hadotCount = 0  # Hadot values calculated so far.
+        self.stoic = None  # Newest stoic and marcus values the trend was decided by.
+        self.marcus = None
+
+    def push_closed(self, rsiOne: float, rsiTwo: float):
+        """
+        Adds RSI values of a period that just closed to the windows.
+        :param rsiOne: RSI of input1 periods.
+        :param rsiTwo: RSI of input2 periods.
+        """
+        self.windowOne.push(rsiOne)
+        self.windowTwo.push(rsiTwo)
+
+    def update(self, rsiOne: float, rsiTwo: float) -> int or None:
+        """
+        Updates strategy with RSI values of the newest period and returns its trend.
+        :param rsiOne: RSI of input1 periods.
+        :param rsiTwo: RSI of input2 periods.
+        :return: Bullish, bearish, or none values.
+        """
+        minimumOne = self.windowOne.get_min(rsiOne)
+        minimumTwo = self.windowTwo.get_min(rsiTwo)
+        self.seneca.append(self.windowOne.get_max(rsiOne) - minimumOne)
+        self.zeno.append(rsiOne - minimumOne)
+        self.gaius.append(rsiTwo - minimumTwo)
+        self.philo.append(self.windowTwo.get_max(rsiTwo) - minimumTwo)
+
+        if len(self.gaius) < 3:
+            return None
+
+        hadot = sum(reversed(self.gaius)) / sum(reversed(self.philo)) * 100
+        self.hadot.push(hadot)
+        self.hadotExtrema.push(hadot)
+        self.hadotCount += 1
+        if self.hadotCount < 3:
+            return None
+
+        self.stoic = sum(reversed(self.zeno)) / sum(reversed(self.seneca)) * 100
+        steady = self.hadotExtrema.get_min(hadot) == self.hadotExtrema.get_max(hadot)
+        if steady and len(self.hadot.window) == self.hadot.prices:  # Equal values, e.g. of a steady trend, can tie
+            self.marcus = hadot                                     # with stoic, so they are not averaged by sums.
+        else:
+            self.marcus = self.hadot.get_closed()
+        if self.marcus > self.stoic:
+            return BEARISH
+        elif self.marcus < self.stoic:
+            return BULLISH
+        return None
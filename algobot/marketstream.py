@@ -0,0 +1,229 @@
+import time
+import threading
+
+from collections import deque
+from contextlib import contextmanager
+from binance.websockets import BinanceSocketManager
+from binance.helpers import interval_to_milliseconds
+from downloader import stream_klines
+from twisted.internet import reactor
+
+STREAM_TIMEOUT = 10  # Seconds without a message after which streamed values are not trusted anymore.
+STREAM_BUFFER = 1000  # Closed klines kept in memory for run-time data to catch up from.
+SNAPSHOT_TTL = 1  # Seconds a market snapshot is reused for outside of a tick.
+
+SOCKET_MANAGER = None
+SOCKET_MANAGER_LOCK = threading.Lock()
+
+
+def get_socket_manager() -> BinanceSocketManager:
+    """
+    Returns socket manager shared by every market stream, starting it if needed. Socket managers run Twisted's reactor,
+    which can only be started once per process, so there is only ever one.
+    :return: Running socket manager.
+    """
+    global SOCKET_MANAGER
+    with SOCKET_MANAGER_LOCK:
+        if SOCKET_MANAGER is None:
+            SOCKET_MANAGER = BinanceSocketManager(None)  # Client is only needed for user data streams.
+            SOCKET_MANAGER.daemon = True
+            SOCKET_MANAGER.start()
+        return SOCKET_MANAGER
+
+
+def get_kline_from_message(message: dict) -> list:
+    """
+    Converts kline of kline stream message to the list format klines are returned in by the REST API.
+    :param message: Kline stream message.
+    :return: Kline list.
+    """
+    kline = message['k']
+    return [kline['t'], kline['o'], kline['h'], kline['l'], kline['c'], kline['v'], kline['T'], kline['q'], kline['n'],
+            kline['V'], kline['Q'], kline['B']]
+
+
+class MarketStream:
+    """
+    Keeps the period in progress, recently closed periods, and last price of a symbol in memory from the exchange's
+    kline and ticker WebSocket streams, so they can be read on every tick without any HTTP requests.
+
+    The socket manager reconnects dropped connections on its own and the stream is restarted if it gives up. Periods
+    that closed while the stream was disconnected are downloaded with REST requests when they are needed.
+    """
+    def __init__(self, client, symbol: str, interval: str, socketManager: BinanceSocketManager = None):
+        """
+        :param client: REST client used to download periods the stream missed.
+        :param symbol: Symbol to stream.
+        :param interval: Interval of klines to stream.
+        :param socketManager: Socket manager to stream with. If none, the shared socket manager is used.
+        """
+        self.client = client
+        self.symbol = symbol
+        self.interval = interval
+        self.timeframe = interval_to_milliseconds(interval)
+        self.socketManager = socketManager
+        self.streams = [f'{symbol.lower()}@kline_{interval}', f'{symbol.lower()}@ticker']
+        self.connectionKey = 'streams=' + '/'.join(self.streams)  # Key the socket manager stores the connection as.
+
+        self.lock = threading.Lock()
+        self.currentKline = None  # Kline of period in progress.
+        self.closedKlines = deque(maxlen=STREAM_BUFFER)  # Closed klines in chronological order.
+        self.price = None  # Last traded price.
+        self.updated = None  # Monotonic time of last message.
+        self.restarts = 0  # Times the stream was restarted after the socket manager gave up reconnecting.
+
+    def start(self):
+        """
+        Starts streaming. Messages are processed on the socket manager's thread.
+        """
+        if self.socketManager is None:
+            self.socketManager = get_socket_manager()
+        reactor.callFromThread(self.socketManager.start_multiplex_socket, self.streams, self.process_message)
+
+    def stop(self):
+        """
+        Stops streaming. Values streamed so far are considered stale right away.
+        """
+        if self.socketManager is not None:
+            reactor.callFromThread(self.socketManager.stop_socket, self.connectionKey)
+        with self.lock:
+            self.updated = None
+
+    def restart(self):
+        """
+        Restarts stream after the socket manager gave up reconnecting. Only called on the socket manager's thread.
+        """
+        self.restarts += 1
+        self.socketManager.stop_socket(self.connectionKey)
+        self.socketManager.start_multiplex_socket(self.streams, self.process_message)
+
+    def process_message(self, message: dict):
+        """
+        Processes a message of the combined kline and ticker stream.
+        :param message: Message received from the socket manager.
+        """
+        if message.get('e') == 'error':
+            self.restart()
+            return
+
+        data = message.get('data', {})
+        with self.lock:
+            self.updated = time.monotonic()
+            if data.get('e') == 'kline':
+                self.add_kline(get_kline_from_message(data), data['k']['x'])
+                self.price = float(data['k']['c'])
+            elif data.get('e') == '24hrTicker':
+                self.price = float(data['c'])
+
+    def add_kline(self, kline: list, closed: bool):
+        """
+        Adds kline to the stream's periods. Has to be called while holding the lock.
+        :param kline: Kline list.
+        :param closed: Boolean whether the kline's period has closed or not.
+        """
+        if closed:
+            if len(self.closedKlines) == 0 or self.closedKlines[-1][0] < kline[0]:
+                self.closedKlines.append(kline)
+            if self.currentKline is not None and self.currentKline[0] <= kline[0]:
+                self.currentKline = None
+        elif self.currentKline is None or self.currentKline[0] <= kline[0]:
+            self.currentKline = kline
+
+    def is_live(self) -> bool:
+        """
+        Returns whether the stream received a message recently enough for its values to be trusted.
+        """
+        return self.updated is not None and time.monotonic() - self.updated < STREAM_TIMEOUT
+
+    def get_price(self) -> float or None:
+        """
+        Returns last traded price or None if the stream is not live.
+        """
+        with self.lock:
+            return self.price if self.is_live() else None
+
+    def get_current_kline(self, timestamp: int) -> list or None:
+        """
+        Returns kline of period in progress if it opened at timestamp provided.
+        :param timestamp: Open time of period in progress in milliseconds.
+        :return: Kline list or None if the stream is not live or has no kline of that period.
+        """
+        with self.lock:
+            if self.is_live() and self.currentKline is not None and self.currentKline[0] == timestamp:
+                return self.currentKline
+        return None
+
+    def get_closed_klines(self, timestamp: int) -> list or None:
+        """
+        Returns klines of periods that opened after timestamp provided and closed before the period in progress.
+        Periods the stream missed, e.g. while it was reconnecting, are downloaded with REST requests.
+        :param timestamp: Open time of newest period already known in milliseconds.
+        :return: List of klines in chronological order or None if the stream is not live.
+        """
+        with self.lock:
+            if not self.is_live() or self.currentKline is None:
+                return None
+            currentTimestamp = self.currentKline[0]
+            klines = [kline for kline in self.closedKlines if timestamp < kline[0] < currentTimestamp]
+
+        streamed = {kline[0] for kline in klines}
+        missing = [missingTimestamp for missingTimestamp in range(timestamp + self.timeframe, currentTimestamp,
+                                                                  self.timeframe) if missingTimestamp not in streamed]
+        if len(missing) == 0:
+            return klines
+
+        filled = []
+        for tempData in stream_klines(self.client.get_klines, self.symbol, self.interval, missing[0], missing[-1],
+                                      self.timeframe):
+            filled += [kline for kline in tempData if kline[0] not in streamed and kline[0] < currentTimestamp]
+        return sorted(klines + filled, key=lambda kline: kline[0])
+
+
+class MarketSnapshot:
+    """
+    Snapshot of market data, e.g. the period in progress, that is taken once and shared by every indicator calculated
+    from it. Outside of a tick, a snapshot expires after its TTL. During a tick, it never expires, so every calculation
+    in the tick sees the same market; each tick starts with a fresh snapshot.
+    """
+    def __init__(self, ttl: float = SNAPSHOT_TTL):
+        """
+        :param ttl: Seconds a snapshot is reused for outside of a tick.
+        """
+        self.ttl = ttl
+        self.value = None
+        self.taken = None  # Monotonic time snapshot was taken at.
+        self.ticks = 0  # Depth of ticks in progress.
+
+    def get(self):
+        """
+        Returns snapshot value or None if there is no snapshot or it expired.
+        """
+        if self.value is None or (self.ticks == 0 and time.monotonic() - self.taken >= self.ttl):
+            return None
+        return self.value
+
+    def set(self, value):
+        """
+        Takes snapshot of value provided.
+        """
+        self.value = value
+        self.taken = time.monotonic()
+
+    def invalidate(self):
+        """
+        Discards snapshot, so the next one is taken from the market again.
+        """
+        self.value = None
+
+    @contextmanager
+    def tick(self):
+        """
+        Context manager that keeps the snapshot taken during it from expiring until it exits.
+        """
+        if self.ticks == 0:
+            self.invalidate()
+        self.ticks += 1
+        try:
+            yield self
+        finally:
+            self.ticks -= 1
@@ -1,4 +1,8 @@
+import numpy as np
+
+from functools import lru_cache
 from typing import Tuple
+from enums import BEARISH, BULLISH
 
 
 class Option:
@@ -88,3 +92,96 @@ class Option:
         Returns class representation of object.
         """
         return f'Option({self.movingAverage}, {self.parameter}, {self.initialBound}, {self.finalBound})'
+
+
+class OptionPlan:
+    """
+    Trading options compiled into a graph of unique moving average nodes. Options that share a moving average, e.g.
+    two options with SMA(20) of close values, share its node, so every moving average is calculated once per period
+    and the trend is derived from the node values.
+    """
+    def __init__(self, signature: tuple):
+        """
+        :param signature: Tuple of moving average, parameter, initial bound, and final bound of every option.
+        """
+        self.signature = signature
+        self.nodes = []  # Moving average, parameter, and prices of every unique moving average.
+        self.comparisons = []  # Indexes of initial and final average nodes of every option.
+
+        indexes = {}
+        for movingAverage, parameter, initialBound, finalBound in signature:
+            comparison = []
+            for prices in (initialBound, finalBound):
+                key = (movingAverage.upper(), parameter, prices)
+                if key not in indexes:
+                    indexes[key] = len(self.nodes)
+                    self.nodes.append((movingAverage, parameter, prices))
+                comparison.append(indexes[key])
+            self.comparisons.append(tuple(comparison))
+
+    def evaluate(self, get_average) -> list:
+        """
+        Returns value of every node. Each node is calculated once.
+        :param get_average: Function that returns moving average of moving average type, parameter, and prices.
+        :return: List of node values.
+        """
+        return [get_average(movingAverage, parameter, prices) for movingAverage, parameter, prices in self.nodes]
+
+    def get_averages(self, values: list) -> list:
+        """
+        Returns initial and final averages of every option.
+        :param values: Node values returned by evaluate.
+        :return: List of tuples with initial and final averages in order of options.
+        """
+        return [(values[initial], values[final]) for initial, final in self.comparisons]
+
+    def get_trend(self, values: list) -> int or None:
+        """
+        Returns trend of node values. It is bullish if every option's initial average is above its final average,
+        bearish if every one is below, and none otherwise.
+        :param values: Node values returned by evaluate.
+        :return: Integer specifying trend.
+        """
+        averages = self.get_averages(values)
+        if all(initialAverage > finalAverage for initialAverage, finalAverage in averages):
+            return BULLISH
+        elif all(initialAverage < finalAverage for initialAverage, finalAverage in averages):
+            return BEARISH
+        return None
+
+    def get_trends(self, values: list, count: int) -> list:
+        """
+        Returns trend of every period of node value series, like get_trend does for values of one period.
+        :param values: Arrays of node values of every period, e.g. moving average series.
+        :param count: Amount of periods.
+        :return: List of trends of every period.
+        """
+        bullish = np.ones(count, dtype=bool)
+        bearish = np.ones(count, dtype=bool)
+        for initial, final in self.comparisons:
+            bullish &= np.asarray(values[initial]) > np.asarray(values[final])
+            bearish &= np.asarray(values[initial]) < np.asarray(values[final])
+        return [BULLISH if isBullish else BEARISH if isBearish else None
+                for isBullish, isBearish in zip(bullish.tolist(), bearish.tolist())]
+
+
+def get_option_plan(options: list) -> OptionPlan:
+    """
+    Returns compiled plan of trading options provided. Plans are reused by every trader and backtest with the same
+    options.
+    :param options: List of Option objects.
+    :return: Compiled option plan.
+    """
+    signature = tuple((option.movingAverage, option.parameter, option.initialBound, option.finalBound)
+                      for option in options)
+    return compile_option_plan(signature)
+
+
+@lru_cache(maxsize=128)
+def compile_option_plan(signature: tuple) -> OptionPlan:
+    """
+    Compiles option plan of signature provided.
+    :param signature: Tuple of moving average, parameter, initial bound, and final bound of every option.
+    :return: Compiled option plan.
+    """
+    return OptionPlan(signature)
@@ -17,7 +17,8 @@ class RealTrader(SimulationTrader):
             loadData: bool = True,
             updateData: bool = True,
             isIsolated: bool = False,
-            tld: str = 'com'
+            tld: str = 'com',
+            lookback: int = None
     ):
         """
         :param apiKey: API key to start trading bot with.
@@ -28,11 +29,13 @@ class RealTrader(SimulationTrader):
         :param updateData: Boolean that'll determine where data object is updated or not.
         :param isIsolated: Boolean that'll determine whether margin asset is isolated or not.
         :param tld: Top level domain. If based in the us, it'll be us; else it'll be com.
+        :param lookback: Amount of newest periods to load from database. If none, all periods are loaded.
         """
         if apiKey is None or apiSecret is None:
             raise ValueError('API credentials not provided.')
 
-        super().__init__(interval=interval, symbol=symbol, logFile='live', loadData=loadData, updateData=updateData)
+        super().__init__(interval=interval, symbol=symbol, logFile='live', loadData=loadData, updateData=updateData,
+                         lookback=lookback)
         self.binanceClient = Client(apiKey, apiSecret, tld=tld)
         self.spot_usdt = self.get_spot_usdt()
         self.spot_coin = self.get_spot_coin()
@@ -1,12 +1,14 @@
 from datetime import datetime
 from helpers import get_logger
 from data import Data
+from option import get_option_plan
+from indicators import StoicIndicator
 from enums import LONG, SHORT, BEARISH, BULLISH, TRAILING_LOSS, STOP_LOSS
 
 
 class SimulationTrader:
     def __init__(self, startingBalance: float = 1000, interval: str = '1h', symbol: str = 'BTCUSDT',
-                 loadData: bool = True, updateData: bool = True, logFile: str = 'simulation'):
+                 loadData: bool = True, updateData: bool = True, logFile: str = 'simulation', lookback: int = None):
         """
         SimulationTrader object that will mimic real live market trades.
         :param startingBalance: Balance to start simulation trader with.
@@ -15,10 +17,11 @@ class SimulationTrader:
         :param loadData: Boolean whether we load data from data object or not.
         :param updateData: Boolean for whether data will be updated if it is loaded.
         :param logFile: Filename that logger will log to.
+        :param lookback: Amount of newest periods to load from database. If none, all periods are loaded.
         """
         self.logger = get_logger(logFile=logFile, loggerName=logFile)  # Get logger.
         self.dataView: Data = Data(interval=interval, symbol=symbol, loadData=loadData,
-                                   updateData=updateData, logObject=self.logger)
+                                   updateData=updateData, logObject=self.logger, lookback=lookback)
         self.binanceClient = self.dataView.binanceClient  # Retrieve Binance client.
         self.symbol = self.dataView.symbol  # Retrieve symbol from data-view object.
 
@@ -59,7 +62,8 @@ class SimulationTrader:
         self.stoicTrend = None  # Current stoic trend is enabled.
         self.stoicEnabled = False  # Boolean that holds whether stoic trading is enabled or not.
         self.stoicOptions = [None, None, None]  # Stoic options.
-        self.stoicDictionary = {}  # Dictionary for stoic strategies.
+        self.stoicIndicator = None  # Streaming state of stoic strategy.
+        self.stoicTimestamp = None  # Open time of newest closed period in stoic strategy's windows.
 
     def output_message(self, message: str, level: int = 2, printMessage: bool = False):
         """
@@ -229,73 +233,36 @@ class SimulationTrader:
         self.add_trade(msg, force=force, initialNet=self.previousNet, finalNet=finalNet, price=self.currentPrice)
         self.previousNet = finalNet
 
-    # noinspection DuplicatedCode
-    def stoic_strategy(self, input1: int, input2: int, input3: int, s: int = 0) -> None or int:
+    def stoic_strategy(self, input1: int, input2: int, input3: int) -> None or int:
         """
         Custom strategy.
         :param input1: Custom input 1 for the stoic strategy.
         :param input2: Custom input 2 for the stoic strategy.
         :param input3: Custom input 3 for the stoic strategy.
-        :param s: Shift data to get previous values.
         :return: Bullish, bearish, or none values.
         """
-        self.dataView.data.insert(0, self.dataView.get_current_data())
-        rsi_values_one = [self.dataView.get_rsi(input1, shift=shift, update=False) for shift in range(s, input1 + s)]
-        rsi_values_two = [self.dataView.get_rsi(input2, shift=shift, update=False) for shift in range(s, input2 + s)]
-        self.dataView.data = self.dataView.data[1:]
-
-        seneca = max(rsi_values_one) - min(rsi_values_one)
-        if 'seneca' in self.stoicDictionary:
-            self.stoicDictionary['seneca'].insert(0, seneca)
-        else:
-            self.stoicDictionary['seneca'] = [seneca]
-
-        zeno = rsi_values_one[0] - min(rsi_values_one)
-        if 'zeno' in self.stoicDictionary:
-            self.stoicDictionary['zeno'].insert(0, zeno)
-        else:
-            self.stoicDictionary['zeno'] = [zeno]
-
-        gaius = rsi_values_two[0] - min(rsi_values_two)
-        if 'gaius' in self.stoicDictionary:
-            self.stoicDictionary['gaius'].insert(0, gaius)
-        else:
-            self.stoicDictionary['gaius'] = [gaius]
-
-        philo = max(rsi_values_two) - min(rsi_values_two)
-        if 'philo' in self.stoicDictionary:
-            self.stoicDictionary['philo'].insert(0, philo)
-        else:
-            self.stoicDictionary['philo'] = [philo]
-
-        if len(self.stoicDictionary['gaius']) < 3:
-            return None
-
-        hadot = sum(self.stoicDictionary['gaius'][:3]) / sum(self.stoicDictionary['philo'][:3]) * 100
-        if 'hadot' in self.stoicDictionary:
-            self.stoicDictionary['hadot'].insert(0, hadot)
-        else:
-            self.stoicDictionary['hadot'] = [hadot]
-
-        if len(self.stoicDictionary['hadot']) < 3:
-            return None
-
-        stoic = sum(self.stoicDictionary['zeno'][:3]) / sum(self.stoicDictionary['seneca'][:3]) * 100
-        marcus = sum(self.stoicDictionary['hadot'][:input3]) / input3
-
-        self.output_message(f'Inputs: {input1}, {input2}, {input3}')
-        self.output_message(f'\nMarcus: {marcus}')
-        self.output_message(f'Stoic: {stoic}\n')
-
-        if marcus > stoic:
-            self.stoicTrend = BEARISH
-            return BEARISH
-        elif marcus < stoic:
-            self.stoicTrend = BULLISH
-            return BULLISH
-        else:
-            self.stoicTrend = None
-            return None
+        data = self.dataView.data
+        latestTimestamp = data.get_timestamp(-1)
+        if self.stoicIndicator is None or self.stoicIndicator.inputs != (input1, input2, input3):
+            # Shifts of 0 and 1 are both the period in progress, like when it was appended to data for the strategy.
+            self.stoicIndicator = StoicIndicator(input1, input2, input3, currentPeriods=2)
+            self.stoicTimestamp = None
+
+        if self.stoicTimestamp != latestTimestamp:  # Push periods that closed since the previous call to the windows.
+            closedPeriods = max(input1, input2) - 2
+            if self.stoicTimestamp is not None and self.stoicTimestamp < latestTimestamp:
+                closedPeriods = min(closedPeriods, len(data) - 1 - data.find_index(self.stoicTimestamp))
+            for shift in range(closedPeriods, 0, -1):
+                self.stoicIndicator.push_closed(self.dataView.get_rsi(input1, shift=shift),
+                                                self.dataView.get_rsi(input2, shift=shift))
+            self.stoicTimestamp = latestTimestamp
+
+        self.stoicTrend = self.stoicIndicator.update(self.dataView.get_rsi(input1), self.dataView.get_rsi(input2))
+        if self.stoicIndicator.marcus is not None:
+            self.output_message(f'Inputs: {input1}, {input2}, {input3}')
+            self.output_message(f'\nMarcus: {self.stoicIndicator.marcus}')
+            self.output_message(f'Stoic: {self.stoicIndicator.stoic}\n')
+        return self.stoicTrend
 
     # noinspection PyTypeChecker
     def main_logic(self, log_data=True):
@@ -528,26 +495,23 @@ class SimulationTrader:
         if len(self.tradingOptions) == 0:  # Checking whether options exist.
             raise ValueError("No trading options provided.")
 
-        trends = []
-
         if dataObject is None:
             dataObject = self.dataView
 
         if not dataObject.data_is_updated():
             dataObject.update_data()
 
-        dataObject.data.insert(0, dataObject.get_current_data())
-
         if dataObject == self.dataView:
             self.optionDetails = []
         else:
             self.lowerOptionDetails = []
 
-        for option in self.tradingOptions:
-            initialAverage = self.get_average(option.movingAverage, option.parameter, option.initialBound,
-                                              dataObject, update=False)
-            finalAverage = self.get_average(option.movingAverage, option.parameter, option.finalBound, dataObject,
-                                            update=False)
+        # Averages include the period in progress, which running averages add to their closed state in O(1). Options
+        # sharing a moving average share its node in the plan, so it is only calculated once.
+        plan = get_option_plan(self.tradingOptions)
+        values = plan.evaluate(lambda average, parameter, prices: self.get_average(average, parameter, prices,
+                                                                                   dataObject, update=True))
+        for option, (initialAverage, finalAverage) in zip(self.tradingOptions, plan.get_averages(values)):
             initialName, finalName = option.get_pretty_option()
 
             if dataObject == self.dataView:
@@ -563,21 +527,7 @@ class SimulationTrader:
                 self.output_message(f'{option.movingAverage}({option.initialBound}) = {initialAverage}')
                 self.output_message(f'{option.movingAverage}({option.finalBound}) = {finalAverage}')
 
-            if initialAverage > finalAverage:
-                trends.append(BULLISH)
-            elif initialAverage < finalAverage:
-                trends.append(BEARISH)
-            else:
-                trends.append(None)
-
-        dataObject.data = dataObject.data[1:]
-
-        if all(trend == BULLISH for trend in trends):
-            return BULLISH
-        elif all(trend == BEARISH for trend in trends):
-            return BEARISH
-        else:
-            return None
+        return plan.get_trend(values)
 
     def check_cross(self, dataObject: Data = None, log_data=True) -> bool:
         """
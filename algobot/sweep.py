@@ -0,0 +1,308 @@
+import itertools
+import multiprocessing
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from candles import CandleStore
+from backtester import Backtester
+from indicatorbank import INDICATOR_BANK_MEMORY, IndicatorBank
+from option import Option
+from enums import STOP_LOSS
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Shared memory was added in Python 3.8, so older versions copy candles to every worker.
+    shared_memory = None
+
+SWEEP_WORKERS = os.cpu_count() or 1  # Processes backtesting configurations at once.
+SWEEP_CHUNK_SIZE = 4  # Configurations sent to a worker at once.
+SWEEP_CANCEL_POLL = 0.1  # Seconds between checks for cancellation while waiting for results.
+METRICS = ('profit', 'profitPercentage', 'trades', 'maxDrawdown')
+
+WORKER_CANDLES = None  # Candles and backtest settings of a worker process, set by initialize_worker.
+WORKER_MEMORY = None
+WORKER_SETTINGS = None
+WORKER_BANK = None
+WORKER_CANCELLED = None
+
+
+class SharedCandles:
+    """
+    Candle store copied once into a shared memory block, so worker processes can read its timestamps and columns
+    without copies of their own. If shared memory is not available, workers get copies of the candle store instead.
+    """
+    def __init__(self, candles: CandleStore):
+        self.candles = candles
+        self.length = len(candles)
+        self.fields = tuple(candles.columns)
+        self.memory = None
+
+        if shared_memory is not None and self.length > 0:
+            self.memory = shared_memory.SharedMemory(create=True, size=(len(self.fields) + 1) * self.length * 8)
+            timestamps, table = self.get_arrays(self.memory.buf)
+            timestamps[:] = candles.timestamps
+            for index, field in enumerate(self.fields):
+                table[index] = candles.columns[field]
+
+    def get_arrays(self, buffer) -> tuple:
+        """
+        Returns timestamps and table of columns viewing shared memory buffer provided.
+        """
+        timestamps = np.ndarray((self.length,), dtype=np.int64, buffer=buffer)
+        table = np.ndarray((len(self.fields), self.length), dtype=np.float64, buffer=buffer, offset=self.length * 8)
+        return timestamps, table
+
+    def get_source(self) -> tuple:
+        """
+        Returns what a worker needs to attach to candles: the name of the shared memory block, amount of candles, and
+        fields, or the candle store itself if shared memory is not available.
+        """
+        if self.memory is None:
+            return None, self.candles
+        return self.memory.name, (self.length, self.fields)
+
+    def close(self):
+        """
+        Frees shared memory block. Workers have to be stopped first.
+        """
+        if self.memory is not None:
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+
+
+def attach_candles(source: tuple) -> CandleStore:
+    """
+    Returns read-only candle store viewing shared memory of source provided by SharedCandles.get_source.
+    :param source: Tuple of shared memory name and amount of candles and fields, or none and a candle store.
+    :return: Candle store.
+    """
+    global WORKER_MEMORY
+    name, details = source
+    if name is None:
+        return details
+
+    length, fields = details
+    WORKER_MEMORY = shared_memory.SharedMemory(name=name)  # Kept referenced, so the views stay valid.
+    timestamps = np.ndarray((length,), dtype=np.int64, buffer=WORKER_MEMORY.buf)
+    table = np.ndarray((len(fields), length), dtype=np.float64, buffer=WORKER_MEMORY.buf, offset=length * 8)
+    timestamps.flags.writeable = False
+    table.flags.writeable = False
+    return CandleStore(timestamps, {field: table[index] for index, field in enumerate(fields)})
+
+
+def initialize_worker(source: tuple, settings: dict, cancelled=None):
+    """
+    Attaches worker process to shared candles, stores backtest settings shared by every configuration, and creates
+    the worker's indicator bank, so moving averages are calculated once for every configuration the worker runs.
+    :param source: Source returned by SharedCandles.get_source.
+    :param settings: Dictionary with starting balance, start date, end date, symbol, and indicator bank memory and
+                     spill directory of the worker.
+    :param cancelled: Optional event shared by every worker that is set when the sweep is cancelled.
+    """
+    global WORKER_CANDLES, WORKER_SETTINGS, WORKER_BANK, WORKER_CANCELLED
+    WORKER_CANDLES = attach_candles(source)
+    WORKER_SETTINGS = settings
+    WORKER_CANCELLED = cancelled
+    spillDirectory = os.path.join(settings['spillDirectory'], str(os.getpid()))  # Workers spill to their own files.
+    WORKER_BANK = IndicatorBank(settings['bankMemory'], spillDirectory)
+
+
+def get_sweep_configurations(movingAverages=('sma', 'wma', 'ema'), parameters=('high', 'low', 'open', 'close'),
+                             initialBounds=range(5, 21), finalBounds=None, lossStrategies=(STOP_LOSS,),
+                             lossPercentages=(5,), marginOptions=(True,), stoicOptions=(None,)) -> list:
+    """
+    Returns every combination of the values provided as backtest configurations with one trading option each.
+    :param movingAverages: Moving averages to try, i.e. -> SMA, WMA, EMA
+    :param parameters: Parameters to try, i.e. - HIGH, LOW, CLOSE, OPEN, HIGH/LOW, OPEN/CLOSE
+    :param initialBounds: Initial bounds to try.
+    :param finalBounds: Final bounds to try. If none, the initial bounds are tried.
+    :param lossStrategies: Loss strategies to try.
+    :param lossPercentages: Loss percentages to try.
+    :param marginOptions: Booleans of whether margin is enabled to try.
+    :param stoicOptions: Lists of stoic inputs to try. None disables stoicism.
+    :return: List of configuration dictionaries.
+    """
+    if finalBounds is None:
+        finalBounds = initialBounds
+
+    configurations = []
+    for movingAverage, parameter, initialBound, finalBound, lossStrategy, lossPercentage, marginEnabled, stoic in \
+            itertools.product(movingAverages, parameters, initialBounds, finalBounds, lossStrategies, lossPercentages,
+                              marginOptions, stoicOptions):
+        configurations.append({
+            'options': [(movingAverage, parameter, initialBound, finalBound)],
+            'lossStrategy': lossStrategy,
+            'lossPercentage': lossPercentage,
+            'marginEnabled': marginEnabled,
+            'stoicOptions': None if stoic is None else list(stoic),
+        })
+    return configurations
+
+
+def get_max_drawdown(equityCurve: np.ndarray) -> float:
+    """
+    Returns largest drop of equity curve provided from a previous high in percentage of that high.
+    :param equityCurve: Array of net balances.
+    :return: Maximum drawdown percentage.
+    """
+    if equityCurve is None or len(equityCurve) == 0:
+        return 0
+    highs = np.maximum.accumulate(equityCurve)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdowns = np.where(highs > 0, (highs - equityCurve) / highs, 0)
+    return float(np.max(drawdowns)) * 100
+
+
+def run_configuration(candles: CandleStore, configuration: dict, settings: dict,
+                      indicatorBank: IndicatorBank = None) -> dict:
+    """
+    Backtests configuration provided on a new backtester and returns its results.
+    :param candles: Candles to backtest.
+    :param configuration: Configuration dictionary from get_sweep_configurations.
+    :param settings: Dictionary with starting balance, start date, end date, and symbol.
+    :param indicatorBank: Optional indicator bank of candles to read and store moving averages in.
+    :return: Dictionary with configuration, metrics, and an error message if the backtest failed.
+    """
+    result = {'configuration': configuration, 'error': None}
+    try:
+        backtester = Backtester(startingBalance=settings['startingBalance'],
+                                data=candles,
+                                lossStrategy=configuration['lossStrategy'],
+                                lossPercentage=configuration['lossPercentage'],
+                                options=[Option(*option) for option in configuration['options']],
+                                marginEnabled=configuration['marginEnabled'],
+                                startDate=settings['startDate'],
+                                endDate=settings['endDate'],
+                                symbol=settings['symbol'],
+                                stoicOptions=configuration['stoicOptions'])
+        backtester.indicatorBank = indicatorBank
+        backtester.moving_average_test()
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+        return result
+
+    result['profit'] = backtester.profit
+    result['profitPercentage'] = backtester.profit / backtester.startingBalance * 100
+    result['trades'] = len(backtester.trades)
+    result['maxDrawdown'] = get_max_drawdown(backtester.equityCurve)
+    return result
+
+
+def run_configurations(chunk: list) -> list:
+    """
+    Backtests a chunk of indexes and configurations in a worker process. If the sweep is cancelled, the rest of the
+    chunk is skipped.
+    :param chunk: List of tuples of index and configuration.
+    :return: List of results with index of their configuration.
+    """
+    results = []
+    for index, configuration in chunk:
+        if WORKER_CANCELLED is not None and WORKER_CANCELLED.is_set():
+            break
+        result = run_configuration(WORKER_CANDLES, configuration, WORKER_SETTINGS, WORKER_BANK)
+        result['index'] = index
+        results.append(result)
+    return results
+
+
+def stream_sweep(candles: CandleStore, configurations: list, startingBalance: float = 1000, startDate=None,
+                 endDate=None, symbol: str = None, workers: int = SWEEP_WORKERS, chunkSize: int = SWEEP_CHUNK_SIZE,
+                 cancelled=None, progress=None, bankMemory: int = INDICATOR_BANK_MEMORY, spillDirectory: str = None):
+    """
+    Backtests configurations with a pool of worker processes that share candles through shared memory. Every worker
+    keeps an indicator bank, so each moving average series is calculated once per worker instead of once per
+    configuration. Results are yielded as soon as their chunk is done, so they come in the order they finish, not in
+    the order of configurations.
+    :param candles: Candle store to backtest.
+    :param configurations: List of configuration dictionaries from get_sweep_configurations.
+    :param startingBalance: Starting balance of every backtest.
+    :param startDate: Start date of every backtest.
+    :param endDate: End date of every backtest.
+    :param symbol: Symbol of candles.
+    :param workers: Amount of worker processes.
+    :param chunkSize: Amount of configurations sent to a worker at once.
+    :param cancelled: Optional function that returns true if sweep should stop. It is checked while waiting for
+                      results, too, and workers are stopped right away.
+    :param progress: Optional function called with amount of configurations done and total after every chunk.
+    :param bankMemory: Bytes of moving average series all workers keep in memory before spilling them to disk.
+    :param spillDirectory: Directory workers spill series to. If none, a temporary directory is used and removed.
+    :return: Generator of result dictionaries.
+    """
+    indexed = list(enumerate(configurations))
+    chunks = [indexed[start:start + chunkSize] for start in range(0, len(indexed), chunkSize)]
+    processes = max(1, min(workers, len(chunks)))
+    temporaryDirectory = tempfile.mkdtemp(prefix='sweep_') if spillDirectory is None else None
+    settings = {'startingBalance': startingBalance, 'startDate': startDate, 'endDate': endDate, 'symbol': symbol,
+                'bankMemory': bankMemory // processes, 'spillDirectory': spillDirectory or temporaryDirectory}
+    sharedCandles = SharedCandles(candles)
+    cancelEvent = multiprocessing.Event()
+    pool = multiprocessing.Pool(processes=processes, initializer=initialize_worker,
+                                initargs=(sharedCandles.get_source(), settings, cancelEvent))
+    done = 0
+    try:
+        chunkResults = pool.imap_unordered(run_configurations, chunks)
+        for _ in range(len(chunks)):
+            results = None
+            while results is None:
+                if cancelled is not None and cancelled():
+                    cancelEvent.set()
+                    return
+                try:
+                    results = chunkResults.next(timeout=SWEEP_CANCEL_POLL)
+                except multiprocessing.TimeoutError:
+                    pass
+
+            done += len(results)
+            if progress is not None:
+                progress(done, len(configurations))
+            yield from results
+    finally:
+        cancelEvent.set()
+        pool.terminate()
+        pool.join()
+        sharedCandles.close()
+        if temporaryDirectory is not None:
+            shutil.rmtree(temporaryDirectory, ignore_errors=True)
+
+
+def rank_results(results: list, metric: str = 'profit', count: int = None, ascending: bool = False) -> list:
+    """
+    Returns results of backtests that did not fail sorted by metric provided.
+    :param results: List of result dictionaries.
+    :param metric: Metric to rank by, one of METRICS.
+    :param count: Amount of best results to return. If none, every result is returned.
+    :param ascending: If true, the lowest values rank first, e.g. for maximum drawdown.
+    :return: List of ranked results.
+    """
+    if metric not in METRICS:
+        raise ValueError(f'Invalid metric {metric} provided.')
+    ranked = sorted((result for result in results if result['error'] is None), key=lambda result: result[metric],
+                    reverse=not ascending)
+    return ranked if count is None else ranked[:count]
+
+
+def find_optimal_moving_average(backtester: Backtester, averageStart: int, averageLimit: int,
+                                workers: int = SWEEP_WORKERS, progress=None) -> list:
+    """
+    Runs moving average tests of every moving average and parameter with bounds between average start and limit on
+    backtester's data between its start and end dates, with its starting balance, loss, margin, and stoic settings.
+    :param backtester: Backtester with data and settings to test.
+    :param averageStart: Smallest bound to try.
+    :param averageLimit: Largest bound to try.
+    :param workers: Amount of worker processes.
+    :param progress: Optional function called with amount of configurations done and total.
+    :return: List of results ranked by profit.
+    """
+    configurations = get_sweep_configurations(initialBounds=range(averageStart, averageLimit + 1),
+                                              lossStrategies=(backtester.lossStrategy,),
+                                              lossPercentages=(backtester.lossPercentageDecimal * 100,),
+                                              marginOptions=(backtester.marginEnabled,),
+                                              stoicOptions=(backtester.stoicOptions if backtester.stoicEnabled
+                                                            else None,))
+    results = stream_sweep(backtester.data, configurations, startingBalance=backtester.startingBalance,
+                           startDate=backtester.startDate, endDate=backtester.endDate, symbol=backtester.symbol,
+                           workers=workers, progress=progress)
+    return rank_results(list(results))
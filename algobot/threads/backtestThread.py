@@ -115,23 +115,19 @@ class BacktestThread(QRunnable):
         Performs a moving average test with given configurations.
         """
         backtester = self.gui.backtester
-        s1, s2, s3 = backtester.stoicOptions
         backtester.movingAverageTestStartTime = time.time()
-        seenData = backtester.data[:backtester.minPeriod][::-1]  # Start from minimum previous period data.
-        backtestPeriod = backtester.data[backtester.startDateIndex: backtester.endDateIndex]
+        backtestPeriod = list(backtester.data[backtester.startDateIndex: backtester.endDateIndex])
+        signals = backtester.get_signals()  # Trends of every period are precomputed before trading.
         testLength = len(backtestPeriod)
         divisor = testLength // 100
         if testLength % 100 != 0:
             divisor += 1
 
         for index, period in enumerate(backtestPeriod):
-            seenData.insert(0, period)
             backtester.currentPeriod = period
             backtester.currentPrice = period['open']
             backtester.main_logic()
-            backtester.check_trend(seenData)
-            if backtester.stoicEnabled and len(seenData) > max((s1, s2, s3)):
-                backtester.stoic_strategy(seenData, s1, s2, s3)
+            backtester.apply_signals(signals, index)
 
             if index % divisor == 0:
                 self.signals.activity.emit(self.get_activity_dictionary(period=period, index=index, length=testLength))
@@ -11,6 +11,8 @@ from realtrader import RealTrader
 from simulationtrader import SimulationTrader
 from telegramBot import TelegramBot
 
+LIVE_LOOKBACK = 1000  # Periods loaded from database on startup. Indicators page in older periods when they need them.
+
 
 class BotSignals(QObject):
     smallError = pyqtSignal(str)
@@ -73,11 +75,13 @@ class BotThread(QRunnable):
             intervalString = helpers.convert_interval_to_string(lowerInterval)
             self.signals.activity.emit(caller, f'Retrieving {symbol} data for {intervalString.lower()} intervals...')
             if caller == LIVE:
-                gui.lowerIntervalData = Data(interval=lowerInterval, symbol=symbol, updateData=False)
+                gui.lowerIntervalData = Data(interval=lowerInterval, symbol=symbol, updateData=False,
+                                             lookback=LIVE_LOOKBACK)
                 gui.lowerIntervalData.custom_get_new_data(progress_callback=self.signals.progress, removeFirst=True,
                                                           caller=LIVE)
             elif caller == SIMULATION:
-                gui.simulationLowerIntervalData = Data(interval=lowerInterval, symbol=symbol, updateData=False)
+                gui.simulationLowerIntervalData = Data(interval=lowerInterval, symbol=symbol, updateData=False,
+                                                       lookback=LIVE_LOOKBACK)
                 gui.simulationLowerIntervalData.custom_get_new_data(progress_callback=self.signals.progress,
                                                                     removeFirst=True,
                                                                     caller=SIMULATION)
@@ -106,7 +110,8 @@ class BotThread(QRunnable):
                                                     symbol=symbol,
                                                     interval=interval,
                                                     loadData=True,
-                                                    updateData=False)
+                                                    updateData=False,
+                                                    lookback=LIVE_LOOKBACK)
             gui.simulationTrader.dataView.custom_get_new_data(progress_callback=self.signals.progress, removeFirst=True,
                                                               caller=SIMULATION)
         elif caller == LIVE:
@@ -123,7 +128,8 @@ class BotThread(QRunnable):
                                     tld=tld,
                                     isIsolated=isIsolated,
                                     loadData=True,
-                                    updateData=False)
+                                    updateData=False,
+                                    lookback=LIVE_LOOKBACK)
             gui.trader.dataView.custom_get_new_data(progress_callback=self.signals.progress, removeFirst=True,
                                                     caller=LIVE)
         else:
@@ -192,6 +198,7 @@ class BotThread(QRunnable):
         :param caller: Caller that will determine what type of trader will be instantiated.
         """
         self.create_trader(caller)
+        self.start_streams(caller)
         self.gui.set_parameters(caller)
 
         if caller == LIVE:
@@ -205,6 +212,28 @@ class BotThread(QRunnable):
         else:
             raise RuntimeError("Invalid type of caller specified.")
 
+    def start_streams(self, caller):
+        """
+        Starts market streams of caller's data objects, so the trading loop reads current prices from memory.
+        :param caller: Caller whose data objects will be streamed.
+        """
+        self.trader.dataView.start_stream()
+        lowerData = self.gui.get_lower_interval_data(caller)
+        if self.lowerIntervalNotification and lowerData is not None:
+            lowerData.start_stream()
+        self.signals.activity.emit(caller, 'Started streaming market data.')
+
+    def stop_streams(self, caller):
+        """
+        Stops market streams of caller's data objects.
+        :param caller: Caller whose data objects were streamed.
+        """
+        if self.trader is not None:
+            self.trader.dataView.stop_stream()
+        lowerData = self.gui.get_lower_interval_data(caller)
+        if lowerData is not None:
+            lowerData.stop_stream()
+
     def update_data(self, caller):
         """
         Updates data if updated data exists for caller object.
@@ -218,11 +247,13 @@ class BotThread(QRunnable):
 
     def handle_trading(self, caller):
         """
-        Handles trading by checking if automation mode is on or manual.
+        Handles trading by checking if automation mode is on or manual. Every indicator in the trading logic shares one
+        snapshot of the period in progress.
         :param caller: Object for which function will handle trading.
         """
         trader = self.gui.get_trader(caller)
-        trader.main_logic(log_data=self.gui.advancedLogging)
+        with trader.dataView.tick():
+            trader.main_logic(log_data=self.gui.advancedLogging)
 
     def handle_current_and_trailing_prices(self, caller):
         """
@@ -266,7 +297,8 @@ class BotThread(QRunnable):
         if self.lowerIntervalNotification:
             trader: SimulationTrader = self.gui.get_trader(caller)
             lowerData = self.gui.get_lower_interval_data(caller)
-            lowerTrend = trader.get_trend(dataObject=lowerData, log_data=self.gui.advancedLogging)
+            with lowerData.tick():
+                lowerTrend = trader.get_trend(dataObject=lowerData, log_data=self.gui.advancedLogging)
             self.lowerTrend = trader.get_trend_string(lowerTrend)
             trend = trader.trend
             if previousLowerTrend == lowerTrend or lowerTrend == trend:
@@ -389,32 +421,36 @@ class BotThread(QRunnable):
                 self.gui.telegramBot.send_message(self.telegramChatID, error_message)
             self.signals.error.emit(self.caller, str(e))
 
-        while failCount < failLimit:
-            try:
-                self.trading_loop(caller)
-                failed = False
-            except Exception as e:
-                failed = True
-                error = e
-                self.signals.smallError.emit(str(e))
-                error_message = traceback.format_exc()
-                trader: SimulationTrader = self.gui.get_trader(caller)
-                if trader is not None:
-                    trader.output_message(error_message, printMessage=True)
-                    trader.output_message(f'Bot has crashed because of :{e}', printMessage=True)
-                    trader.output_message(f"({failCount})Trying again in 10 seconds..", printMessage=True)
-                failCount += 1
-                if self.gui.telegramBot and self.gui.configuration.chatPass:
-                    self.gui.telegramBot.send_message(self.telegramChatID, error_message)
-                    self.gui.telegramBot.send_message(self.telegramChatID, f"Bot has crashed because of :{e}.")
-                    self.gui.telegramBot.send_message(self.telegramChatID, f"({failCount})Trying again in 10 seconds..")
-                time.sleep(10)
-
-            runningLoop = self.gui.runningLive if caller == LIVE else self.gui.simulationRunningLive
-            if not failed or not runningLoop:
-                break
-
-        if failLimit == failCount:
-            self.signals.error.emit(self.caller, str(error))
+        try:  # Streams are stopped however the trading loop ends, so their sockets and threads never outlive the bot.
+            while failCount < failLimit:
+                try:
+                    self.trading_loop(caller)
+                    failed = False
+                except Exception as e:
+                    failed = True
+                    error = e
+                    self.signals.smallError.emit(str(e))
+                    error_message = traceback.format_exc()
+                    trader: SimulationTrader = self.gui.get_trader(caller)
+                    if trader is not None:
+                        trader.output_message(error_message, printMessage=True)
+                        trader.output_message(f'Bot has crashed because of :{e}', printMessage=True)
+                        trader.output_message(f"({failCount})Trying again in 10 seconds..", printMessage=True)
+                    failCount += 1
+                    if self.gui.telegramBot and self.gui.configuration.chatPass:
+                        self.gui.telegramBot.send_message(self.telegramChatID, error_message)
+                        self.gui.telegramBot.send_message(self.telegramChatID, f"Bot has crashed because of :{e}.")
+                        self.gui.telegramBot.send_message(self.telegramChatID,
+                                                          f"({failCount})Trying again in 10 seconds..")
+                    time.sleep(10)
+
+                runningLoop = self.gui.runningLive if caller == LIVE else self.gui.simulationRunningLive
+                if not failed or not runningLoop:
+                    break
+
+            if failLimit == failCount:
+                self.signals.error.emit(self.caller, str(error))
+        finally:
+            self.stop_streams(caller)
 
         self.signals.restore.emit()
@@ -9,7 +9,7 @@ class DownloadSignals(QObject):
     Defines the signals available from a running worker thread.
     """
     csv_finished = pyqtSignal(str)
-    finished = pyqtSignal(list)
+    finished = pyqtSignal(object)
     error = pyqtSignal(str)
     restore = pyqtSignal()
     progress = pyqtSignal(int, str, int)
@@ -32,7 +32,7 @@ class DownloadThread(QRunnable):
         Initialise the runner function with passed args, kwargs.
         """
         try:
-            self.client = Data(interval=self.interval, symbol=self.symbol, updateData=False)
+            self.client = Data(interval=self.interval, symbol=self.symbol, updateData=False, useCache=True)
             data = self.client.custom_get_new_data(progress_callback=self.signals.progress, locked=self.signals.locked)
             if data:
                 if self.descending is None and self.armyTime is None: